@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+
+
+# -----------------------
+# Admission control
+# -----------------------
+# ASGI middleware that gives each class of route its own concurrency limit
+# and wait queue, so a burst of exports or payroll runs cannot take the
+# workers that check-ins need:
+#   critical -> login + check-in / check-out
+#   normal   -> everything not listed
+#   bulk     -> exports, full attendance listings, payroll, analytics, sync
+# A request over its class limit waits in that class's queue (FIFO, up to
+# a timeout); when the queue is full or the wait times out it is rejected
+# with Retry-After (503, or 429 for bulk). Bulk is shed first: while
+# critical or normal requests are waiting, bulk requests are not queued at
+# all, and normal requests stop queueing while critical ones wait.
+#
+# Sync endpoints run in anyio's threadpool (40 threads), so the default
+# limits add up to less than that: bulk can never occupy every thread.
+#
+# HRMS_ADMISSION: on (default) | off
+# HRMS_ADMISSION_CRITICAL / _NORMAL / _BULK: "<concurrency>:<queue depth>"
+ADMISSION_ENABLED = os.getenv("HRMS_ADMISSION", "on").lower() not in ("0", "off", "false", "no")
+
+CRITICAL, NORMAL, BULK = "critical", "normal", "bulk"
+
+_DEFAULT_LIMITS = {CRITICAL: "20:200", NORMAL: "14:50", BULK: "4:4"}
+# seconds a queued request waits for a slot / clients are told to wait
+QUEUE_TIMEOUT_SECONDS = {CRITICAL: 10.0, NORMAL: 5.0, BULK: 2.0}
+RETRY_AFTER_SECONDS = {CRITICAL: 1, NORMAL: 2, BULK: 30}
+REJECT_STATUS = {CRITICAL: 503, NORMAL: 503, BULK: 429}
+
+# (method or None for any, path, class or None = not limited)
+# a path ending in "/" matches by prefix, any other path exactly
+ROUTE_CLASSES = [
+    # long-lived stream: holds a connection, not a worker
+    ("GET", "/api/dashboard/live", None),
+
+    ("POST", "/api/auth/login", CRITICAL),
+    ("POST", "/api/attendance", CRITICAL),
+    ("POST", "/api/attendance/preview-location", CRITICAL),
+
+    ("GET", "/api/attendance", BULK),
+    ("GET", "/api/attendance/total-hours", BULK),
+    (None, "/api/attendance/export/", BULK),
+    ("GET", "/api/dashboard/monthly-attendance", BULK),
+    (None, "/api/payslips/export/", BULK),
+    (None, "/api/payslips/totals/", BULK),
+    (None, "/api/payroll/", BULK),
+    ("POST", "/api/employees/import", BULK),
+    (None, "/api/sync/", BULK),
+    (None, "/api/admin/profiles/", BULK),
+]
+
+
+def route_class(method: str, path: str):
+    if method == "OPTIONS":
+        return None     # CORS preflight
+    for m, pattern, cls in ROUTE_CLASSES:
+        if m and m != method:
+            continue
+        if path == pattern or (pattern.endswith("/") and path.startswith(pattern)):
+            return cls
+    return NORMAL
+
+
+def _parse_limits(name: str):
+    spec = os.getenv(f"HRMS_ADMISSION_{name.upper()}", _DEFAULT_LIMITS[name])
+    limit, _, depth = spec.partition(":")
+    return max(1, int(limit)), max(0, int(depth or 0))
+
+
+class _Lane:
+    """One route class: `limit` requests run, up to `depth` wait (event loop only, no locks)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.limit, self.depth = _parse_limits(name)
+        self.timeout = QUEUE_TIMEOUT_SECONDS[name]
+        self._slots = asyncio.Semaphore(self.limit)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    async def acquire(self, may_queue: bool = True):
+        if not self._slots.locked() and not self.waiting:
+            await self._slots.acquire()     # free slot: returns without suspending
+        elif may_queue and self.waiting < self.depth:
+            self.waiting += 1
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            self.rejected += 1
+            return False
+
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "queueDepth": self.depth,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionControl:
+    def __init__(self, app):
+        self.app = app
+        self.lanes = {name: _Lane(name) for name in (CRITICAL, NORMAL, BULK)}
+        admission_stats.bind(self)
+
+    def _may_queue(self, cls: str):
+        # shed from the bottom: lower classes stop queueing while higher ones wait
+        if cls == BULK:
+            return not (self.lanes[CRITICAL].waiting or self.lanes[NORMAL].waiting)
+        if cls == NORMAL:
+            return not self.lanes[CRITICAL].waiting
+        return True
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_ENABLED:
+            return await self.app(scope, receive, send)
+
+        cls = route_class(scope["method"], scope["path"])
+        if cls is None:
+            return await self.app(scope, receive, send)
+
+        lane = self.lanes[cls]
+        if not await lane.acquire(self._may_queue(cls)):
+            return await _reject(send, cls)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release()
+
+
+async def _reject(send, cls: str):
+    body = json.dumps({"detail": f"Server busy ({cls} requests), retry later"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": REJECT_STATUS[cls],
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(RETRY_AFTER_SECONDS[cls]).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class _AdmissionStats:
+    """Read side for GET /api/admin/admission (the middleware is built by Starlette)."""
+
+    def __init__(self):
+        self._middleware = None
+
+    def bind(self, middleware: AdmissionControl):
+        self._middleware = middleware
+
+    def report(self):
+        if self._middleware is None:
+            return {"enabled": False}
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "classes": {name: lane.stats() for name, lane in self._middleware.lanes.items()},
+        }
+
+
+admission_stats = _AdmissionStats()
@@ -0,0 +1,283 @@
+import os
+import zlib
+from datetime import date, timedelta
+
+import bson
+from bson.binary import Binary
+from pymongo import ASCENDING
+
+from app.database import attendance_archive_collection, employee_collection
+from app.attendance_store import ATTENDANCE_FEED, _day_keys, attendance_store
+from app.attendance_utils import ATTENDANCE_STATUSES, time_to_minutes
+from app.sync_sequence import record_deletes
+
+
+# -----------------------
+# Cold tier
+# -----------------------
+# Attendance older than ARCHIVE_AFTER_DAYS is moved, one whole month at a time,
+# into attendance_archive as zlib-compressed BSON blocks, one per
+# (month, department). Each block also keeps small per-employee stats so
+# all-time summaries never need to decompress anything. Row listings only
+# reach archived months when asked for a date range that covers them.
+#
+# Leaves are not tiered: they are a few documents per employee per year
+# (attendance is one per working day), and the balance ledger, the overlap
+# index and the team calendar read them across years.
+ARCHIVE_AFTER_DAYS = int(os.getenv("HRMS_ARCHIVE_AFTER_DAYS", "400"))
+
+# rows per block part (keeps compressed blocks far below the 16MB BSON limit)
+ARCHIVE_BLOCK_ROWS = 20000
+
+
+def _month_end(month: str):
+    return f"{month}-31"
+
+
+def _next_month(month: str):
+    y, m = int(month[:4]), int(month[5:7])
+    return f"{y + 1}-01" if m == 12 else f"{y}-{m + 1:02d}"
+
+
+def archive_cutoff_month():
+    # months strictly before this one are cold
+    cutoff = date.today() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    return cutoff.isoformat()[:7]
+
+
+def ensure_archive_indexes():
+    attendance_archive_collection.create_index([("month", ASCENDING), ("department", ASCENDING)])
+    attendance_archive_collection.create_index([("employeeIds", ASCENDING), ("month", ASCENDING)])
+
+
+def _compress_rows(rows: list):
+    return Binary(zlib.compress(bson.encode({"rows": rows}), 6))
+
+
+def _decompress_rows(blob):
+    return bson.decode(zlib.decompress(blob))["rows"]
+
+
+def _employee_stats(rows: list):
+    stats = {}
+    for r in rows:
+        s = stats.setdefault(r["employeeId"], {
+            "employeeId": r["employeeId"],
+            **{k: 0 for k in ATTENDANCE_STATUSES},
+            "totalMin": 0,
+        })
+        if r.get("status") in ATTENDANCE_STATUSES:
+            s[r["status"]] += 1
+        if r.get("totalHours"):
+            s["totalMin"] += time_to_minutes(r["totalHours"])
+    return list(stats.values())
+
+
+def _block_doc(month: str, department: str, part: int, rows: list):
+    return {
+        "month": month,
+        "department": department,
+        "part": part,
+        "rowCount": len(rows),
+        "minDate": rows[0]["date"] if rows else None,
+        "employeeIds": sorted({r["employeeId"] for r in rows}),
+        "stats": _employee_stats(rows),
+        "data": _compress_rows(rows),
+    }
+
+
+def archive_month(month: str):
+    """
+    Moves one month from the hot store into compressed department blocks.
+    Rows already archived for the month are merged in (hot wins), so late
+    writes to an archived month are never lost.
+    Blocks are written before hot rows are deleted; if we crash in between,
+    readers de-duplicate (hot wins) and a re-run rewrites the same blocks.
+    Returns number of hot rows archived.
+    """
+    hot = attendance_store.find(start=f"{month}-01", end=_month_end(month))
+    if not hot:
+        return 0
+
+    seen = {(r["employeeId"], r["date"]) for r in hot}
+    rows = hot + [
+        r for r in find_archived(start=f"{month}-01", end=_month_end(month))
+        if (r["employeeId"], r["date"]) not in seen
+    ]
+
+    departments = {
+        e["employeeId"]: e.get("department") or "Unknown"
+        for e in employee_collection.find({}, {"_id": 0, "employeeId": 1, "department": 1})
+    }
+
+    by_department = {}
+    for r in rows:
+        by_department.setdefault(departments.get(r["employeeId"], "Unknown"), []).append(r)
+
+    written = []
+    for department, dept_rows in by_department.items():
+        dept_rows.sort(key=lambda r: (r["employeeId"], r["date"]))
+
+        for part, i in enumerate(range(0, len(dept_rows), ARCHIVE_BLOCK_ROWS)):
+            chunk = dept_rows[i:i + ARCHIVE_BLOCK_ROWS]
+            block_id = f"{month}:{department}:{part}"
+            written.append(block_id)
+            attendance_archive_collection.replace_one(
+                {"_id": block_id}, _block_doc(month, department, part, chunk), upsert=True,
+            )
+
+    # blocks of this month that the new layout no longer uses (dept change, fewer parts)
+    attendance_archive_collection.delete_many({"month": month, "_id": {"$nin": written}})
+
+    attendance_store.delete_month(month)
+    return len(hot)
+
+
+def archive_old_attendance():
+    """Scheduler job: archives every whole month older than the cutoff."""
+    ensure_archive_indexes()
+
+    month = attendance_store.oldest_month()
+    cutoff = archive_cutoff_month()
+
+    total = 0
+    while month and month < cutoff:
+        total += archive_month(month)
+        month = _next_month(month)
+    return total
+
+
+def delete_employee_archived(employee_id: str, limit: int | None = None):
+    """
+    Removes the employee's rows from up to `limit` archive blocks, rewriting
+    each block without them (or dropping it when nothing else is left).
+    Returns how many blocks were rewritten.
+    """
+    cursor = attendance_archive_collection.find({"employeeIds": employee_id})
+    blocks = list(cursor.limit(limit) if limit else cursor)
+    rows_by_block = [_decompress_rows(block["data"]) for block in blocks]
+    # tombstones before the rewrite (see employee_purge._keyed_batches)
+    removed_days = [r["date"] for rows in rows_by_block for r in rows if r["employeeId"] == employee_id]
+    record_deletes(ATTENDANCE_FEED, _day_keys(employee_id, removed_days))
+
+    for block, rows in zip(blocks, rows_by_block):
+        keep = [r for r in rows if r["employeeId"] != employee_id]
+        if keep:
+            attendance_archive_collection.replace_one(
+                {"_id": block["_id"]}, _block_doc(block["month"], block["department"], block["part"], keep),
+            )
+        else:
+            attendance_archive_collection.delete_one({"_id": block["_id"]})
+    return len(blocks)
+
+
+# -----------------------
+# Reads across both tiers
+# -----------------------
+def find_archived(employee_id: str | None = None, start: str | None = None, end: str | None = None):
+    query = {}
+    if employee_id:
+        query["employeeIds"] = employee_id
+    if start or end:
+        query["month"] = {}
+        if start:
+            query["month"]["$gte"] = start[:7]
+        if end:
+            query["month"]["$lte"] = end[:7]
+
+    rows = []
+    for block in attendance_archive_collection.find(query, {"data": 1}):
+        for r in _decompress_rows(block["data"]):
+            if employee_id and r["employeeId"] != employee_id:
+                continue
+            if start and r["date"] < start:
+                continue
+            if end and r["date"] > end:
+                continue
+            rows.append(r)
+    return rows
+
+
+def _reaches_archive(start: str | None):
+    # hot data covers [cutoff month, today]; skip the archive when the range is inside it
+    return not start or start[:7] < archive_cutoff_month()
+
+
+def find_all_tiers(employee_id: str | None = None, start: str | None = None,
+                   end: str | None = None, newest_first: bool = False):
+    """
+    Rows of both tiers. Archived rows are only read for an explicit range
+    that starts in an archived month: an open-ended listing would decompress
+    every block on every call. Counts and totals need no range, they come
+    from the blocks' pre-aggregated stats.
+    """
+    hot = attendance_store.find(employee_id, start, end, newest_first=newest_first)
+    if not start or not _reaches_archive(start):
+        return hot
+
+    cold = find_archived(employee_id, start, end)
+    if not cold:
+        return hot
+
+    # hot wins for any day present in both (interrupted archive run)
+    seen = {(r["employeeId"], r["date"]) for r in hot}
+    records = hot + [r for r in cold if (r["employeeId"], r["date"]) not in seen]
+    records.sort(key=lambda r: r["date"], reverse=newest_first)
+    return records
+
+
+def status_counts_all_tiers(employee_id: str | None = None, start: str | None = None, end: str | None = None):
+    summary = attendance_store.status_counts(employee_id, start, end)
+    if not _reaches_archive(start):
+        return summary
+
+    if start or end:
+        for r in find_archived(employee_id, start, end):
+            if r.get("status") in summary:
+                summary[r["status"]] += 1
+        return summary
+
+    # all-time: pre-aggregated block stats, no decompression
+    match = {"employeeIds": employee_id} if employee_id else {}
+    stats_match = {"stats.employeeId": employee_id} if employee_id else {}
+    group = {"_id": None, **{s: {"$sum": f"$stats.{s}"} for s in ATTENDANCE_STATUSES}}
+    rows = list(attendance_archive_collection.aggregate([
+        {"$match": match},
+        {"$unwind": "$stats"},
+        {"$match": stats_match},
+        {"$group": group},
+    ]))
+    if rows:
+        for s in ATTENDANCE_STATUSES:
+            summary[s] += rows[0][s]
+    return summary
+
+
+def archived_minutes_by_employee(employee_id: str | None = None, start: str | None = None, end: str | None = None):
+    """{employeeId: {"totalMinutes": n, "days": n}} for the cold tier."""
+    totals = {}
+    if not _reaches_archive(start):
+        return totals
+
+    if start or end:
+        for r in find_archived(employee_id, start, end):
+            t = totals.setdefault(r["employeeId"], {"totalMinutes": 0, "days": 0})
+            t["days"] += 1
+            if r.get("totalHours"):
+                t["totalMinutes"] += time_to_minutes(r["totalHours"])
+        return totals
+
+    match = {"employeeIds": employee_id} if employee_id else {}
+    stats_match = {"stats.employeeId": employee_id} if employee_id else {}
+    for r in attendance_archive_collection.aggregate([
+        {"$match": match},
+        {"$unwind": "$stats"},
+        {"$match": stats_match},
+        {"$group": {
+            "_id": "$stats.employeeId",
+            "totalMinutes": {"$sum": "$stats.totalMin"},
+            "days": {"$sum": {"$add": [f"$stats.{s}" for s in ATTENDANCE_STATUSES]}},
+        }},
+    ]):
+        totals[r["_id"]] = {"totalMinutes": r["totalMinutes"], "days": r["days"]}
+    return totals
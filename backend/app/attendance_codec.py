@@ -0,0 +1,92 @@
+from fastapi import HTTPException
+
+from app.attendance_utils import time_to_minutes, minutes_to_hhmm
+
+
+# -----------------------
+# Attendance storage schema
+# -----------------------
+# v1 (legacy): checkInTime / checkOutTime / totalHours as "HH:MM" strings
+# v2:          checkInMin / checkOutMin / totalMin as minutes since midnight
+#              (None = not recorded), so Mongo can $sum hours directly.
+# `date` stays an ISO "YYYY-MM-DD" string in both versions: it is the lookup
+# key of every query and already sorts / range-filters correctly.
+# The API always returns the v1 string shape (see decode_attendance).
+SCHEMA_VERSION = 2
+
+LEGACY_TIME_FIELDS = {"checkInTime": "", "checkOutTime": "", "totalHours": ""}
+
+
+def parse_hhmm(t: str | None):
+    # "" / None -> None, "09:10" -> 550
+    if not t:
+        return None
+    try:
+        minutes = time_to_minutes(t)
+    except (ValueError, AttributeError):
+        raise HTTPException(status_code=400, detail=f"Invalid time '{t}', expected HH:MM")
+    if minutes < 0 or minutes >= 24 * 60:
+        raise HTTPException(status_code=400, detail=f"Invalid time '{t}', expected HH:MM")
+    return minutes
+
+
+def format_hhmm(minutes: int | None):
+    return minutes_to_hhmm(minutes) if minutes is not None else ""
+
+
+def calc_total_minutes(check_in_min: int | None, check_out_min: int | None):
+    if check_in_min is None or check_out_min is None:
+        return 0
+    return max(check_out_min - check_in_min, 0)
+
+
+def encode_times(check_in: str | None, check_out: str | None):
+    """HH:MM strings from the API -> v2 storage fields."""
+    in_min = parse_hhmm(check_in)
+    out_min = parse_hhmm(check_out)
+    return {
+        "schemaVersion": SCHEMA_VERSION,
+        "checkInMin": in_min,
+        "checkOutMin": out_min,
+        "totalMin": calc_total_minutes(in_min, out_min),
+    }
+
+
+def decode_attendance(doc: dict | None):
+    """Stored document (v1 or v2) -> API shape with HH:MM strings. In place."""
+    if not doc or doc.get("schemaVersion", 1) < SCHEMA_VERSION:
+        return doc
+
+    doc.pop("schemaVersion", None)
+    doc["checkInTime"] = format_hhmm(doc.pop("checkInMin", None))
+    doc["checkOutTime"] = format_hhmm(doc.pop("checkOutMin", None))
+    doc["totalHours"] = format_hhmm(doc.pop("totalMin", 0) or 0)
+    return doc
+
+
+def decode_many(records):
+    return [decode_attendance(r) for r in records]
+
+
+# -----------------------
+# Query helpers (must match both versions while a migration is running)
+# -----------------------
+def open_checkin_filter():
+    # checked in but not checked out yet
+    return {"$or": [
+        {"schemaVersion": SCHEMA_VERSION, "checkInMin": {"$ne": None}, "checkOutMin": None},
+        {"schemaVersion": {"$ne": SCHEMA_VERSION}, "checkInTime": {"$ne": ""}, "checkOutTime": ""},
+    ]}
+
+
+def total_minutes_expr():
+    # aggregation expression: minutes worked for one document of either version
+    legacy_hhmm = {"$split": [{"$ifNull": ["$totalHours", "00:00"]}, ":"]}
+    return {"$cond": [
+        {"$eq": ["$schemaVersion", SCHEMA_VERSION]},
+        {"$ifNull": ["$totalMin", 0]},
+        {"$add": [
+            {"$multiply": [{"$toInt": {"$arrayElemAt": [legacy_hhmm, 0]}}, 60]},
+            {"$toInt": {"$arrayElemAt": [legacy_hhmm, 1]}},
+        ]},
+    ]}
@@ -0,0 +1,507 @@
+import os
+
+from fastapi import HTTPException
+from pymongo import UpdateOne, UpdateMany, DeleteMany, ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app.database import attendance_collection, attendance_monthly_collection
+from app.attendance_codec import decode_attendance, decode_many, encode_times, open_checkin_filter
+from app.attendance_utils import ATTENDANCE_STATUSES
+from app.sync_sequence import next_sync_stamp, record_deletes
+
+
+# "daily"   -> one document per employee per day (attendance)
+# "monthly" -> one bucket per employee per month with embedded days and
+#              precomputed status counters (attendance_monthly)
+ATTENDANCE_STORAGE = os.getenv("HRMS_ATTENDANCE_STORAGE", "daily").lower()
+
+# sync feed / tombstone name of attendance days, whatever the layout
+ATTENDANCE_FEED = "attendance"
+
+# rounds of re-reading days that changed while a leave was being removed
+LEAVE_DAY_RETRIES = 3
+
+
+def _empty_counts():
+    return {s: 0 for s in ATTENDANCE_STATUSES}
+
+
+def _leave_day(leave_id: str):
+    # fields of an attendance day created by an approved leave (no check-in)
+    return {
+        "status": "Leave",
+        **encode_times(None, None),
+        "checkInLocation": None,
+        "checkOutLocation": None,
+        "leaveId": leave_id,
+        "createdByLeave": True,
+    }
+
+
+def _has_checkin(day_doc: dict):
+    return bool(decode_attendance(dict(day_doc)).get("checkInTime"))
+
+
+def _day_keys(employee_id: str, days):
+    return [{"employeeId": employee_id, "date": d} for d in days]
+
+
+def _date_match(start: str | None, end: str | None):
+    cond = {}
+    if start:
+        cond["$gte"] = start
+    if end:
+        cond["$lte"] = end
+    return cond
+
+
+class DailyAttendanceStore:
+    """
+    Repository for attendance days. Endpoints only talk to this interface,
+    so the physical layout can change without touching them.
+    All reads return the API shape (HH:MM strings, no _id).
+    """
+
+    name = "daily"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        self.collection.create_index([("employeeId", ASCENDING), ("date", DESCENDING)])
+        self.collection.create_index([("date", ASCENDING)])
+        self.collection.create_index([("syncSeq", ASCENDING)])
+
+    # ---- pipeline building: day-level documents with employeeId ----
+    def _day_pipeline(self, match: dict):
+        return [{"$match": match}]
+
+    def aggregate(self, match: dict, stages: list | None = None):
+        """Runs `stages` over day-level documents matching `match`."""
+        return list(self.collection.aggregate(self._day_pipeline(match) + (stages or [])))
+
+    # ---- reads ----
+    def find_one(self, employee_id: str, day: str):
+        rows = self.aggregate(
+            {"employeeId": employee_id, "date": day},
+            [{"$limit": 1}, {"$project": {"_id": 0}}],
+        )
+        return decode_many(rows)[0] if rows else None
+
+    def find(self, employee_id: str | None = None, start: str | None = None,
+             end: str | None = None, newest_first: bool = False):
+        match = {}
+        if employee_id:
+            match["employeeId"] = employee_id
+        if start or end:
+            match["date"] = _date_match(start, end)
+
+        stages = [{"$sort": {"date": -1}}] if newest_first else []
+        stages.append({"$project": {"_id": 0}})
+        return decode_many(self.aggregate(match, stages))
+
+    def status_counts(self, employee_id: str | None = None, start: str | None = None, end: str | None = None):
+        match = {}
+        if employee_id:
+            match["employeeId"] = employee_id
+        if start or end:
+            match["date"] = _date_match(start, end)
+
+        summary = _empty_counts()
+        for r in self.aggregate(match, [{"$group": {"_id": "$status", "n": {"$sum": 1}}}]):
+            if r["_id"] in summary:
+                summary[r["_id"]] = r["n"]
+        return summary
+
+    def open_checkins(self, day, office_ids: list):
+        # `day`: a date or a date condition, e.g. {"$lt": "2026-03-02"}
+        match = {
+            "date": day,
+            "checkInLocation.officeId": {"$in": office_ids},
+            **open_checkin_filter(),
+        }
+        return decode_many(self.aggregate(match, [{"$project": {
+            "_id": 0, "employeeId": 1, "date": 1,
+            "schemaVersion": 1, "checkInMin": 1, "checkInTime": 1,
+        }}]))
+
+    def changes_since(self, seq, limit: int | None = None):
+        """Days whose syncSeq matches `seq` (a number or a condition), oldest change first."""
+        stages = [{"$sort": {"syncSeq": 1}}]
+        if limit:
+            stages.append({"$limit": limit})
+        stages.append({"$project": {"_id": 0}})
+        return decode_many(self.aggregate({"syncSeq": seq}, stages))
+
+    # ---- writes ----
+    # every write stamps the days it touches for the sync feed
+    def insert(self, doc: dict):
+        self.collection.insert_one({**doc, **next_sync_stamp()})
+
+    def update(self, employee_id: str, day: str, set_fields: dict, unset_fields: dict | None = None):
+        update = {"$set": {**set_fields, **next_sync_stamp()}}
+        if unset_fields:
+            update["$unset"] = unset_fields
+        result = self.collection.update_one({"employeeId": employee_id, "date": day}, update)
+        return result.matched_count > 0
+
+    def bulk_update(self, updates: list):
+        """
+        updates: [(employee_id, day, set_fields, unset_fields)].
+        One bulk_write; must not change `status` (counters aren't adjusted).
+        """
+        if not updates:
+            return 0
+
+        stamp = next_sync_stamp()
+        ops = []
+        for employee_id, day, set_fields, unset_fields in updates:
+            update = {"$set": {**set_fields, **stamp}}
+            if unset_fields:
+                update["$unset"] = unset_fields
+            ops.append(UpdateOne({"employeeId": employee_id, "date": day}, update))
+        return self.collection.bulk_write(ops, ordered=False).modified_count
+
+    def delete_employee(self, employee_id: str, limit: int | None = None):
+        """Deletes up to `limit` of the employee's documents; returns how many went."""
+        cursor = self.collection.find({"employeeId": employee_id}, {"date": 1})
+        docs = list(cursor.limit(limit) if limit else cursor)
+        if not docs:
+            return 0
+        # tombstones before the delete (see employee_purge._keyed_batches)
+        record_deletes(ATTENDANCE_FEED, _day_keys(employee_id, [d["date"] for d in docs]))
+        self.collection.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+        return len(docs)
+
+    # ---- leave propagation ----
+    def upsert_leave_days(self, employee_id: str, days: list, leave_id: str, session=None):
+        """
+        Marks `days` as status "Leave" for an approved leave with one
+        bulk_write. Missing days are inserted; days with a check-in are left
+        alone; other existing days remember their previous status.
+        """
+        existing = {
+            d["date"]: d
+            for d in self.collection.find(
+                {"employeeId": employee_id, "date": {"$in": days}}, {"_id": 0}, session=session
+            )
+        }
+
+        stamp = next_sync_stamp()
+        ops = []
+        for day in days:
+            current = existing.get(day)
+            if current is None:
+                ops.append(UpdateOne(
+                    {"employeeId": employee_id, "date": day},
+                    {"$setOnInsert": {**_leave_day(leave_id), **stamp}},
+                    upsert=True,
+                ))
+            elif not _has_checkin(current) and current.get("status") != "Leave":
+                ops.append(UpdateOne(
+                    {"employeeId": employee_id, "date": day},
+                    {"$set": {
+                        "status": "Leave",
+                        "leaveId": leave_id,
+                        "statusBeforeLeave": current.get("status"),
+                        **stamp,
+                    }},
+                ))
+
+        if not ops:
+            return 0
+        result = self.collection.bulk_write(ops, ordered=False, session=session)
+        return result.upserted_count + result.modified_count
+
+    def remove_leave_days(self, employee_id: str, leave_id: str, session=None):
+        """Undoes upsert_leave_days (leave rejected after approval)."""
+        created = {"employeeId": employee_id, "leaveId": leave_id, "createdByLeave": True}
+        removed = [d["date"] for d in self.collection.find(created, {"_id": 0, "date": 1}, session=session)]
+
+        stamp = next_sync_stamp()
+        result = self.collection.bulk_write([
+            DeleteMany(created),
+            UpdateMany(
+                {"employeeId": employee_id, "leaveId": leave_id},
+                [
+                    {"$set": {"status": {"$ifNull": ["$statusBeforeLeave", "Absent"]}, **stamp}},
+                    {"$unset": ["statusBeforeLeave", "leaveId"]},
+                ],
+            ),
+        ], ordered=True, session=session)
+        record_deletes(ATTENDANCE_FEED, _day_keys(employee_id, removed), stamp, session=session)
+        return result.deleted_count + result.modified_count
+
+    # ---- whole-month maintenance (archival) ----
+    def oldest_month(self):
+        doc = self.collection.find_one({}, {"date": 1}, sort=[("date", ASCENDING)])
+        return doc["date"][:7] if doc else None
+
+    def delete_month(self, month: str):
+        # moved to the cold tier, not deleted: no sync tombstones
+        # "YYYY-MM"; "-31" sorts after every valid day of the month
+        query = {"date": {"$gte": f"{month}-01", "$lte": f"{month}-31"}}
+        return self.collection.delete_many(query).deleted_count
+
+
+class MonthlyBucketAttendanceStore(DailyAttendanceStore):
+    """
+    Bucket pattern: {_id: "EMP001:2026-03", employeeId, month: "2026-03",
+    days: [{date, status, checkInMin, ...}], counts: {Present: n, ...},
+    syncSeq: newest syncSeq of its days}.
+    An employee's year of history is 12 documents instead of ~250.
+    """
+
+    name = "monthly"
+
+    def ensure_indexes(self):
+        self.collection.create_index([("employeeId", ASCENDING), ("month", DESCENDING)])
+        self.collection.create_index([("month", ASCENDING)])
+        self.collection.create_index([("syncSeq", ASCENDING)])
+
+    @staticmethod
+    def bucket_id(employee_id: str, day: str):
+        return f"{employee_id}:{day[:7]}"
+
+    @staticmethod
+    def _bucket_prefilter(match: dict):
+        # narrow buckets by employee and month before unwinding days
+        pre = {}
+        if "employeeId" in match:
+            pre["employeeId"] = match["employeeId"]
+
+        d = match.get("date")
+        if isinstance(d, str):
+            pre["month"] = d[:7]
+        elif isinstance(d, dict):
+            month = {}
+            if "$gte" in d:
+                month["$gte"] = d["$gte"][:7]
+            if "$gt" in d:
+                month["$gte"] = d["$gt"][:7]
+            for op in ("$lte", "$lt"):
+                if op in d:
+                    month["$lte"] = d[op][:7]
+            if month:
+                pre["month"] = month
+
+        # a bucket carries the newest syncSeq of its days: only lower bounds narrow it
+        seq = match.get("syncSeq")
+        if isinstance(seq, int):
+            pre["syncSeq"] = {"$gte": seq}
+        elif isinstance(seq, dict):
+            lower = {k: v for k, v in seq.items() if k in ("$gt", "$gte")}
+            if lower:
+                pre["syncSeq"] = lower
+        return pre
+
+    def _day_pipeline(self, match: dict):
+        return [
+            {"$match": self._bucket_prefilter(match)},
+            {"$unwind": "$days"},
+            {"$replaceRoot": {"newRoot": {"$mergeObjects": ["$days", {"employeeId": "$employeeId"}]}}},
+            {"$match": match},
+        ]
+
+    def status_counts(self, employee_id: str | None = None, start: str | None = None, end: str | None = None):
+        if start or end:
+            return super().status_counts(employee_id, start, end)
+
+        # whole history -> just add up the per-month counters
+        match = {"employeeId": employee_id} if employee_id else {}
+        group = {"_id": None, **{s: {"$sum": f"$counts.{s}"} for s in ATTENDANCE_STATUSES}}
+        rows = list(self.collection.aggregate([{"$match": match}, {"$group": group}]))
+
+        summary = _empty_counts()
+        if rows:
+            summary.update({s: rows[0][s] for s in ATTENDANCE_STATUSES})
+        return summary
+
+    def insert(self, doc: dict):
+        stamp = next_sync_stamp()
+        day = {**{k: v for k, v in doc.items() if k != "employeeId"}, **stamp}
+        try:
+            self.collection.update_one(
+                {"_id": self.bucket_id(doc["employeeId"], doc["date"]), "days.date": {"$ne": doc["date"]}},
+                {
+                    "$setOnInsert": {"employeeId": doc["employeeId"], "month": doc["date"][:7]},
+                    "$push": {"days": day},
+                    "$inc": {f"counts.{doc['status']}": 1},
+                    "$max": {"syncSeq": stamp["syncSeq"]},
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # bucket exists and already holds this date
+            raise HTTPException(status_code=409, detail="Attendance already exists for this date")
+
+    def _positional_update(self, set_fields: dict, unset_fields: dict | None):
+        update = {"$set": {f"days.$.{k}": v for k, v in set_fields.items()}}
+        if unset_fields:
+            update["$unset"] = {f"days.$.{k}": "" for k in unset_fields}
+        if "syncSeq" in set_fields:
+            update["$max"] = {"syncSeq": set_fields["syncSeq"]}
+        return update
+
+    def update(self, employee_id: str, day: str, set_fields: dict, unset_fields: dict | None = None):
+        bucket_filter = {"_id": self.bucket_id(employee_id, day), "days.date": day}
+
+        current = self.collection.find_one(bucket_filter, {"days.$": 1})
+        if not current:
+            return False
+
+        update = self._positional_update({**set_fields, **next_sync_stamp()}, unset_fields)
+
+        # keep the month counters in step with status changes
+        old_status = current["days"][0].get("status")
+        new_status = set_fields.get("status")
+        if new_status and new_status != old_status:
+            update["$inc"] = {f"counts.{new_status}": 1}
+            if old_status:
+                update["$inc"][f"counts.{old_status}"] = -1
+
+        self.collection.update_one(bucket_filter, update)
+        return True
+
+    def upsert_leave_days(self, employee_id: str, days: list, leave_id: str, session=None):
+        buckets = {
+            b["_id"]: {d["date"]: d for d in b.get("days", [])}
+            for b in self.collection.find(
+                {"_id": {"$in": list({self.bucket_id(employee_id, d) for d in days})}},
+                {"days": 1},
+                session=session,
+            )
+        }
+
+        stamp = next_sync_stamp()
+        ops = []
+        for day in days:
+            bid = self.bucket_id(employee_id, day)
+            current = buckets.get(bid, {}).get(day)
+            if current is None:
+                ops.append(UpdateOne(
+                    {"_id": bid, "days.date": {"$ne": day}},
+                    {
+                        "$setOnInsert": {"employeeId": employee_id, "month": day[:7]},
+                        "$push": {"days": {"date": day, **_leave_day(leave_id), **stamp}},
+                        "$inc": {"counts.Leave": 1},
+                        "$max": {"syncSeq": stamp["syncSeq"]},
+                    },
+                    upsert=True,
+                ))
+            elif not _has_checkin(current) and current.get("status") != "Leave":
+                ops.append(UpdateOne(
+                    {"_id": bid, "days.date": day},
+                    {
+                        "$set": {
+                            "days.$.status": "Leave",
+                            "days.$.leaveId": leave_id,
+                            "days.$.statusBeforeLeave": current.get("status"),
+                            **{f"days.$.{k}": v for k, v in stamp.items()},
+                        },
+                        "$inc": {f"counts.{current.get('status')}": -1, "counts.Leave": 1},
+                        "$max": {"syncSeq": stamp["syncSeq"]},
+                    },
+                ))
+
+        if not ops:
+            return 0
+        # ordered: several new days may land in the same (new) bucket
+        result = self.collection.bulk_write(ops, ordered=True, session=session)
+        return result.upserted_count + result.modified_count
+
+    def remove_leave_days(self, employee_id: str, leave_id: str, session=None):
+        """
+        Undoes upsert_leave_days one day element at a time: days the leave
+        created are $pull-ed, the others get their previous status back, and
+        counts move by $inc. Each update matches the day's status as read, so
+        a check-in landing in the same bucket is never overwritten; a day that
+        changed in between is re-read and retried.
+        """
+        stamp = next_sync_stamp()
+        changed = 0
+        removed = []
+        for _ in range(LEAVE_DAY_RETRIES):
+            pending = [
+                (b["_id"], d)
+                for b in self.collection.find(
+                    {"employeeId": employee_id, "days.leaveId": leave_id}, {"days": 1}, session=session
+                )
+                for d in b["days"]
+                if d.get("leaveId") == leave_id
+            ]
+            if not pending:
+                break
+
+            for bid, d in pending:
+                status = d.get("status")
+                day_filter = {"_id": bid, "days": {"$elemMatch": {
+                    "date": d["date"], "leaveId": leave_id, "status": status,
+                }}}
+                if d.get("createdByLeave"):
+                    update = {
+                        "$pull": {"days": {"date": d["date"], "leaveId": leave_id}},
+                        "$inc": {f"counts.{status}": -1},
+                        "$max": {"syncSeq": stamp["syncSeq"]},
+                    }
+                else:
+                    restored = d.get("statusBeforeLeave") or "Absent"
+                    update = {
+                        "$set": {"days.$.status": restored, **{f"days.$.{k}": v for k, v in stamp.items()}},
+                        "$unset": {"days.$.leaveId": "", "days.$.statusBeforeLeave": ""},
+                        "$max": {"syncSeq": stamp["syncSeq"]},
+                    }
+                    if restored != status:
+                        update["$inc"] = {f"counts.{status}": -1, f"counts.{restored}": 1}
+
+                if self.collection.update_one(day_filter, update, session=session).modified_count:
+                    changed += 1
+                    if d.get("createdByLeave"):
+                        removed.append(d["date"])
+
+        record_deletes(ATTENDANCE_FEED, _day_keys(employee_id, removed), stamp, session=session)
+        return changed
+
+    def delete_employee(self, employee_id: str, limit: int | None = None):
+        # `limit` counts buckets here, i.e. months
+        cursor = self.collection.find({"employeeId": employee_id}, {"days.date": 1})
+        buckets = list(cursor.limit(limit) if limit else cursor)
+        if not buckets:
+            return 0
+        days = [d["date"] for b in buckets for d in b.get("days", [])]
+        record_deletes(ATTENDANCE_FEED, _day_keys(employee_id, days))
+        self.collection.delete_many({"_id": {"$in": [b["_id"] for b in buckets]}})
+        return len(buckets)
+
+    def oldest_month(self):
+        doc = self.collection.find_one({}, {"month": 1}, sort=[("month", ASCENDING)])
+        return doc["month"] if doc else None
+
+    def delete_month(self, month: str):
+        return self.collection.delete_many({"month": month}).deleted_count
+
+    def bulk_update(self, updates: list):
+        if not updates:
+            return 0
+
+        stamp = next_sync_stamp()
+        ops = [
+            UpdateOne(
+                {"_id": self.bucket_id(employee_id, day), "days.date": day},
+                self._positional_update({**set_fields, **stamp}, unset_fields),
+            )
+            for employee_id, day, set_fields, unset_fields in updates
+        ]
+        return self.collection.bulk_write(ops, ordered=False).modified_count
+
+
+def get_attendance_store(kind: str | None = None):
+    kind = (kind or ATTENDANCE_STORAGE).lower()
+    if kind == "monthly":
+        return MonthlyBucketAttendanceStore(attendance_monthly_collection)
+    if kind == "daily":
+        return DailyAttendanceStore(attendance_collection)
+    raise ValueError(f"Unknown attendance storage: {kind}")
+
+
+attendance_store = get_attendance_store()
@@ -0,0 +1,133 @@
+import logging
+import math
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+ATTENDANCE_STATUSES = ("Present", "Absent", "Half-Day", "Leave")
+DEFAULT_RADIUS_METERS = 300
+
+
+# -----------------------
+# Time calculation
+# -----------------------
+def time_to_minutes(t: str):
+    # "09:10" -> 550
+    h, m = t.split(":")
+    return int(h) * 60 + int(m)
+
+
+def minutes_to_hhmm(total_minutes: int):
+    h = total_minutes // 60
+    m = total_minutes % 60
+    return f"{h:02d}:{m:02d}"
+
+
+# -----------------------
+# Status counting
+# -----------------------
+def count_statuses(records, keys=ATTENDANCE_STATUSES):
+    # [{"status": "Present"}, ...] -> {"Present": 1, "Absent": 0, ...}
+    summary = {k: 0 for k in keys}
+    for r in records:
+        if r["status"] in summary:
+            summary[r["status"]] += 1
+    return summary
+
+
+def count_statuses_by_date(records, keys=ATTENDANCE_STATUSES):
+    # -> [{"date": "2026-03-02", "Present": 3, ...}, ...] sorted by date
+    grouped = {}
+    for r in records:
+        d = r["date"]
+        if d not in grouped:
+            grouped[d] = {"date": d, **{k: 0 for k in keys}}
+        if r["status"] in grouped[d]:
+            grouped[d][r["status"]] += 1
+    return sorted(grouped.values(), key=lambda x: x["date"])
+
+
+# -----------------------
+# Location
+# -----------------------
+def haversine_distance_m(lat1, lng1, lat2, lng2):
+    R = 6371000  # meters
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lng2 - lng1)
+
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return R * c
+
+
+def match_office_location(lat, lng, offices: list, selected_office_id=None, action="Check-in"):
+    """
+    Pure part of geo-fence validation: picks the selected (or nearest) office
+    from an already-fetched list of active offices and checks the radius.
+    Returns office metadata if valid.
+    """
+
+    if not offices:
+        raise HTTPException(status_code=400, detail="No active office branches found")
+
+    # If employee selected officeId
+    if selected_office_id:
+        office = next((o for o in offices if o.get("officeId") == selected_office_id), None)
+        if not office:
+            raise HTTPException(status_code=400, detail="Selected office branch not found")
+
+        dist = haversine_distance_m(lat, lng, office["lat"], office["lng"])
+        allowed_radius = office.get("radiusMeters", DEFAULT_RADIUS_METERS)
+
+        logger.debug("office distance check", extra={
+            "officeId": office["officeId"],
+            "employeeLatLng": [lat, lng],
+            "officeLatLng": [office["lat"], office["lng"]],
+            "distanceMeters": round(dist, 2),
+            "allowedRadiusMeters": allowed_radius,
+        })
+
+        if dist > allowed_radius:
+            raise HTTPException(
+                status_code=403,
+                detail=f"{action} denied. You are {int(dist)}m away from {office['officeName']} (allowed {allowed_radius}m)"
+            )
+
+        return {
+            "officeId": office["officeId"],
+            "officeName": office["officeName"],
+            "distanceMeters": round(dist, 2),
+        }
+
+    # Else: auto-detect nearest office
+    nearest = None
+    nearest_dist = 999999999
+
+    for o in offices:
+        dist = haversine_distance_m(lat, lng, o["lat"], o["lng"])
+        if dist < nearest_dist:
+            nearest_dist = dist
+            nearest = o
+
+    # Validate nearest office radius
+    allowed_radius = nearest.get("radiusMeters", DEFAULT_RADIUS_METERS)
+
+    if nearest_dist > allowed_radius:
+        raise HTTPException(
+            status_code=403,
+            detail=f"{action} denied. Not in any office area (nearest: {nearest['officeName']} {int(nearest_dist)}m away)"
+        )
+
+    return {
+        "officeId": nearest["officeId"],
+        "officeName": nearest["officeName"],
+        "distanceMeters": round(nearest_dist, 2),
+    }
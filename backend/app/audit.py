@@ -0,0 +1,170 @@
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.database import audit_log_collection
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------
+# Audit log
+# -----------------------
+# Append-only history of sensitive changes: who changed what, when, and the
+# before -> after value of every changed field. Handlers call
+# audit_log.record(...) after their write; the entry goes into an in-memory
+# queue and a background writer stores it with insert_many, so auditing
+# adds no round trip to the request.
+#
+# Entries still queued when a process is killed (not shut down) are lost;
+# when the queue is full new entries are dropped and counted in stats().
+AUDIT_QUEUE_SIZE = int(os.getenv("HRMS_AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("HRMS_AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("HRMS_AUDIT_FLUSH_SECONDS", "1"))
+
+DEFAULT_AUDIT_LIMIT = 100
+MAX_AUDIT_LIMIT = 1000
+
+# values never stored, only the fact that they changed
+REDACTED_FIELDS = {"password"}
+REDACTED = "[redacted]"
+
+
+def ensure_audit_indexes():
+    audit_log_collection.create_index([("entity", ASCENDING), ("entityId", ASCENDING), ("at", DESCENDING)])
+    audit_log_collection.create_index([("actor", ASCENDING), ("at", DESCENDING)])
+    audit_log_collection.create_index([("at", DESCENDING)])
+
+
+def diff(before: dict | None, after: dict | None):
+    """{field: {"from": old, "to": new}} for every field whose value changed."""
+    before, after = before or {}, after or {}
+    changes = {}
+    for field in sorted(set(before) | set(after)):
+        old, new = before.get(field), after.get(field)
+        if old == new:
+            continue
+        if field in REDACTED_FIELDS:
+            old, new = (REDACTED if old is not None else None), REDACTED
+        changes[field] = {"from": old, "to": new}
+    return changes
+
+
+class AuditLog:
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"written": 0, "dropped": 0, "failedWrites": 0}
+
+    def record(self, action: str, entity: str, entity_id: str, actor: str,
+               before: dict | None = None, after: dict | None = None, meta: dict | None = None):
+        entry = {
+            "at": datetime.utcnow(),
+            "actor": actor,
+            "action": action,
+            "entity": entity,
+            "entityId": entity_id,
+            "changes": diff(before, after),
+        }
+        if meta:
+            entry["meta"] = meta
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+
+    # ---- background writer ----
+    def _take_batch(self, timeout: float):
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < AUDIT_BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list):
+        try:
+            audit_log_collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # some entries landed (or were inserted by an earlier try): never retry
+            with self._lock:
+                self._stats["written"] += e.details.get("nInserted", 0)
+                self._stats["failedWrites"] += 1
+            return True
+        except PyMongoError as e:
+            with self._lock:
+                self._stats["failedWrites"] += 1
+            logger.warning("could not write audit entries", extra={"entries": len(batch), "error": str(e)})
+            return False
+        with self._lock:
+            self._stats["written"] += len(batch)
+        return True
+
+    def _run(self):
+        pending = []
+        while not self._stop.is_set():
+            pending = pending or self._take_batch(AUDIT_FLUSH_SECONDS)
+            if pending and self._write(pending):
+                pending = []
+            elif pending:
+                # keep the batch for the next round; Mongo may be back by then
+                self._stop.wait(AUDIT_FLUSH_SECONDS)
+
+        # shutdown: flush what is left
+        while pending or not self._queue.empty():
+            pending = pending or self._take_batch(0)
+            if not pending or not self._write(pending):
+                break
+            pending = []
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "queued": self._queue.qsize()}
+
+
+audit_log = AuditLog()
+
+
+def query_audit(actor: str | None = None, entity: str | None = None, entity_id: str | None = None,
+                start: datetime | None = None, end: datetime | None = None, limit: int = DEFAULT_AUDIT_LIMIT):
+    query = {}
+    if actor:
+        query["actor"] = actor
+    if entity:
+        query["entity"] = entity
+    if entity_id:
+        query["entityId"] = entity_id
+    if start or end:
+        query["at"] = {}
+        if start:
+            query["at"]["$gte"] = start
+        if end:
+            query["at"]["$lte"] = end
+
+    limit = max(1, min(limit, MAX_AUDIT_LIMIT))
+    return list(audit_log_collection.find(query, {"_id": 0}).sort("at", -1).limit(limit))
@@ -0,0 +1,60 @@
+import threading
+
+from app.database import office_collection, settings_collection
+from app.invalidation import invalidation_bus
+
+
+# -----------------------
+# Cached settings / offices
+# -----------------------
+# Read on every check-in (geo-fencing) and every payroll run, written a few
+# times a year. Cached per worker and dropped by the invalidation bus when
+# any worker writes the collection.
+class CachedLoader:
+    def __init__(self, loader):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._values = {}
+        self._generation = 0
+
+    def get(self, key=None):
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            generation = self._generation
+
+        value = self._loader(key)
+        with self._lock:
+            # don't store a value loaded before an invalidation that raced with it
+            if generation == self._generation:
+                self._values[key] = value
+        return value
+
+    def invalidate(self, change=None):
+        with self._lock:
+            self._values = {}
+            self._generation += 1
+
+
+_settings = CachedLoader(lambda key: settings_collection.find_one({"key": key}, {"_id": 0}))
+_active_offices = CachedLoader(lambda _: list(office_collection.find({"isActive": True}, {"_id": 0})))
+_offices_by_id = CachedLoader(lambda office_id: office_collection.find_one({"officeId": office_id}, {"_id": 0}))
+
+invalidation_bus.subscribe(settings_collection.name, _settings.invalidate)
+invalidation_bus.subscribe(office_collection.name, _active_offices.invalidate)
+invalidation_bus.subscribe(office_collection.name, _offices_by_id.invalidate)
+
+
+def get_setting(key: str):
+    """Settings document for `key` (or None). Treat as read-only."""
+    return _settings.get(key)
+
+
+def active_offices():
+    """All active offices. Treat as read-only."""
+    return _active_offices.get()
+
+
+def get_office(office_id: str):
+    """One office (active or not), or None. Treat as read-only."""
+    return _offices_by_id.get(office_id)
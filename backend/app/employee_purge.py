@@ -0,0 +1,157 @@
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from app.database import (
+    employee_collection,
+    leaves_collection,
+    payslips_collection,
+    leave_balances_collection,
+    run_transaction,
+)
+from app.attendance_store import attendance_store
+from app.attendance_archive import delete_employee_archived
+from app.invalidation import invalidation_bus
+from app.leave_balance import apply_status_change, leave_days_by_year
+from app.leave_engine import leave_engine
+from app.sync_sequence import next_sync_stamp, record_deletes
+
+
+# -----------------------
+# Employee deletion
+# -----------------------
+# DELETE /api/employees/{id} only deactivates: the employee document stays
+# with status INACTIVE and without email / password, so nothing logs in as
+# or resolves to it, and an "employee_purge" job is queued for the end of
+# the retention hold. The job removes attendance, leaves and payslips in
+# batches of PURGE_BATCH_SIZE documents, pausing between batches so
+# foreground requests keep the database, and deletes the employee
+# document last. Pending leaves are rejected at deactivation, so they stop
+# reserving balance and leave the approvers' queues. Archived attendance is purged by rewriting each archive
+# block that holds the employee's rows. Every batch stands on its own: a retried job continues
+# where the previous attempt stopped.
+#
+# HRMS_EMPLOYEE_RETENTION_DAYS: default hold before the purge (0 = right away)
+EMPLOYEE_RETENTION_DAYS = int(os.getenv("HRMS_EMPLOYEE_RETENTION_DAYS", "0"))
+PURGE_BATCH_SIZE = int(os.getenv("HRMS_PURGE_BATCH_SIZE", "500"))
+PURGE_BATCH_PAUSE_SECONDS = float(os.getenv("HRMS_PURGE_BATCH_PAUSE_SECONDS", "0.2"))
+
+
+def deactivate_employee(emp: dict, hold_days: int | None = None):
+    """Marks the employee INACTIVE; returns when its data may be purged."""
+    now = datetime.utcnow()
+    hold = EMPLOYEE_RETENTION_DAYS if hold_days is None else hold_days
+    purge_after = now + timedelta(days=max(hold, 0))
+
+    employee_collection.update_one(
+        {"employeeId": emp["employeeId"]},
+        {
+            "$set": {
+                "status": "INACTIVE",
+                "formerEmail": emp.get("email"),
+                "deactivatedAt": now.isoformat(),
+                "purgeAfter": purge_after.isoformat(),
+                **next_sync_stamp(),
+            },
+            "$unset": {"email": "", "password": ""},
+        },
+    )
+    reject_pending_leaves(emp["employeeId"])
+    # out of the team calendar / overlap checks straight away
+    leave_engine.on_employee_removed(emp["employeeId"])
+    return purge_after
+
+
+def reject_pending_leaves(employee_id: str):
+    """Rejects the employee's PENDING leaves, releasing their ledger days; returns the leaveIds."""
+    rejected = []
+    for leave in leaves_collection.find({"employeeId": employee_id, "status": "PENDING"}):
+        days_by_year = leave.get("daysByYear") or leave_days_by_year(
+            date.fromisoformat(leave["startDate"]), date.fromisoformat(leave["endDate"])
+        )
+        old_status = "PENDING" if leave.get("ledgerApplied") else None
+
+        def save(session, leave=leave, days_by_year=days_by_year, old_status=old_status):
+            result = leaves_collection.update_one(
+                {"leaveId": leave["leaveId"], "status": "PENDING"},
+                {"$set": {
+                    "status": "REJECTED",
+                    "remark": "Employee deactivated",
+                    "daysByYear": days_by_year,
+                    "ledgerApplied": True,
+                    **next_sync_stamp(),
+                }},
+                session=session,
+            )
+            if result.matched_count == 0:
+                return False        # actioned meanwhile; its ledger moved with that action
+            apply_status_change(employee_id, days_by_year, old_status, "REJECTED", session=session)
+            return True
+
+        if run_transaction(save):
+            rejected.append(leave["leaveId"])
+
+    if rejected:
+        invalidation_bus.notify(leaves_collection.name)
+    return rejected
+
+
+def held_employee_error(emp: dict):
+    """Message for a create that collides with an INACTIVE employee still in its hold."""
+    return (
+        f"Employee {emp['employeeId']} was deactivated and is held until "
+        f"{emp.get('purgeAfter', '?')}; its ID and email are free once it is purged"
+    )
+
+
+def _keyed_batches(collection, employee_id: str, key: str):
+    """Batch deleter for a collection whose documents carry a public key (tombstone)."""
+    def delete_batch(limit: int):
+        docs = list(collection.find({"employeeId": employee_id}, {"_id": 1, key: 1}).limit(limit))
+        if not docs:
+            return 0
+        # tombstones first: rewriting them is harmless, a delete nobody hears of is not
+        record_deletes(collection.name, [{key: d[key]} for d in docs if key in d])
+        collection.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+        return len(docs)
+
+    return delete_batch
+
+
+def _purge(ctx, label: str, delete_batch):
+    removed = 0
+    while n := delete_batch(PURGE_BATCH_SIZE):
+        removed += n
+        ctx.progress(removed, None, f"{label}: {removed} removed")
+        time.sleep(PURGE_BATCH_PAUSE_SECONDS)
+    return removed
+
+
+def purge_employee(ctx, employeeId: str):
+    """Job handler ("employee_purge")."""
+    emp = employee_collection.find_one({"employeeId": employeeId}, {"status": 1, "purgeAfter": 1})
+    if emp is not None:
+        if emp.get("status") != "INACTIVE":
+            return {"employeeId": employeeId, "purged": False, "reason": "Employee is active"}
+        if emp.get("purgeAfter", "") > datetime.utcnow().isoformat():
+            return {"employeeId": employeeId, "purged": False, "reason": f"On hold until {emp['purgeAfter']}"}
+
+    removed = {
+        "attendance": _purge(
+            ctx, "attendance",
+            lambda limit: attendance_store.delete_employee(employeeId, limit),
+        ),
+        "archivedAttendanceBlocks": _purge(
+            ctx, "archived attendance",
+            lambda limit: delete_employee_archived(employeeId, limit),
+        ),
+        "leaves": _purge(ctx, "leaves", _keyed_batches(leaves_collection, employeeId, "leaveId")),
+        "payslips": _purge(ctx, "payslips", _keyed_batches(payslips_collection, employeeId, "payslipId")),
+    }
+    leave_balances_collection.delete_many({"employeeId": employeeId})
+
+    if employee_collection.delete_one({"employeeId": employeeId}).deleted_count:
+        record_deletes(employee_collection.name, [{"employeeId": employeeId}])
+        invalidation_bus.notify(employee_collection.name)
+
+    return {"employeeId": employeeId, "purged": True, "removed": removed}
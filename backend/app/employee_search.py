@@ -0,0 +1,378 @@
+import heapq
+import os
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+from pymongo import TEXT
+from pymongo.errors import OperationFailure
+
+from app.database import employee_collection, ACTIVE_EMPLOYEES
+from app.invalidation import invalidation_bus
+
+
+# -----------------------
+# Employee typeahead
+# -----------------------
+# In-memory index over the directory fields, per field:
+#   postings : token -> [doc idx]          (exact word match)
+#   tokens   : sorted distinct tokens       (bisect -> every token with a prefix)
+#   trigrams : trigram -> {doc idx}         (inside a word, fullName / email only,
+#                                            e.g. "kumar" in "Rajkumar"; word
+#                                            starts are already prefix hits)
+# A hit scores FIELD_WEIGHTS[field] * MATCH_WEIGHTS[kind]; ties go by name
+# (employees added since the last full build sort after the others).
+# One word: walk the (field, kind) levels from the highest score down and
+# stop at `limit` hits, so a short prefix that matches half the company
+# still touches only a handful of documents.
+# Several words: every word must match (AND); each adds its best score.
+#
+# HRMS_EMPLOYEE_SEARCH=memory (default) | mongo (text index only)
+EMPLOYEE_SEARCH = os.getenv("HRMS_EMPLOYEE_SEARCH", "memory").lower()
+
+SEARCH_FIELDS = ("employeeId", "fullName", "email", "designation", "department")
+SUBSTRING_FIELDS = ("fullName", "email")
+FIELD_WEIGHTS = {"employeeId": 5, "fullName": 4, "email": 3, "designation": 2, "department": 1}
+MATCH_WEIGHTS = {"exact": 3, "prefix": 2, "substring": 1}
+
+# (score, field, kind), best first
+SEARCH_LEVELS = sorted(
+    (
+        (FIELD_WEIGHTS[f] * MATCH_WEIGHTS[k], f, k)
+        for f in SEARCH_FIELDS
+        for k in MATCH_WEIGHTS
+        if k != "substring" or f in SUBSTRING_FIELDS
+    ),
+    key=lambda level: (-level[0], level[1], level[2]),
+)
+
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def _words(value: str):
+    return {t for t in _TOKEN_SPLIT.split((value or "").lower()) if t}
+
+
+def _tokens(value: str):
+    tokens = _words(value)
+    value = (value or "").lower()
+    if value and value not in tokens and " " not in value:
+        tokens.add(value)     # whole email / id, e.g. "john.doe@acme.com"
+    return tokens
+
+
+def _trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _infix_trigrams(words: set):
+    grams = set()
+    for w in words:
+        grams |= _trigrams(w[1:])
+    return grams
+
+
+def _public(emp: dict):
+    return {f: emp.get(f) for f in SEARCH_FIELDS}
+
+
+class _Entry:
+    """One indexed employee: public fields plus per-field tokens / words."""
+
+    __slots__ = ("doc", "tokens", "words", "sort_key")
+
+    def __init__(self, doc: dict):
+        self.doc = doc
+        self.tokens = {f: _tokens(doc.get(f)) for f in SEARCH_FIELDS}
+        self.words = {f: _words(doc.get(f)) for f in SUBSTRING_FIELDS}
+        self.sort_key = ((doc.get("fullName") or "").lower(), (doc.get("employeeId") or "").lower())
+
+    def has_infix(self, field: str, token: str):
+        return any(token in w[1:] for w in self.words[field])
+
+
+class EmployeeSearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._building = False
+        self._reset()
+
+    def _reset(self):
+        self._entries = []                                  # idx -> _Entry | None
+        self._by_employee = {}                              # employeeId -> idx
+        self._oids = {}                                     # Mongo _id -> employeeId
+        self._postings = {f: {} for f in SEARCH_FIELDS}     # field -> token -> [idx]
+        self._tokens = {f: [] for f in SEARCH_FIELDS}       # field -> sorted tokens
+        self._trigrams = {f: {} for f in SUBSTRING_FIELDS}  # field -> trigram -> {idx}
+
+    # ---- building ----
+    def rebuild(self):
+        employees = list(employee_collection.find(ACTIVE_EMPLOYEES, {"_id": 1, **{f: 1 for f in SEARCH_FIELDS}}))
+        entries = sorted((_Entry(_public(e)) for e in employees), key=lambda en: en.sort_key)
+        oids = {e["_id"]: e.get("employeeId") for e in employees}
+
+        with self._lock:
+            self._reset()
+            self._oids = oids
+            # idx order = name order, so postings lists are already alphabetical
+            for entry in entries:
+                self._add_locked(entry, keep_sorted=False)
+            for field in SEARCH_FIELDS:
+                self._tokens[field] = sorted(self._postings[field])
+            self._built = True
+
+    @property
+    def ready(self):
+        return self._built
+
+    def build_async(self):
+        """Builds in the background; searches use the text index meanwhile."""
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+
+        def run():
+            try:
+                self.rebuild()
+            finally:
+                self._building = False
+
+        threading.Thread(target=run, name="employee-search-build", daemon=True).start()
+
+    def _add_locked(self, entry: _Entry, keep_sorted: bool = True):
+        idx = len(self._entries)
+        self._entries.append(entry)
+        self._by_employee[entry.doc["employeeId"]] = idx
+
+        for field in SEARCH_FIELDS:
+            postings = self._postings[field]
+            for token in entry.tokens[field]:
+                if token not in postings:
+                    postings[token] = []
+                    if keep_sorted:
+                        insort(self._tokens[field], token)
+                postings[token].append(idx)
+
+        for field in SUBSTRING_FIELDS:
+            grams = self._trigrams[field]
+            for tri in _infix_trigrams(entry.words[field]):
+                grams.setdefault(tri, set()).add(idx)
+
+    def _remove_locked(self, employee_id: str):
+        idx = self._by_employee.pop(employee_id, None)
+        if idx is None:
+            return
+        entry = self._entries[idx]
+        self._entries[idx] = None
+
+        for field in SEARCH_FIELDS:
+            postings = self._postings[field]
+            for token in entry.tokens[field]:
+                ids = postings.get(token)
+                if ids is None:
+                    continue
+                ids.remove(idx)
+                if not ids:
+                    del postings[token]
+                    tokens = self._tokens[field]
+                    i = bisect_left(tokens, token)
+                    if i < len(tokens) and tokens[i] == token:
+                        del tokens[i]
+
+        for field in SUBSTRING_FIELDS:
+            grams = self._trigrams[field]
+            for tri in _infix_trigrams(entry.words[field]):
+                ids = grams.get(tri)
+                if ids:
+                    ids.discard(idx)
+                    if not ids:
+                        del grams[tri]
+
+    # ---- incremental updates ----
+    def upsert(self, employee_id: str, old_employee_id: str | None = None):
+        """Re-index one employee from Mongo (after create / update)."""
+        if not self._built:
+            return      # the next build reads everything anyway
+        e = employee_collection.find_one(
+            {"employeeId": employee_id, **ACTIVE_EMPLOYEES}, {"_id": 1, **{f: 1 for f in SEARCH_FIELDS}}
+        )
+        with self._lock:
+            if old_employee_id:
+                self._remove_locked(old_employee_id)
+            self._remove_locked(employee_id)
+            if e:
+                self._add_locked(_Entry(_public(e)))
+                self._oids[e["_id"]] = employee_id
+
+    def remove(self, employee_id: str):
+        with self._lock:
+            self._remove_locked(employee_id)
+            self._oids = {k: v for k, v in self._oids.items() if v != employee_id}
+
+    def on_change(self, change: dict):
+        """Invalidation bus handler: writes made by other workers."""
+        op = change["operation"]
+        if op == "local":
+            return      # this worker already updated the index incrementally
+
+        key = (change.get("documentKey") or {}).get("_id")
+        if key is not None and op in ("insert", "update", "replace", "delete"):
+            with self._lock:
+                employee_id = self._oids.get(key)
+            if op == "delete":
+                if employee_id:
+                    self.remove(employee_id)
+                return
+            e = employee_collection.find_one({"_id": key}, {"employeeId": 1})
+            if e:
+                self.upsert(e["employeeId"], old_employee_id=employee_id)
+            return
+
+        # polling / resync: no document key, rebuild on next search
+        with self._lock:
+            self._built = False
+
+    # ---- queries ----
+    def _level_lists(self, token: str, field: str, kind: str):
+        """Postings (ascending idx) of one (field, kind) level; lists or one-shot iterators."""
+        if kind == "exact":
+            ids = self._postings[field].get(token)
+            return [ids] if ids else []
+
+        if kind == "prefix":
+            tokens = self._tokens[field]
+            postings = self._postings[field]
+            lists = []
+            i = bisect_left(tokens, token)
+            while i < len(tokens) and tokens[i].startswith(token):
+                if tokens[i] != token:
+                    lists.append(postings[tokens[i]])
+                i += 1
+            return lists
+
+        # verified lazily: a one-word search usually needs only the first few
+        candidates = sorted(self._infix_candidates(token, field))
+        if not candidates:
+            return []
+        entries = self._entries
+        return [(i for i in candidates if entries[i].has_infix(field, token))]
+
+    def _infix_candidates(self, token: str, field: str):
+        """Docs holding every trigram of `token` inside a word (unverified)."""
+        if len(token) < 3:
+            return set()
+        grams = sorted((self._trigrams[field].get(g, ()) for g in _trigrams(token)), key=len)
+        if not grams[0]:
+            return set()
+        return set(grams[0]).intersection(*grams[1:])
+
+    def _search_one(self, token: str, limit: int):
+        # postings are in idx (= name) order, so each level is a lazy merge
+        # and only the first `limit` unseen ids are ever touched
+        seen = set()
+        results = []
+        for score, field, kind in SEARCH_LEVELS:
+            lists = self._level_lists(token, field, kind)
+            if not lists:
+                continue
+            level = []
+            for i in (lists[0] if len(lists) == 1 else heapq.merge(*lists)):
+                if i not in seen:
+                    seen.add(i)
+                    level.append(i)
+                    if len(results) + len(level) == limit:
+                        break
+            results.extend((score, i) for i in level)
+            if len(results) == limit:
+                break
+        return results
+
+    def _level_sets(self, token: str):
+        """[(score, field, kind, {idx})] for every level; substring sets unverified."""
+        levels = []
+        for score, field, kind in SEARCH_LEVELS:
+            if kind == "substring":
+                ids = self._infix_candidates(token, field)
+            else:
+                ids = set()
+                ids.update(*self._level_lists(token, field, kind))
+            if ids:
+                levels.append((score, field, kind, ids))
+        return levels
+
+    def _search_many(self, tokens: list, limit: int):
+        # every word must match: intersect the (set-sized) supersets of each
+        # word first, then score the survivors level by level
+        counts = Counter(tokens)
+        levels = {t: self._level_sets(t) for t in counts}
+        matches = sorted((set().union(*(ids for *_, ids in levels[t])) for t in counts), key=len)
+        candidates = matches[0].intersection(*matches[1:])
+
+        entries = self._entries
+        totals = dict.fromkeys(candidates, 0)
+        for t, n in counts.items():
+            remaining = set(candidates)
+            for score, field, kind, ids in levels[t]:
+                hits = remaining & ids
+                if kind == "substring":
+                    hits = {i for i in hits if entries[i].has_infix(field, t)}
+                for i in hits:
+                    totals[i] += score * n
+                remaining -= hits
+                if not remaining:
+                    break
+            # unverified substring candidates that turned out not to match
+            candidates -= remaining
+
+        hits = ((totals[i], i) for i in candidates)
+        return heapq.nsmallest(limit, hits, key=lambda hit: (-hit[0], hit[1]))
+
+    def search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT):
+        tokens = [t for t in _TOKEN_SPLIT.split(query.lower()) if t]
+        if not tokens:
+            return []
+        with self._lock:
+            hits = self._search_one(tokens[0], limit) if len(tokens) == 1 else self._search_many(tokens, limit)
+            return [{**self._entries[i].doc, "score": score} for score, i in hits]
+
+
+employee_search_index = EmployeeSearchIndex()
+invalidation_bus.subscribe(employee_collection.name, employee_search_index.on_change)
+
+
+def ensure_search_indexes():
+    employee_collection.create_index(
+        [(f, TEXT) for f in SEARCH_FIELDS],
+        weights=FIELD_WEIGHTS,
+        name="employee_directory_text",
+    )
+
+
+def mongo_text_search(query: str, limit: int = DEFAULT_SEARCH_LIMIT):
+    """Fallback: Mongo text index, ranked by textScore (whole words only)."""
+    cursor = employee_collection.find(
+        {"$text": {"$search": query}, **ACTIVE_EMPLOYEES},
+        {"_id": 0, **{f: 1 for f in SEARCH_FIELDS}, "score": {"$meta": "textScore"}},
+    ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+    return list(cursor)
+
+
+def search_employees(query: str, limit: int = DEFAULT_SEARCH_LIMIT):
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    if EMPLOYEE_SEARCH == "memory":
+        if employee_search_index.ready:
+            return {"source": "memory", "results": employee_search_index.search(query, limit)}
+        employee_search_index.build_async()
+
+    try:
+        return {"source": "mongo", "results": mongo_text_search(query, limit)}
+    except OperationFailure:
+        # text index missing: build it for next time
+        ensure_search_indexes()
+        return {"source": "mongo", "results": mongo_text_search(query, limit)}
@@ -0,0 +1,191 @@
+import logging
+import os
+import threading
+import time
+
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.database import (
+    get_db,
+    db_backend,
+    cache_versions_collection,
+    employee_collection,
+    users_collection,
+    office_collection,
+    settings_collection,
+    holidays_collection,
+    leaves_collection,
+    attendance_collection,
+    attendance_monthly_collection,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------
+# Cache invalidation bus
+# -----------------------
+# In-process caches subscribe per collection; handlers get
+# {"collection", "operation", "documentKey"} and should just drop what they
+# cached (they can be called more than once for the same write).
+#
+# Changes made by other workers arrive through a change stream on the
+# database. A standalone mongod has no change streams, so the bus then polls
+# `cache_versions` ({_id: collection, version: n}) every
+# INVALIDATION_POLL_SECONDS; notify() bumps that version on every write.
+#
+# HRMS_INVALIDATION_MODE: auto (change streams, else polling) | polling | off
+WATCHED_COLLECTIONS = tuple(c.name for c in (
+    employee_collection,
+    users_collection,
+    office_collection,
+    settings_collection,
+    holidays_collection,
+    leaves_collection,
+    # only the live dashboard counters listen here (whichever store is in use)
+    attendance_collection,
+    attendance_monthly_collection,
+))
+
+INVALIDATION_MODE = os.getenv("HRMS_INVALIDATION_MODE", "auto").lower()
+INVALIDATION_POLL_SECONDS = float(os.getenv("HRMS_INVALIDATION_POLL_SECONDS", "2"))
+
+
+class InvalidationBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers = {}         # collection -> [handler]
+        self._versions = {}         # collection -> last seen version (polling)
+        self._stop = threading.Event()
+        self._thread = None
+        self.mode = None            # "change_stream" | "polling" once started
+
+    # ---- subscribe / publish ----
+    def subscribe(self, collection: str, handler):
+        with self._lock:
+            self._handlers.setdefault(collection, []).append(handler)
+
+        def unsubscribe():
+            with self._lock:
+                handlers = self._handlers.get(collection, [])
+                if handler in handlers:
+                    handlers.remove(handler)
+        return unsubscribe
+
+    def _dispatch(self, collection: str, operation: str, document_key=None):
+        with self._lock:
+            handlers = list(self._handlers.get(collection, []))
+        change = {"collection": collection, "operation": operation, "documentKey": document_key}
+        for handler in handlers:
+            try:
+                handler(change)
+            except Exception:
+                logger.warning("cache invalidation handler failed", extra={"collection": collection}, exc_info=True)
+
+    def _dispatch_all(self, operation: str):
+        for collection in WATCHED_COLLECTIONS:
+            self._dispatch(collection, operation)
+
+    def notify(self, collection: str, document_key=None):
+        """
+        Call after writing a watched collection: invalidates this worker
+        right away and bumps the version other workers poll.
+        """
+        try:
+            doc = cache_versions_collection.find_one_and_update(
+                {"_id": collection},
+                {"$inc": {"version": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            with self._lock:
+                self._versions[collection] = doc["version"]
+        except PyMongoError as e:
+            logger.warning("could not bump cache version", extra={"collection": collection, "error": str(e)})
+
+        self._dispatch(collection, "local", document_key)
+
+    # ---- background watcher ----
+    def _watch(self):
+        """Follows the change stream until stopped. False = not supported here."""
+        pipeline = [{"$match": {"ns.coll": {"$in": list(WATCHED_COLLECTIONS)}}}]
+        resume_token = None
+        reconnect = False
+
+        while not self._stop.is_set():
+            try:
+                with get_db().watch(pipeline, resume_after=resume_token, max_await_time_ms=1000) as stream:
+                    self.mode = "change_stream"
+                    if reconnect:
+                        # changes may have been missed while disconnected
+                        self._dispatch_all("resync")
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        resume_token = stream.resume_token
+                        self._dispatch(
+                            change["ns"]["coll"],
+                            change["operationType"],
+                            change.get("documentKey"),
+                        )
+            except OperationFailure as e:
+                if self.mode is None:
+                    # standalone mongod: "$changeStream stage is only supported on replica sets"
+                    logger.info("change streams unavailable, polling cache versions", extra={"code": e.code})
+                    return False
+                # e.g. resume token no longer in the oplog: start fresh
+                resume_token = None
+                reconnect = True
+                time.sleep(1)
+            except PyMongoError:
+                reconnect = True
+                time.sleep(1)
+        return True
+
+    def _poll_once(self):
+        versions = {
+            d["_id"]: d.get("version", 0)
+            for d in cache_versions_collection.find({"_id": {"$in": list(WATCHED_COLLECTIONS)}})
+        }
+        changed = []
+        with self._lock:
+            for collection in WATCHED_COLLECTIONS:
+                version = versions.get(collection, 0)
+                if collection in self._versions and self._versions[collection] != version:
+                    changed.append(collection)
+                self._versions[collection] = version
+        for collection in changed:
+            self._dispatch(collection, "version")
+
+    def _poll(self):
+        self.mode = "polling"
+        while not self._stop.is_set():
+            try:
+                self._poll_once()
+            except PyMongoError:
+                pass
+            self._stop.wait(INVALIDATION_POLL_SECONDS)
+
+    def _run(self):
+        if INVALIDATION_MODE == "auto" and self._watch():
+            return
+        self._poll()
+
+    def start(self):
+        # the in-memory backend lives in this one process: nothing to hear from
+        if INVALIDATION_MODE == "off" or db_backend() == "memory" or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,309 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+
+import gridfs
+from bson import ObjectId
+from bson.errors import InvalidId
+from gridfs.errors import NoFile
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+
+from app.database import get_db, jobs_collection
+from app.scheduler import INSTANCE_ID
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------
+# Background job queue
+# -----------------------
+# Heavy operations (exports, payroll runs, bulk imports, delete cascades)
+# are stored as documents in `jobs` and run by worker threads in any API
+# process:
+#   QUEUED -> RUNNING (claimed under a lease) -> SUCCESS | FAILED
+# A worker renews the lease of its running jobs; when a worker dies, the
+# lease runs out and another worker picks the job up again. A failed
+# attempt is retried with exponential backoff up to the job type's
+# maxAttempts, so handlers must be safe to run again.
+#
+# Handlers are registered with register_job_type(name, func) and called as
+# func(ctx, **params); the return value (JSON-able) is stored as the result.
+# ctx.progress() reports progress, ctx.save_file() stores a download.
+#
+# HRMS_JOB_WORKERS: worker threads in this process (0 = enqueue only)
+JOB_WORKERS = int(os.getenv("HRMS_JOB_WORKERS", "2"))
+JOB_LEASE_SECONDS = int(os.getenv("HRMS_JOB_LEASE_SECONDS", "60"))
+JOB_POLL_SECONDS = float(os.getenv("HRMS_JOB_POLL_SECONDS", "2"))
+JOB_RETENTION_DAYS = int(os.getenv("HRMS_JOB_RETENTION_DAYS", "7"))
+
+JOB_RETRY_BASE_SECONDS = 10
+# progress is written at most this often (it also renews the lease)
+PROGRESS_WRITE_SECONDS = 1.0
+
+JOB_FILES_BUCKET = "job_files"
+
+_job_types = {}     # name -> {"func", "maxAttempts"}
+
+
+def register_job_type(name: str, func, max_attempts: int = 3):
+    _job_types[name] = {"func": func, "maxAttempts": max_attempts}
+
+
+def ensure_job_indexes():
+    jobs_collection.create_index([("status", ASCENDING), ("runAfter", ASCENDING)])
+    jobs_collection.create_index([("createdBy", ASCENDING), ("createdAt", DESCENDING)])
+    jobs_collection.create_index([("finishedAt", ASCENDING)])
+
+
+def _files():
+    return gridfs.GridFSBucket(get_db(), bucket_name=JOB_FILES_BUCKET)
+
+
+# -----------------------
+# Enqueue / read
+# -----------------------
+def enqueue_job(job_type: str, params: dict, created_by: str, run_after: datetime | None = None):
+    if job_type not in _job_types:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    now = datetime.utcnow()
+    job_id = uuid.uuid4().hex
+    jobs_collection.insert_one({
+        "_id": job_id,
+        "type": job_type,
+        "params": params,
+        "status": "QUEUED",
+        "attempts": 0,
+        "maxAttempts": _job_types[job_type]["maxAttempts"],
+        "progress": None,
+        "result": None,
+        "error": None,
+        "createdBy": created_by,
+        "createdAt": now,
+        "runAfter": max(run_after or now, now),
+    })
+    job_pool.wake()
+    return job_id
+
+
+def job_view(job: dict):
+    """API shape: no lease internals, no traceback."""
+    return {
+        "jobId": job["_id"],
+        "type": job["type"],
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+        "maxAttempts": job.get("maxAttempts"),
+        "progress": job.get("progress"),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "createdBy": job.get("createdBy"),
+        "createdAt": job.get("createdAt"),
+        "startedAt": job.get("startedAt"),
+        "finishedAt": job.get("finishedAt"),
+    }
+
+
+def get_job(job_id: str):
+    return jobs_collection.find_one({"_id": job_id})
+
+
+def list_jobs(status: str | None = None, job_type: str | None = None,
+              created_by: str | None = None, limit: int = 50):
+    query = {}
+    if status:
+        query["status"] = status
+    if job_type:
+        query["type"] = job_type
+    if created_by:
+        query["createdBy"] = created_by
+    return [job_view(j) for j in jobs_collection.find(query).sort("createdAt", -1).limit(limit)]
+
+
+def open_job_file(file_id: str, chunk_size: int = 256 * 1024):
+    """Chunk iterator over a file saved by a job, or None when it is gone."""
+    try:
+        stream = _files().open_download_stream(ObjectId(file_id))
+    except (NoFile, InvalidId, TypeError):
+        return None
+
+    def chunks():
+        with stream:
+            while chunk := stream.read(chunk_size):
+                yield chunk
+
+    return chunks()
+
+
+# -----------------------
+# Running
+# -----------------------
+class JobContext:
+    def __init__(self, job: dict):
+        self.job_id = job["_id"]
+        self.attempt = job["attempts"]
+        self._last_write = 0.0
+
+    def _update(self, fields: dict):
+        fields["leaseUntil"] = datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+        jobs_collection.update_one({"_id": self.job_id, "leaseOwner": INSTANCE_ID}, {"$set": fields})
+
+    def progress(self, done: int, total: int | None = None, message: str | None = None, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_write < PROGRESS_WRITE_SECONDS:
+            return
+        self._last_write = now
+        self._update({"progress": {"done": done, "total": total, "message": message}})
+
+    def save_file(self, filename: str, data, content_type: str):
+        """Stores `data` (str / bytes) for download; returns metadata for the result."""
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        file_id = _files().upload_from_stream(
+            filename, raw, metadata={"jobId": self.job_id, "contentType": content_type}
+        )
+        return {"fileId": str(file_id), "filename": filename, "contentType": content_type, "size": len(raw)}
+
+
+def _claim():
+    now = datetime.utcnow()
+    return jobs_collection.find_one_and_update(
+        {
+            "type": {"$in": list(_job_types)},
+            "$or": [
+                {"status": "QUEUED", "runAfter": {"$lte": now}},
+                # owner died mid-run
+                {"status": "RUNNING", "leaseUntil": {"$lt": now}},
+            ],
+        },
+        {
+            "$set": {
+                "status": "RUNNING",
+                "leaseOwner": INSTANCE_ID,
+                "leaseUntil": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                "startedAt": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("runAfter", ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _finish(job_id: str, fields: dict):
+    jobs_collection.update_one({"_id": job_id, "leaseOwner": INSTANCE_ID}, {"$set": fields})
+
+
+def _run(job: dict):
+    now = datetime.utcnow
+    if job["attempts"] > job["maxAttempts"]:
+        # claimed again after its lease ran out once too often
+        _finish(job["_id"], {"status": "FAILED", "finishedAt": now(), "error": job.get("error") or "Worker lost"})
+        return
+
+    handler = _job_types[job["type"]]["func"]
+    try:
+        # own context: read routing chosen by one job must not leak into the next
+        result = contextvars.copy_context().run(handler, JobContext(job), **(job.get("params") or {}))
+    except Exception as e:
+        fields = {"error": str(e) or type(e).__name__, "traceback": traceback.format_exc()}
+        if job["attempts"] < job["maxAttempts"]:
+            delay = JOB_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1)
+            fields.update(status="QUEUED", runAfter=now() + timedelta(seconds=delay))
+        else:
+            fields.update(status="FAILED", finishedAt=now())
+        _finish(job["_id"], fields)
+        return
+
+    _finish(job["_id"], {"status": "SUCCESS", "result": result, "error": None, "finishedAt": now()})
+
+
+class JobWorkerPool:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._running = set()       # job ids whose lease this process renews
+
+    def wake(self):
+        self._wake.set()
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = _claim()
+            except PyMongoError:
+                job = None
+            if job is None:
+                self._wake.wait(JOB_POLL_SECONDS)
+                self._wake.clear()
+                continue
+
+            with self._lock:
+                self._running.add(job["_id"])
+            try:
+                _run(job)
+            except PyMongoError as e:
+                logger.warning("job could not be finished", extra={"jobId": job["_id"], "error": str(e)})
+            finally:
+                with self._lock:
+                    self._running.discard(job["_id"])
+
+    def _renew_leases(self):
+        while not self._stop.wait(JOB_LEASE_SECONDS / 3):
+            with self._lock:
+                running = list(self._running)
+            if not running:
+                continue
+            try:
+                jobs_collection.update_many(
+                    {"_id": {"$in": running}, "leaseOwner": INSTANCE_ID, "status": "RUNNING"},
+                    {"$set": {"leaseUntil": datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)}},
+                )
+            except PyMongoError:
+                pass
+
+    def start(self):
+        if JOB_WORKERS <= 0 or self._threads:
+            return
+        self._stop.clear()
+        targets = [self._renew_leases] + [self._work] * JOB_WORKERS
+        for i, target in enumerate(targets):
+            t = threading.Thread(target=target, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout=5)
+        self._threads = []
+
+
+job_pool = JobWorkerPool()
+
+
+def purge_finished_jobs():
+    """Nightly: removes jobs finished more than JOB_RETENTION_DAYS ago, with their files."""
+    cutoff = datetime.utcnow() - timedelta(days=JOB_RETENTION_DAYS)
+    old = list(jobs_collection.find({"finishedAt": {"$lt": cutoff}}, {"result": 1}))
+
+    files = _files()
+    for job in old:
+        file_id = (job.get("result") or {}).get("fileId") if isinstance(job.get("result"), dict) else None
+        if file_id:
+            try:
+                files.delete(ObjectId(file_id))
+            except NoFile:
+                pass
+
+    if not old:
+        return 0
+    return jobs_collection.delete_many({"_id": {"$in": [j["_id"] for j in old]}}).deleted_count
@@ -0,0 +1,144 @@
+import os
+from datetime import date
+
+from pymongo import UpdateOne, ReturnDocument
+
+from app.database import leave_balances_collection, employee_collection, ACTIVE_EMPLOYEES
+from app.work_calendar import working_days_between
+
+
+# -----------------------
+# Leave ledger
+# -----------------------
+# One document per employee per year:
+# {_id: "EMP001:2026", employeeId, year, accrued, used, pending}
+# available = accrued - used - pending. Every change is a single $inc,
+# so balance checks are one indexed read instead of scanning leave history.
+ANNUAL_LEAVE_DAYS = float(os.getenv("HRMS_ANNUAL_LEAVE_DAYS", "18"))
+
+# which ledger field a leave in this status counts against
+_STATUS_FIELD = {"PENDING": "pending", "APPROVED": "used"}
+
+
+def ledger_id(employee_id: str, year: int):
+    return f"{employee_id}:{year}"
+
+
+def leave_days_by_year(start: date, end: date):
+    """Working days of a leave, split per calendar year: {"2026": 3.0}."""
+    days = {}
+    for year in range(start.year, end.year + 1):
+        seg_start = max(start, date(year, 1, 1))
+        seg_end = min(end, date(year, 12, 31))
+        n = working_days_between(seg_start, seg_end)
+        if n:
+            days[str(year)] = float(n)
+    return days
+
+
+def _public(doc: dict):
+    doc = dict(doc)
+    doc.pop("_id", None)
+    doc["available"] = doc.get("accrued", 0) - doc.get("used", 0) - doc.get("pending", 0)
+    return doc
+
+
+def get_balance(employee_id: str, year: int, session=None):
+    """O(1): one document by _id (created with the yearly accrual if missing)."""
+    doc = leave_balances_collection.find_one_and_update(
+        {"_id": ledger_id(employee_id, year)},
+        {"$setOnInsert": {
+            "employeeId": employee_id,
+            "year": year,
+            "accrued": ANNUAL_LEAVE_DAYS,
+            "used": 0.0,
+            "pending": 0.0,
+        }},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+    return _public(doc)
+
+
+def reserve_pending(employee_id: str, days_by_year: dict, session=None):
+    """
+    Books a new leave's days as pending, per year only while that year has
+    them available: check and $inc are one conditional update, so concurrent
+    applies cannot overdraw. Returns None when booked, else (year, available,
+    requested) for the first year that is short (nothing stays booked then).
+    """
+    booked = {}
+    for year, requested in days_by_year.items():
+        get_balance(employee_id, int(year), session=session)    # make sure the year's ledger exists
+
+        result = leave_balances_collection.update_one(
+            {
+                "_id": ledger_id(employee_id, int(year)),
+                # available = accrued - used - pending
+                "$expr": {"$gte": [{"$subtract": ["$accrued", {"$add": ["$used", "$pending"]}]}, requested]},
+            },
+            {"$inc": {"pending": requested}},
+            session=session,
+        )
+        if result.matched_count == 0:
+            release_pending(employee_id, booked, session=session)
+            return int(year), get_balance(employee_id, int(year), session=session)["available"], requested
+        booked[year] = requested
+    return None
+
+
+def release_pending(employee_id: str, days_by_year: dict, session=None):
+    """Undoes reserve_pending (the leave was not saved after all)."""
+    apply_status_change(employee_id, days_by_year, "PENDING", None, session=session)
+
+
+def apply_status_change(employee_id: str, days_by_year: dict, old_status: str | None, new_status: str, session=None):
+    """
+    Moves a leave's days between ledger buckets when its status changes
+    (None -> PENDING on apply, PENDING -> APPROVED / REJECTED on action, ...).
+    """
+    old_field = _STATUS_FIELD.get(old_status)
+    new_field = _STATUS_FIELD.get(new_status)
+    if old_field == new_field:
+        return
+
+    for year, days in days_by_year.items():
+        get_balance(employee_id, int(year), session=session)    # make sure the year's ledger exists
+
+        inc = {}
+        if old_field:
+            inc[old_field] = -days
+        if new_field:
+            inc[new_field] = inc.get(new_field, 0) + days
+
+        leave_balances_collection.update_one(
+            {"_id": ledger_id(employee_id, int(year))}, {"$inc": inc}, session=session
+        )
+
+
+def accrue_year(year: int | None = None, days: float | None = None):
+    """
+    Bulk yearly accrual (scheduler, 1 Jan): one upsert per employee in a
+    single bulk_write. Existing ledgers get their accrual set, used/pending
+    are left alone. Returns number of ledgers created or changed.
+    """
+    year = year or date.today().year
+    days = ANNUAL_LEAVE_DAYS if days is None else days
+
+    ops = [
+        UpdateOne(
+            {"_id": ledger_id(e["employeeId"], year)},
+            {
+                "$set": {"accrued": days},
+                "$setOnInsert": {"employeeId": e["employeeId"], "year": year, "used": 0.0, "pending": 0.0},
+            },
+            upsert=True,
+        )
+        for e in employee_collection.find(ACTIVE_EMPLOYEES, {"_id": 0, "employeeId": 1})
+    ]
+    if not ops:
+        return 0
+
+    result = leave_balances_collection.bulk_write(ops, ordered=False)
+    return result.upserted_count + result.modified_count
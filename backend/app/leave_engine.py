@@ -0,0 +1,215 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, timedelta
+
+from app.database import leaves_collection, employee_collection, ACTIVE_EMPLOYEES
+from app.invalidation import invalidation_bus
+
+
+# statuses that occupy days (block overlaps / show on the team calendar)
+ACTIVE_LEAVE_STATUSES = ("PENDING", "APPROVED")
+
+
+class IntervalIndex:
+    """
+    Day intervals [start, end] (date ordinals, inclusive) sorted by start.
+    Overlap query for [a, b]: every hit has start in [a - max_len, b], so a
+    bisect narrows the scan to that window. Leaves are short, which keeps
+    max_len (and the window) small.
+    """
+
+    def __init__(self):
+        self._items = []    # (start, end, leaveId, employeeId, status)
+        self._max_len = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, start: int, end: int, leave_id: str, employee_id: str, status: str):
+        insort(self._items, (start, end, leave_id, employee_id, status))
+        self._max_len = max(self._max_len, end - start)
+
+    def remove(self, leave_id: str):
+        self._items = [i for i in self._items if i[2] != leave_id]
+
+    def overlapping(self, a: int, b: int):
+        lo = bisect_left(self._items, (a - self._max_len,))
+        hi = bisect_right(self._items, (b, float("inf")))
+        return [i for i in self._items[lo:hi] if i[1] >= a]
+
+
+class LeaveEngine:
+    """
+    In-process leave index: one IntervalIndex per department plus a small
+    per-employee index for overlap checks. Built lazily from
+    leaves_collection and kept current by apply_leave / action_leave;
+    leaves written by other workers arrive through the invalidation bus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built = False
+        self._by_department = {}    # department -> IntervalIndex
+        self._by_employee = {}      # employeeId -> IntervalIndex
+        self._departments = {}      # employeeId -> department
+        self._leaves = {}           # leaveId -> (department, employeeId)
+
+    # ---- building ----
+    def rebuild(self):
+        departments = {
+            e["employeeId"]: e.get("department") or "Unknown"
+            for e in employee_collection.find(ACTIVE_EMPLOYEES, {"_id": 0, "employeeId": 1, "department": 1})
+        }
+        # leaves of deactivated employees wait for the purge, off the calendar
+        inactive = employee_collection.distinct("employeeId", {"status": "INACTIVE"})
+        leaves = leaves_collection.find(
+            {"status": {"$in": list(ACTIVE_LEAVE_STATUSES)}, "employeeId": {"$nin": inactive}},
+            {"_id": 0, "leaveId": 1, "employeeId": 1, "startDate": 1, "endDate": 1, "status": 1},
+        )
+
+        with self._lock:
+            self._by_department = {}
+            self._by_employee = {}
+            self._leaves = {}
+            self._departments = departments
+            for l in leaves:
+                self._add_locked(l)
+            self._built = True
+
+    def invalidate(self, change=None):
+        """Rebuild on next use (e.g. departments changed on another worker)."""
+        with self._lock:
+            self._built = False
+
+    def on_leaves_changed(self, change):
+        """Leaves written by another worker (this worker's own go through on_leave_saved)."""
+        if change["operation"] == "local":
+            return
+        key = change.get("documentKey") or {}
+        if change["operation"] in ("insert", "update", "replace") and "_id" in key:
+            leave = leaves_collection.find_one(
+                {"_id": key["_id"]},
+                {"_id": 0, "leaveId": 1, "employeeId": 1, "startDate": 1, "endDate": 1, "status": 1},
+            )
+            if leave:
+                self.on_leave_saved(leave)
+                return
+        # polling / deletes / resync: no usable key
+        self.invalidate()
+
+    def _ensure_built(self):
+        if not self._built:
+            self.rebuild()
+
+    def _department_of(self, employee_id: str):
+        dept = self._departments.get(employee_id)
+        if dept is None:
+            emp = employee_collection.find_one({"employeeId": employee_id}, {"_id": 0, "department": 1})
+            dept = (emp or {}).get("department") or "Unknown"
+            self._departments[employee_id] = dept
+        return dept
+
+    def _add_locked(self, leave: dict):
+        start = date.fromisoformat(leave["startDate"]).toordinal()
+        end = date.fromisoformat(leave["endDate"]).toordinal()
+        dept = self._department_of(leave["employeeId"])
+
+        for index, key in ((self._by_department, dept), (self._by_employee, leave["employeeId"])):
+            index.setdefault(key, IntervalIndex()).add(
+                start, end, leave["leaveId"], leave["employeeId"], leave["status"]
+            )
+        self._leaves[leave["leaveId"]] = (dept, leave["employeeId"])
+
+    def _remove_locked(self, leave_id: str):
+        found = self._leaves.pop(leave_id, None)
+        if not found:
+            return
+        dept, employee_id = found
+        self._by_department[dept].remove(leave_id)
+        self._by_employee[employee_id].remove(leave_id)
+
+    # ---- updates from the API ----
+    def on_leave_saved(self, leave: dict):
+        """Call after a leave is inserted or its status changes."""
+        self._ensure_built()
+        with self._lock:
+            self._remove_locked(leave["leaveId"])
+            if leave["status"] in ACTIVE_LEAVE_STATUSES:
+                self._add_locked(leave)
+
+    def on_employee_removed(self, employee_id: str):
+        self._ensure_built()
+        with self._lock:
+            for leave_id, (_, emp_id) in list(self._leaves.items()):
+                if emp_id == employee_id:
+                    self._remove_locked(leave_id)
+            self._departments.pop(employee_id, None)
+
+    def refresh_employee(self, employee_id: str):
+        """Re-index one employee's leaves (e.g. after a department change)."""
+        self._ensure_built()
+        leaves = list(leaves_collection.find(
+            {"employeeId": employee_id, "status": {"$in": list(ACTIVE_LEAVE_STATUSES)}},
+            {"_id": 0, "leaveId": 1, "employeeId": 1, "startDate": 1, "endDate": 1, "status": 1},
+        ))
+        with self._lock:
+            for leave_id, (_, emp_id) in list(self._leaves.items()):
+                if emp_id == employee_id:
+                    self._remove_locked(leave_id)
+            self._departments.pop(employee_id, None)
+            for l in leaves:
+                self._add_locked(l)
+
+    # ---- queries ----
+    def find_overlap(self, employee_id: str, start: date, end: date):
+        """First active leave of this employee overlapping [start, end], or None."""
+        self._ensure_built()
+        with self._lock:
+            index = self._by_employee.get(employee_id)
+            hits = index.overlapping(start.toordinal(), end.toordinal()) if index else []
+        if not hits:
+            return None
+        s, e, leave_id, _, status = hits[0]
+        return {
+            "leaveId": leave_id,
+            "startDate": date.fromordinal(s).isoformat(),
+            "endDate": date.fromordinal(e).isoformat(),
+            "status": status,
+        }
+
+    def team_calendar(self, department: str, start: date, end: date):
+        """
+        Per day in [start, end]: how many people of `department` are on
+        approved / pending leave. Difference array over the overlapping
+        intervals -> O(hits + days).
+        """
+        self._ensure_built()
+        a, b = start.toordinal(), end.toordinal()
+        days = b - a + 1
+
+        with self._lock:
+            index = self._by_department.get(department)
+            hits = index.overlapping(a, b) if index else []
+
+        diff = {s: [0] * (days + 1) for s in ACTIVE_LEAVE_STATUSES}
+        for s, e, _, _, status in hits:
+            d = diff[status]
+            d[max(s, a) - a] += 1
+            d[min(e, b) - a + 1] -= 1
+
+        calendar = []
+        running = {s: 0 for s in ACTIVE_LEAVE_STATUSES}
+        for i in range(days):
+            for s in ACTIVE_LEAVE_STATUSES:
+                running[s] += diff[s][i]
+            calendar.append({
+                "date": (start + timedelta(days=i)).isoformat(),
+                "onLeave": running["APPROVED"],
+                "pending": running["PENDING"],
+            })
+        return calendar
+
+
+leave_engine = LeaveEngine()
+invalidation_bus.subscribe(employee_collection.name, leave_engine.invalidate)
+invalidation_bus.subscribe(leaves_collection.name, leave_engine.on_leaves_changed)
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date
+
+from app.database import ACTIVE_EMPLOYEES, employee_collection, leaves_collection
+from app.attendance_store import attendance_store
+from app.attendance_codec import open_checkin_filter
+from app.invalidation import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------
+# Event bus
+# -----------------------
+# In-process publish / subscribe. Endpoints publish after their write
+# succeeded; handlers run synchronously in the publishing thread and must be
+# cheap. A failing handler never fails the request.
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers = []
+
+    def subscribe(self, handler):
+        with self._lock:
+            self._handlers.append(handler)
+
+        def unsubscribe():
+            with self._lock:
+                if handler in self._handlers:
+                    self._handlers.remove(handler)
+        return unsubscribe
+
+    def publish(self, event_type: str, **data):
+        event = {"type": event_type, **data}
+        with self._lock:
+            handlers = list(self._handlers)
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception:
+                logger.warning("event handler failed", extra={"event": event_type}, exc_info=True)
+
+
+event_bus = EventBus()
+
+
+# -----------------------
+# Live dashboard counters
+# -----------------------
+# Today's attendance by status, open check-ins, pending leaves and headcount,
+# kept in memory and moved by events instead of re-counted on every poll.
+# Seeded once (and again on a new day); every change is pushed to SSE
+# subscribers as a delta plus the new values.
+#
+# Events are per worker. Writes made by other workers (the auto-checkout
+# job runs on one worker) arrive through invalidation_bus on the employees,
+# leaves and attendance channels and trigger a re-count; changes arriving
+# within LIVE_COUNTERS_REMOTE_DELAY_SECONDS share one. Counters are also
+# re-seeded after LIVE_COUNTERS_RESEED_SECONDS in case a notification was
+# lost.
+LIVE_COUNTERS_RESEED_SECONDS = int(os.getenv("HRMS_LIVE_COUNTERS_RESEED_SECONDS", "300"))
+LIVE_COUNTERS_REMOTE_DELAY_SECONDS = float(os.getenv("HRMS_LIVE_COUNTERS_REMOTE_DELAY_SECONDS", "1"))
+
+# per-subscriber buffer; a subscriber that falls this far behind is dropped
+SSE_QUEUE_SIZE = 100
+
+
+def sse_message(event: str, data: dict):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class LiveCounters:
+    def __init__(self, bus: EventBus):
+        self._lock = threading.Lock()
+        self._day = None
+        self._seeded_at = 0.0
+        self._counters = None
+        self._subscribers = set()     # (loop, queue)
+        self._reseed_timer = None
+        bus.subscribe(self._on_event)
+
+    # ---- seeding ----
+    def _seed(self):
+        today = date.today().isoformat()
+        open_rows = attendance_store.aggregate({"date": today, **open_checkin_filter()}, [{"$count": "n"}])
+
+        counters = {
+            "date": today,
+            "todayAttendance": attendance_store.status_counts(start=today, end=today),
+            "openCheckins": open_rows[0]["n"] if open_rows else 0,
+            "pendingLeaves": leaves_collection.count_documents({"status": "PENDING"}),
+            "totalEmployees": employee_collection.count_documents(ACTIVE_EMPLOYEES),
+        }
+
+        with self._lock:
+            self._day = today
+            self._seeded_at = time.monotonic()
+            self._counters = counters
+            snapshot = self._snapshot_locked()
+        self._broadcast("snapshot", snapshot)
+
+    def _is_stale(self):
+        return (
+            self._counters is None
+            or self._day != date.today().isoformat()
+            or time.monotonic() - self._seeded_at > LIVE_COUNTERS_RESEED_SECONDS
+        )
+
+    def _snapshot_locked(self):
+        c = self._counters
+        return {**c, "todayAttendance": dict(c["todayAttendance"])}
+
+    def snapshot(self):
+        if self._is_stale():
+            self._seed()
+        with self._lock:
+            return self._snapshot_locked()
+
+    def invalidate(self, change=None):
+        with self._lock:
+            self._counters = None
+
+    def on_remote_change(self, change):
+        """invalidation_bus handler: re-count after another worker's writes."""
+        if change["operation"] == "local":
+            return      # this worker's own writes arrive as events
+        self.invalidate()
+        with self._lock:
+            if not self._subscribers or self._reseed_timer is not None:
+                return
+            timer = self._reseed_timer = threading.Timer(LIVE_COUNTERS_REMOTE_DELAY_SECONDS, self._reseed_remote)
+        timer.daemon = True
+        timer.start()
+
+    def _reseed_remote(self):
+        with self._lock:
+            self._reseed_timer = None
+            if not self._subscribers:
+                return
+        try:
+            self._seed()
+        except Exception:
+            logger.warning("live counters re-count failed", exc_info=True)
+
+    # ---- events ----
+    def _attendance_delta(self, e: dict):
+        delta = {}
+        old, new = e.get("oldStatus"), e.get("newStatus")
+        if old != new:
+            if old:
+                delta[f"todayAttendance.{old}"] = -1
+            if new:
+                delta[f"todayAttendance.{new}"] = delta.get(f"todayAttendance.{new}", 0) + 1
+        if e.get("wasOpen") != e.get("isOpen"):
+            delta["openCheckins"] = 1 if e.get("isOpen") else -1
+        return delta
+
+    def _delta_for(self, e: dict):
+        t = e["type"]
+        if t in ("attendance.marked", "attendance.edited"):
+            return self._attendance_delta(e) if e.get("date") == self._day else {}
+        if t == "attendance.auto_checkout":
+            return {"openCheckins": -e["count"]} if e.get("date") == self._day and e["count"] else {}
+        if t == "leave.applied":
+            return {"pendingLeaves": 1}
+        if t == "leave.actioned":
+            delta = {}
+            if e.get("oldStatus") == "PENDING":
+                delta["pendingLeaves"] = -1
+            if e.get("newStatus") == "PENDING":
+                delta["pendingLeaves"] = delta.get("pendingLeaves", 0) + 1
+            return delta
+        if t == "employee.created":
+            return {"totalEmployees": 1}
+        return {}
+
+    def _on_event(self, e: dict):
+        # changes too wide to express as a delta: re-count (one aggregation)
+        if e["type"] == "employee.deleted" or (e["type"] == "leave.actioned" and e.get("touchesToday")):
+            self.invalidate()
+            if self._subscribers:
+                self._seed()
+            return
+
+        with self._lock:
+            if self._counters is None:
+                return      # not seeded yet; the first read counts everything
+            delta = {k: v for k, v in self._delta_for(e).items() if v}
+            if not delta:
+                return
+            for key, v in delta.items():
+                if key.startswith("todayAttendance."):
+                    status = key.split(".", 1)[1]
+                    if status in self._counters["todayAttendance"]:
+                        self._counters["todayAttendance"][status] += v
+                else:
+                    self._counters[key] += v
+            snapshot = self._snapshot_locked()
+
+        self._broadcast("delta", {"event": e["type"], "delta": delta, "counters": snapshot})
+
+    # ---- SSE subscribers ----
+    def subscribe_queue(self):
+        """Call from the event loop that will consume the queue."""
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=SSE_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.add(entry)
+        return entry
+
+    def unsubscribe_queue(self, entry):
+        with self._lock:
+            self._subscribers.discard(entry)
+
+    def _broadcast(self, event: str, data: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+
+        message = sse_message(event, data)
+        for entry in subscribers:
+            try:
+                entry[0].call_soon_threadsafe(self._offer, entry, message)
+            except RuntimeError:
+                # loop already closed
+                self.unsubscribe_queue(entry)
+
+    def _offer(self, entry, message: str):
+        # runs on the subscriber's loop
+        queue = entry[1]
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # too slow: end its stream; the client reconnects and gets a fresh snapshot
+            self.unsubscribe_queue(entry)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+
+live_counters = LiveCounters(event_bus)
+for _collection in (employee_collection, leaves_collection, attendance_store.collection):
+    invalidation_bus.subscribe(_collection.name, live_counters.on_remote_change)
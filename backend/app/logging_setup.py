@@ -0,0 +1,157 @@
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+
+# -----------------------
+# Structured logging
+# -----------------------
+# Modules log through logging.getLogger(__name__) (the "app" tree). Records
+# are put on a queue by a QueueHandler and written as one JSON object per
+# line by a QueueListener thread, so a slow stdout never blocks a request.
+#
+# Every record made while serving a request carries its requestId (taken
+# from the X-Request-ID header or generated, and echoed in the response) and
+# path. DEBUG records are sampled per request: either all debug lines of a
+# request are written or none.
+#
+# HRMS_LOG_LEVEL:          INFO (default) / WARNING / DEBUG ...
+# HRMS_LOG_DEBUG_SAMPLE:   share of requests whose debug lines are kept (default 0)
+# HRMS_LOG_DEBUG_ROUTES:   per path prefix overrides, e.g.
+#                          "/api/attendance=0.05,/api/auth/login=0"
+LOG_LEVEL = getattr(logging, os.getenv("HRMS_LOG_LEVEL", "INFO").upper(), logging.INFO)
+LOG_DEBUG_SAMPLE = float(os.getenv("HRMS_LOG_DEBUG_SAMPLE", "0"))
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_request_id = ContextVar("request_id", default=None)
+_request_path = ContextVar("request_path", default=None)
+_debug_sampled = ContextVar("debug_sampled", default=None)
+
+# attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _parse_routes(spec: str):
+    routes = {}
+    for part in spec.split(","):
+        prefix, _, rate = part.strip().partition("=")
+        if prefix and rate:
+            routes[prefix] = float(rate)
+    # longest prefix wins
+    return dict(sorted(routes.items(), key=lambda kv: -len(kv[0])))
+
+
+LOG_DEBUG_ROUTES = _parse_routes(os.getenv("HRMS_LOG_DEBUG_ROUTES", ""))
+
+
+def debug_sample_rate(path: str | None):
+    for prefix, rate in LOG_DEBUG_ROUTES.items():
+        if path and path.startswith(prefix):
+            return rate
+    return LOG_DEBUG_SAMPLE
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+def begin_request(path: str, request_id: str | None = None):
+    """Binds the log context of one request; returns its request id."""
+    # a caller-supplied id is kept (bounded) so logs join across services
+    request_id = (request_id or "")[:64] or uuid.uuid4().hex
+    _request_id.set(request_id)
+    _request_path.set(path)
+    _debug_sampled.set(random.random() < debug_sample_rate(path))
+    return request_id
+
+
+class ContextFilter(logging.Filter):
+    """Runs in the thread that logs, before queueing: stamps request context, samples DEBUG."""
+
+    def filter(self, record):
+        record.requestId = _request_id.get()
+        record.path = _request_path.get()
+        if record.levelno == logging.DEBUG and LOG_LEVEL > logging.DEBUG:
+            sampled = _debug_sampled.get()
+            if sampled is None:
+                # outside a request (jobs, scheduler): sampled per record
+                sampled = random.random() < LOG_DEBUG_SAMPLE
+            return sampled
+        return record.levelno >= LOG_LEVEL
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # message and traceback are rendered here; `extra` fields travel as they are
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = record.exc_text = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and value is not None:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+_listener = None
+
+
+def configure_logging():
+    """Installs the queue handler on the "app" logger; safe to call twice."""
+    global _listener
+    if _listener is not None:
+        return
+
+    # sampled debug records have to get past the logger level to be sampled
+    sampling = LOG_DEBUG_SAMPLE > 0 or any(LOG_DEBUG_ROUTES.values())
+    level = logging.DEBUG if sampling else LOG_LEVEL
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+
+    records = queue.SimpleQueue()
+    queue_handler = _QueueHandler(records)
+    queue_handler.addFilter(ContextFilter())
+
+    logger = logging.getLogger("app")
+    logger.setLevel(level)
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, stream)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flushes queued records and detaches the handler; call last on shutdown."""
+    global _listener
+    if _listener is None:
+        return
+    logger = logging.getLogger("app")
+    for handler in [h for h in logger.handlers if isinstance(h, _QueueHandler)]:
+        logger.removeHandler(handler)
+    logger.propagate = True
+    _listener.stop()
+    _listener = None
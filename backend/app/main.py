@@ -1,23 +1,41 @@
-from fastapi import FastAPI, HTTPException, Depends
+# first: the import phase of the startup profile is timed from here
+from app.startup_profile import startup_profile
+
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response
 from typing import Optional
 from datetime import datetime, date, timedelta
 import uuid
 import io
 import csv
-import math
+import calendar
+import asyncio
+import os
+import threading
+import logging
+import time
 from bson import ObjectId
-from apscheduler.schedulers.background import BackgroundScheduler
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from app.database import (
     employee_collection,
-    attendance_collection,
     users_collection,
     leaves_collection,
     office_collection,
     settings_collection,
-    payslips_collection
+    payslips_collection,
+    holidays_collection,
+    run_transaction,
+    use_reporting_reads,
+    read_routing_stats,
+    ACTIVE_EMPLOYEES,
+    request_profiles_collection,
+    configure_database,
+    connect,
+    close_database,
 )
 
 from app.schemas import (
@@ -39,6 +57,10 @@ from app.schemas import (
     UpdateUserPayload,
     ChangePasswordPayload,
     PayslipGeneratePayload,
+    HolidayCreate,
+    PayrollRules,
+    PayrollRunPayload,
+    EmployeeImportPayload,
 )
 
 from app.auth_utils import (
@@ -48,28 +70,287 @@ from app.auth_utils import (
     decode_token,
 )
 
+from app.attendance_utils import (
+    count_statuses,
+    count_statuses_by_date,
+    match_office_location,
+    minutes_to_hhmm,
+)
+
+from app.attendance_codec import (
+    LEGACY_TIME_FIELDS,
+    encode_times,
+    total_minutes_expr,
+)
+
+from app.attendance_store import attendance_store
+
+from app.attendance_archive import (
+    archive_old_attendance,
+    archived_minutes_by_employee,
+    find_all_tiers,
+    status_counts_all_tiers,
+)
+
+from app.scheduler import (
+    register_job,
+    get_job_runs,
+    is_leader,
+    start_scheduler,
+    shutdown_scheduler,
+    INSTANCE_ID,
+)
+
+from app.migrations import get_migration_status
+
+from app.leave_engine import leave_engine, ACTIVE_LEAVE_STATUSES
+
+from app.work_calendar import working_dates_between, working_days_between
+
+from app.leave_balance import (
+    accrue_year,
+    apply_status_change,
+    release_pending,
+    reserve_pending,
+    get_balance,
+    leave_days_by_year,
+)
+
+from app.office_timezones import (
+    auto_checkout_sweep,
+    local_today,
+    office_timezone,
+)
+
+from app.payroll import get_payroll_rules, run_payroll, save_payroll_rules
+
+from app.payslip_periods import (
+    ensure_payslip_indexes,
+    financial_year_range,
+    financial_year_start,
+    month_number,
+    payslip_totals,
+    period_fields,
+    period_filter,
+)
+
+from app.payslip_pdf import get_payslip_pdf, pdf_filename, prune_pdf_cache, shutdown_pdf_pool, stream_payslip_zip
+
+from app.live_counters import event_bus, live_counters, sse_message
+
+from app.invalidation import invalidation_bus, WATCHED_COLLECTIONS
+
+from app.config_cache import active_offices, get_setting
+
+from app.employee_search import (
+    employee_search_index,
+    ensure_search_indexes,
+    search_employees,
+    DEFAULT_SEARCH_LIMIT,
+)
+
+from app.sync_sequence import next_sync_stamp, record_deletes, prune_tombstones
+
+from app.sync_feed import changes_since, ensure_sync_indexes, DEFAULT_SYNC_LIMIT
+
+from app.employee_purge import deactivate_employee, held_employee_error, purge_employee
+
+from app.audit import audit_log, ensure_audit_indexes, query_audit, DEFAULT_AUDIT_LIMIT
+
+from app.jobs import (
+    enqueue_job,
+    ensure_job_indexes,
+    get_job,
+    job_pool,
+    job_view,
+    list_jobs,
+    open_job_file,
+    purge_finished_jobs,
+    register_job_type,
+)
+
+from app.logging_setup import (
+    REQUEST_ID_HEADER,
+    begin_request,
+    configure_logging,
+    current_request_id,
+    shutdown_logging,
+)
+
+from app.admission import AdmissionControl, admission_stats
+
+from app.request_profiler import (
+    PROFILE_FORMATS,
+    PROFILE_HEADER,
+    PROFILE_ID_HEADER,
+    ProfiledRoute,
+    begin_profile,
+    ensure_profile_store,
+    list_profiles,
+    render_profile,
+    save_profile,
+    wants_profile,
+)
+
+startup_profile.record("imports", startup_profile.started)
+
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
 
 # -----------------------
-# CORS
+# App lifespan: startup / shutdown
 # -----------------------
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "https://hrms-project-main.netlify.app",
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# HRMS_STARTUP_TASKS: what happens to index creation + the default admin
+#   background (default) -> run in a thread, the app serves meanwhile
+#   blocking            -> finish before the first request
+#   off                 -> skipped (tests, read-only tooling)
+STARTUP_TASKS = os.getenv("HRMS_STARTUP_TASKS", "background").lower()
+
+
+def run_startup_tasks():
+    # one step failing (e.g. an index build) is logged and the rest still run,
+    # in particular seed_admin
+    steps = (
+        ("attendance_indexes", attendance_store.ensure_indexes),
+        ("payslip_indexes", ensure_payslip_indexes),
+        ("search_indexes", ensure_search_indexes),
+        ("sync_indexes", ensure_sync_indexes),
+        ("job_indexes", ensure_job_indexes),
+        ("audit_indexes", ensure_audit_indexes),
+        ("profile_store", ensure_profile_store),
+        ("seed_admin", seed_admin),
+    )
+    for name, task in steps:
+        with startup_profile.step(name):
+            try:
+                task()
+            except Exception:
+                logger.exception("startup task failed", extra={"task": name})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    with startup_profile.step("connect"):
+        connect()
+
+    if STARTUP_TASKS == "blocking":
+        run_startup_tasks()
+    elif STARTUP_TASKS == "background":
+        threading.Thread(target=run_startup_tasks, name="startup-tasks", daemon=True).start()
+
+    with startup_profile.step("invalidation_bus"):
+        invalidation_bus.start()
+    with startup_profile.step("scheduler"):
+        start_scheduler()
+    with startup_profile.step("job_workers"):
+        job_pool.start()
+    audit_log.start()
+    startup_profile.ready()
+
+    yield
+
+    shutdown_scheduler()
+    job_pool.stop()
+    audit_log.stop()
+    invalidation_bus.stop()
+    shutdown_pdf_pool()
+    close_database()
+    shutdown_logging()
+
+
+# Endpoints register on this router; create_app() builds the application.
+# ProfiledRoute: sync endpoints can run under the opt-in request profiler.
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def create_app(db_backend: str | None = None, mongo_uri: str | None = None, db_name: str | None = None):
+    """
+    App factory. Arguments override HRMS_DB_BACKEND / HRMS_MONGO_URI /
+    HRMS_DB_NAME; nothing connects until the lifespan starts.
+    Run with `uvicorn app.main:app` or `uvicorn --factory app.main:create_app`.
+    """
+    if db_backend or mongo_uri or db_name:
+        configure_database(backend=db_backend, uri=mongo_uri, name=db_name)
+
+    app = FastAPI(lifespan=lifespan)
+
+    # -----------------------
+    # Opt-in profiling (X-Profile header from an ADMIN, or sampled)
+    # -----------------------
+    @app.middleware("http")
+    async def profile_requests(request: Request, call_next):
+        header = request.headers.get(PROFILE_HEADER)
+        trigger = wants_profile(request.url.path, header, _token_role(request) if header else None)
+        if trigger is None:
+            return await call_next(request)
+
+        profile = begin_profile(request.method, request.url.path, trigger, current_request_id())
+        response = await call_next(request)
+        route = request.scope.get("route")
+        save_profile(profile, getattr(route, "path", None), response.status_code)
+        response.headers[PROFILE_ID_HEADER] = profile.id
+        return response
+
+    # -----------------------
+    # Request context (request id on every log line of the request)
+    # -----------------------
+    # registered after profiling, so it runs first (outermost)
+    @app.middleware("http")
+    async def request_context(request: Request, call_next):
+        request_id = begin_request(request.url.path, request.headers.get(REQUEST_ID_HEADER))
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        except Exception:
+            logger.exception("unhandled error", extra={"method": request.method})
+            raise
+        response.headers[REQUEST_ID_HEADER] = request_id
+        logger.debug("request done", extra={
+            "method": request.method,
+            "status": response.status_code,
+            "ms": round((time.perf_counter() - started) * 1000, 2),
+        })
+        return response
+
+    # -----------------------
+    # Admission control: per route class concurrency + queue (app/admission.py)
+    # -----------------------
+    # outside the request context / profiling, inside CORS (rejections keep CORS headers)
+    app.add_middleware(AdmissionControl)
+
+    # -----------------------
+    # CORS
+    # -----------------------
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://localhost:3000",
+            "http://127.0.0.1:3000",
+            "https://hrms-project-main.netlify.app",
+        ],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.include_router(router)
+    return app
 
 
 # -----------------------
 # Auth dependency
 # -----------------------
+def _token_role(request: Request):
+    """Role in the bearer token, None when missing / invalid (no 401 here)."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_token(token).get("role")
+    except HTTPException:
+        return None
+
 
 # For Demo only, will remove later 
 
@@ -110,7 +391,6 @@ DEFAULT_ADMIN_EMAIL = "admin@hrms.com"
 DEFAULT_ADMIN_PASSWORD = "Admin@123"
 
 
-@app.on_event("startup")
 def seed_admin():
     email = DEFAULT_ADMIN_EMAIL.lower().strip()
 
@@ -127,7 +407,8 @@ def seed_admin():
                 "createdAt": datetime.utcnow().isoformat(),
             }
         )
-        print("✅ Default admin created")
+        invalidation_bus.notify(users_collection.name)
+        logger.info("default admin created", extra={"email": email})
         return
 
     # If exists but role is wrong → fix role
@@ -136,15 +417,17 @@ def seed_admin():
             {"email": email},
             {"$set": {"role": "ADMIN"}}
         )
-        print("⚠️ Default admin role corrected to ADMIN")
+        invalidation_bus.notify(users_collection.name)
+        logger.warning("default admin role corrected to ADMIN", extra={"email": email})
+        return
 
-    print("ℹ️ Default admin already exists (no changes made)")
+    logger.info("default admin already exists", extra={"email": email})
 
 
 # -----------------------
 # Auth APIs
 # -----------------------
-@app.post("/api/auth/login")
+@router.post("/api/auth/login")
 def login(data: LoginRequest):
 
     email = data.email.lower().strip()
@@ -186,7 +469,7 @@ def login(data: LoginRequest):
 
     raise HTTPException(status_code=401, detail="Invalid email or password")
 
-@app.get("/api/auth/me")
+@router.get("/api/auth/me")
 def auth_me(current_user=Depends(get_current_user)):
     return {
         "fullName": current_user.get("fullName"),
@@ -197,13 +480,13 @@ def auth_me(current_user=Depends(get_current_user)):
 # -----------------------
 # Users APIs (Admin)
 # -----------------------
-@app.get("/api/users")
+@router.get("/api/users")
 def get_users(admin=Depends(require_roles(["ADMIN", "HR"]))):
     return list(users_collection.find({}, {"_id": 0, "password": 0}))
 
 
 
-@app.put("/api/users/change-password")
+@router.put("/api/users/change-password")
 def change_password(data: ChangePasswordPayload, current=Depends(get_current_user)):
 
     email = current.get("email")
@@ -235,7 +518,7 @@ def change_password(data: ChangePasswordPayload, current=Depends(get_current_use
     return {"message": "Password updated successfully"}
 
 
-@app.put("/api/users/{email}")
+@router.put("/api/users/{email}")
 def update_user(
     email: str,
     payload: UpdateUserPayload,
@@ -266,11 +549,12 @@ def update_user(
             "role": payload.role
         }}
     )
+    invalidation_bus.notify(users_collection.name)
 
     return {"message": "User updated successfully"}
 
 
-@app.delete("/api/users/{email}")
+@router.delete("/api/users/{email}")
 def delete_user(email: str, admin=Depends(require_roles(["ADMIN"]))):
     if email == admin["email"]:
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
@@ -278,11 +562,12 @@ def delete_user(email: str, admin=Depends(require_roles(["ADMIN"]))):
     result = users_collection.delete_one({"email": email})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    invalidation_bus.notify(users_collection.name)
 
     return {"message": "User deleted"}
 
 
-@app.put("/api/users/reset-password/{email}")
+@router.put("/api/users/reset-password/{email}")
 def admin_reset_password(
     email: str,
     payload: AdminResetPasswordPayload,
@@ -303,6 +588,10 @@ def admin_reset_password(
             {"email": email},
             {"$set": {"password": hashed}},
         )
+        audit_log.record(
+            "password.reset", "user", email, admin["email"],
+            {"password": user.get("password")}, {"password": hashed},
+        )
         return {"message": "Password updated successfully"}
 
     # If EMPLOYEE
@@ -312,6 +601,10 @@ def admin_reset_password(
             {"email": email},
             {"$set": {"password": hashed}},
         )
+        audit_log.record(
+            "password.reset", "employee", emp["employeeId"], admin["email"],
+            {"password": emp.get("password")}, {"password": hashed},
+        )
         return {"message": "Password updated successfully"}
 
     raise HTTPException(status_code=404, detail="User not found")
@@ -321,7 +614,7 @@ def admin_reset_password(
 
 # User / Employee self edit functionality 
 
-@app.get("/api/profile/me")
+@router.get("/api/profile/me")
 def get_my_profile(current_user=Depends(get_current_user)):
 
     role = current_user.get("role")
@@ -342,7 +635,7 @@ def get_my_profile(current_user=Depends(get_current_user)):
     emp["role"] = "EMPLOYEE"
     return emp
 
-@app.put("/api/profile/me")
+@router.put("/api/profile/me")
 def update_my_profile(payload: UpdateMePayload, current_user=Depends(get_current_user)):
 
     role = current_user.get("role")
@@ -370,6 +663,7 @@ def update_my_profile(payload: UpdateMePayload, current_user=Depends(get_current
 
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
+        invalidation_bus.notify(users_collection.name)
 
         return {"message": "Profile updated successfully"}
 
@@ -388,18 +682,24 @@ def update_my_profile(payload: UpdateMePayload, current_user=Depends(get_current
 
     result = employee_collection.update_one(
         {"email": email},
-        {"$set": update_data}
+        {"$set": {**update_data, **next_sync_stamp()}}
     )
 
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Employee not found")
+    invalidation_bus.notify(employee_collection.name)
+
+    emp = employee_collection.find_one({"email": email}, {"employeeId": 1})
+    employee_search_index.upsert(emp["employeeId"])
+    if "department" in update_data:
+        leave_engine.refresh_employee(emp["employeeId"])
 
     return {"message": "Profile updated successfully"}
 
 # -----------------------
 # Employees APIs
 # -----------------------
-@app.post("/api/employees")
+@router.post("/api/employees")
 def create_employee(payload: EmployeeCreate, current_user=Depends(get_current_user)):
 
     # only ADMIN / HR can create employee
@@ -408,6 +708,14 @@ def create_employee(payload: EmployeeCreate, current_user=Depends(get_current_us
 
     email = payload.email.lower().strip()
 
+    # a deactivated employee keeps its ID and email until the purge job runs
+    held = employee_collection.find_one(
+        {"status": "INACTIVE", "$or": [{"employeeId": payload.employeeId}, {"formerEmail": email}]},
+        {"employeeId": 1, "purgeAfter": 1},
+    )
+    if held:
+        raise HTTPException(status_code=409, detail=held_employee_error(held))
+
     # check duplicates across both collections
     if users_collection.find_one({"email": email}) or employee_collection.find_one({"email": email}):
         raise HTTPException(status_code=400, detail="Email already exists")
@@ -424,12 +732,16 @@ def create_employee(payload: EmployeeCreate, current_user=Depends(get_current_us
         "salary": payload.salary,
         "password": hash_password(payload.password),
         "createdAt": datetime.utcnow().isoformat(),
+        **next_sync_stamp(),
     })
+    invalidation_bus.notify(employee_collection.name)
+    employee_search_index.upsert(payload.employeeId)
+    event_bus.publish("employee.created", employeeId=payload.employeeId)
 
     return {"message": "Employee created successfully"}
 
 
-@app.post("/api/users", status_code=201)
+@router.post("/api/users", status_code=201)
 def create_user(userData: UserCreate, user=Depends(require_roles(["ADMIN"]))):
 
     # only allow ADMIN or HR creation here
@@ -447,16 +759,17 @@ def create_user(userData: UserCreate, user=Depends(require_roles(["ADMIN"]))):
         "role": userData.role,
         "createdAt": datetime.utcnow().isoformat(),
     })
+    invalidation_bus.notify(users_collection.name)
 
     return {"message": f"{userData.role} user created successfully"}
 
 
-@app.get("/api/employees")
+@router.get("/api/employees")
 def get_employees(user=Depends(require_roles(["ADMIN", "HR"]))):
-    return list(employee_collection.find({}, {"_id": 0}))
+    return list(employee_collection.find(ACTIVE_EMPLOYEES, {"_id": 0}))
 
 
-@app.get("/api/employees/me")
+@router.get("/api/employees/me")
 def get_my_employee(user=Depends(require_roles(["EMPLOYEE"]))):
     emp = employee_collection.find_one({"email": user["email"]}, {"_id": 0})
     if not emp:
@@ -464,11 +777,23 @@ def get_my_employee(user=Depends(require_roles(["EMPLOYEE"]))):
     return emp
 
 
-@app.put("/api/employees/{employee_id}")
+@router.get("/api/employees/search")
+def search_employee_directory(
+    q: str,
+    limit: int = DEFAULT_SEARCH_LIMIT,
+    user=Depends(require_roles(["ADMIN", "HR"])),
+):
+    # typeahead: prefix / substring match on id, name, email, designation, department
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search text is required")
+    return search_employees(q, limit)
+
+
+@router.put("/api/employees/{employee_id}")
 def update_employee(
     employee_id: str, data: EmployeeUpdate, user=Depends(require_roles(["ADMIN", "HR"]))
 ):
-    existing = employee_collection.find_one({"employeeId": employee_id})
+    existing = employee_collection.find_one({"employeeId": employee_id, **ACTIVE_EMPLOYEES})
     if not existing:
         raise HTTPException(status_code=404, detail="Employee not found")
 
@@ -489,7 +814,12 @@ def update_employee(
         )
 
     # Update employee record
-    employee_collection.update_one({"employeeId": employee_id}, {"$set": update_data})
+    employee_collection.update_one({"employeeId": employee_id}, {"$set": {**update_data, **next_sync_stamp()}})
+    invalidation_bus.notify(employee_collection.name)
+    employee_search_index.upsert(employee_id)
+
+    if "department" in update_data:
+        leave_engine.refresh_employee(employee_id)
 
     # Update user fullName if changed
     if "fullName" in update_data:
@@ -498,25 +828,58 @@ def update_employee(
             {"$set": {"fullName": update_data["fullName"]}},
         )
 
+    if "email" in update_data or "fullName" in update_data:
+        invalidation_bus.notify(users_collection.name)
+
+    audit_log.record(
+        "employee.updated", "employee", employee_id, user["email"],
+        {k: existing.get(k) for k in update_data}, update_data,
+    )
+
     return {"message": "Employee updated"}
 
 
-@app.delete("/api/employees/{employee_id}")
-def delete_employee(employee_id: str, user=Depends(require_roles(["ADMIN"]))):
-    emp = employee_collection.find_one({"employeeId": employee_id})
+@router.post("/api/employees/import", status_code=202)
+def import_employees(payload: EmployeeImportPayload, user=Depends(require_roles(["ADMIN", "HR"]))):
+    if not payload.employees:
+        raise HTTPException(status_code=400, detail="No employees to import")
+
+    # hashed here, in parallel (bcrypt releases the GIL): job params are stored
+    # in Mongo and must never hold a plaintext password
+    with ThreadPoolExecutor(EMPLOYEE_IMPORT_HASH_WORKERS) as pool:
+        hashes = list(pool.map(hash_password, (e.password for e in payload.employees)))
+
+    rows = [{**e.dict(exclude={"password"}), "passwordHash": h} for e, h in zip(payload.employees, hashes)]
+    job_id = enqueue_job("employee_import", {"employees": rows}, created_by=user["email"])
+    return job_accepted(job_id)
+
+
+@router.delete("/api/employees/{employee_id}", status_code=202)
+def delete_employee(
+    employee_id: str,
+    holdDays: Optional[int] = None,
+    user=Depends(require_roles(["ADMIN"]))
+):
+    emp = employee_collection.find_one({"employeeId": employee_id, **ACTIVE_EMPLOYEES})
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    employee_collection.delete_one({"employeeId": employee_id})
-
-    # delete attendance + leaves
-    attendance_collection.delete_many({"employeeId": employee_id})
-    leaves_collection.delete_many({"employeeId": employee_id})
+    # inactive now; attendance, leaves and payslips go after the hold (employee_purge.py)
+    purge_after = deactivate_employee(emp, holdDays)
 
     # delete login also
     users_collection.delete_one({"email": emp.get("email")})
+    invalidation_bus.notify(employee_collection.name)
+    invalidation_bus.notify(users_collection.name)
+    employee_search_index.remove(employee_id)
+    event_bus.publish("employee.deleted", employeeId=employee_id)
 
-    return {"message": "Employee deleted (and login removed)"}
+    job_id = enqueue_job("employee_purge", {"employeeId": employee_id}, created_by=user["email"], run_after=purge_after)
+    return {
+        "message": "Employee deactivated (and login removed)",
+        "purgeAfter": purge_after.isoformat(),
+        **job_accepted(job_id),
+    }
 
 
 # -----------------------
@@ -524,7 +887,7 @@ def delete_employee(employee_id: str, user=Depends(require_roles(["ADMIN"]))):
 # -----------------------
 
 
-@app.post("/api/attendance", status_code=201)
+@router.post("/api/attendance", status_code=201)
 def mark_attendance(
     att: AttendanceCreate,
     user=Depends(require_roles(["ADMIN", "HR", "EMPLOYEE"]))
@@ -543,39 +906,9 @@ def mark_attendance(
         if att.employeeId != emp["employeeId"]:
             raise HTTPException(status_code=403, detail="Not allowed")
 
-        # only today
-        today = date.today()
-        if att.date != today:
-            raise HTTPException(
-                status_code=400,
-                detail="Attendance can only be marked for today"
-            )
-
     date_str = att.date.isoformat()
 
-    existing = attendance_collection.find_one(
-        {"employeeId": att.employeeId, "date": date_str}
-    )
-
-    # calculating hours    
-    # -------------------
-    # helper: total hours
-    # -------------------
-    def calc_total_hours(check_in, check_out):
-        if not check_in or not check_out:
-            return "00:00"
-        try:
-            t1 = datetime.strptime(check_in, "%H:%M")
-            t2 = datetime.strptime(check_out, "%H:%M")
-            diff = t2 - t1
-            total_minutes = int(diff.total_seconds() // 60)
-            if total_minutes < 0:
-                return "00:00"
-            h = total_minutes // 60
-            m = total_minutes % 60
-            return f"{h:02d}:{m:02d}"
-        except:
-            return "00:00"    
+    existing = attendance_store.find_one(att.employeeId, date_str)
 
     # -------------------------
     # GEO-FENCING VALIDATION
@@ -596,6 +929,15 @@ def mark_attendance(
                 action="Check-out"
             )
 
+        # only today (in the office's local timezone, not the server's)
+        office_meta = office_meta_in or office_meta_out or {}
+        today = local_today(office_timezone(office_meta.get("officeId") or att.selectedOfficeId))
+        if att.date != today:
+            raise HTTPException(
+                status_code=400,
+                detail="Attendance can only be marked for today"
+            )
+
     # -------------------------------------
     # PREVENT CHECK-OUT WITHOUT CHECK-IN
     # -------------------------------------
@@ -625,9 +967,7 @@ def mark_attendance(
             "date": date_str,
             "status": att.status or "Present",
 
-            "checkInTime": att.checkInTime or "",
-            "checkOutTime": att.checkOutTime or "",
-            "totalHours": "00:00",
+            **encode_times(att.checkInTime, att.checkOutTime),
 
             "checkInLocation": att.checkInLocation.model_dump() if att.checkInLocation else None,
             "checkOutLocation": att.checkOutLocation.model_dump() if att.checkOutLocation else None,
@@ -644,9 +984,17 @@ def mark_attendance(
             doc["checkOutLocation"]["officeId"] = office_meta_out["officeId"]
             doc["checkOutLocation"]["distanceMeters"] = office_meta_out["distanceMeters"]
 
-        doc["totalHours"] = calc_total_hours(doc["checkInTime"], doc["checkOutTime"])
-
-        attendance_collection.insert_one(doc)
+        attendance_store.insert(doc)
+        invalidation_bus.notify(attendance_store.collection.name)
+        event_bus.publish(
+            "attendance.marked",
+            employeeId=att.employeeId,
+            date=date_str,
+            oldStatus=None,
+            newStatus=doc["status"],
+            wasOpen=False,
+            isOpen=bool(att.checkInTime and not att.checkOutTime),
+        )
         return {"message": "Attendance marked successfully"}
 
     # -------------------------
@@ -677,36 +1025,39 @@ def mark_attendance(
             update_data["checkOutLocation"]["officeId"] = office_meta_out["officeId"]
             update_data["checkOutLocation"]["distanceMeters"] = office_meta_out["distanceMeters"]
 
-    final_check_in = update_data.get("checkInTime", existing.get("checkInTime", ""))
-    final_check_out = update_data.get("checkOutTime", existing.get("checkOutTime", ""))
-
-    update_data["totalHours"] = calc_total_hours(final_check_in, final_check_out)
-
-    attendance_collection.update_one(
-        {"employeeId": att.employeeId, "date": date_str},
-        {"$set": update_data}
+    final_check_in = update_data.pop("checkInTime", existing.get("checkInTime", ""))
+    final_check_out = update_data.pop("checkOutTime", existing.get("checkOutTime", ""))
+
+    # always rewrite in the current schema (upgrades legacy docs on write)
+    update_data.update(encode_times(final_check_in, final_check_out))
+
+    attendance_store.update(att.employeeId, date_str, update_data, LEGACY_TIME_FIELDS)
+    invalidation_bus.notify(attendance_store.collection.name)
+    event_bus.publish(
+        "attendance.marked",
+        employeeId=att.employeeId,
+        date=date_str,
+        oldStatus=existing.get("status"),
+        newStatus=update_data.get("status", existing.get("status")),
+        wasOpen=bool(existing.get("checkInTime") and not existing.get("checkOutTime")),
+        isOpen=bool(final_check_in and not final_check_out),
     )
 
     return {"message": "Attendance updated successfully"}
 
 
 
-@app.get("/api/attendance")
+@router.get("/api/attendance")
 def get_all_attendance(
     employeeId: Optional[str] = None,
     startDate: Optional[str] = None,
     endDate: Optional[str] = None,
     user=Depends(require_roles(["ADMIN", "HR"])),
 ):
-    query = {}
-
-    if employeeId:
-        query["employeeId"] = employeeId
-
-    if startDate and endDate:
-        query["date"] = {"$gte": startDate, "$lte": endDate}
+    if not (startDate and endDate):
+        startDate = endDate = None
 
-    records = list(attendance_collection.find(query, {"_id": 0}).sort("date", -1))
+    records = find_all_tiers(employeeId, startDate, endDate, newest_first=True)
 
     # employeeId -> name
     emp_map = {
@@ -720,7 +1071,7 @@ def get_all_attendance(
     return records
 
 
-@app.get("/api/attendance/summary")
+@router.get("/api/attendance/summary")
 def attendance_summary(
     startDate: Optional[str] = None,
     endDate: Optional[str] = None,
@@ -736,23 +1087,59 @@ def attendance_summary(
             raise HTTPException(status_code=404, detail="Employee not linked")
         query["employeeId"] = emp["employeeId"]
     else:
+        use_reporting_reads()
         if employeeId:
             query["employeeId"] = employeeId
 
-    if startDate and endDate:
-        query["date"] = {"$gte": startDate, "$lte": endDate}
+    if not (startDate and endDate):
+        startDate = endDate = None
 
-    records = list(attendance_collection.find(query, {"_id": 0}))
-    summary = {"Present": 0, "Absent": 0, "Half-Day": 0, "Leave": 0}
+    return status_counts_all_tiers(query.get("employeeId"), startDate, endDate)
 
-    for r in records:
-        if r["status"] in summary:
-            summary[r["status"]] += 1
 
-    return summary
+@router.get("/api/attendance/total-hours")
+def attendance_total_hours(
+    startDate: Optional[str] = None,
+    endDate: Optional[str] = None,
+    employeeId: Optional[str] = None,
+    user=Depends(require_roles(["ADMIN", "HR"])),
+):
+    """Worked hours per employee, summed server-side with $sum (plus archived months)."""
+    use_reporting_reads()
+    if not (startDate and endDate):
+        startDate = endDate = None
+
+    match = {}
+    if employeeId:
+        match["employeeId"] = employeeId
+    if startDate and endDate:
+        match["date"] = {"$gte": startDate, "$lte": endDate}
+
+    totals = archived_minutes_by_employee(employeeId, startDate, endDate)
+
+    for r in attendance_store.aggregate(match, [
+        {"$group": {
+            "_id": "$employeeId",
+            "totalMinutes": {"$sum": total_minutes_expr()},
+            "days": {"$sum": 1},
+        }},
+    ]):
+        t = totals.setdefault(r["_id"], {"totalMinutes": 0, "days": 0})
+        t["totalMinutes"] += r["totalMinutes"]
+        t["days"] += r["days"]
+
+    return [
+        {
+            "employeeId": emp_id,
+            "days": t["days"],
+            "totalMinutes": t["totalMinutes"],
+            "totalHours": minutes_to_hhmm(t["totalMinutes"]),
+        }
+        for emp_id, t in sorted(totals.items())
+    ]
 
 
-@app.get("/api/attendance/export/csv")
+@router.get("/api/attendance/export/csv")
 def export_attendance_csv(
     startDate: Optional[str] = None,
     endDate: Optional[str] = None,
@@ -770,14 +1157,49 @@ def export_attendance_csv(
 
     # ADMIN/HR can export all or specific employee
     else:
+        use_reporting_reads()
         if employeeId:
             query["employeeId"] = employeeId
 
     # date filter
-    if startDate and endDate:
-        query["date"] = {"$gte": startDate, "$lte": endDate}
+    if not (startDate and endDate):
+        startDate = endDate = None
 
-    records = list(attendance_collection.find(query, {"_id": 0}))
+    content, _ = build_attendance_csv(query.get("employeeId"), startDate, endDate)
+
+    filename = "attendance.csv"
+    if user["role"] == "EMPLOYEE":
+        filename = f"my_attendance_{query['employeeId']}.csv"
+
+    return StreamingResponse(
+        iter([content]),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@router.post("/api/attendance/export/csv", status_code=202)
+def export_attendance_csv_job(
+    startDate: Optional[str] = None,
+    endDate: Optional[str] = None,
+    employeeId: Optional[str] = None,
+    user=Depends(require_roles(["ADMIN", "HR"])),
+):
+    # same export as GET, built by a job worker; download from /api/jobs/{jobId}/download
+    if not (startDate and endDate):
+        startDate = endDate = None
+
+    job_id = enqueue_job(
+        "attendance_export_csv",
+        {"employeeId": employeeId, "startDate": startDate, "endDate": endDate},
+        created_by=user["email"],
+    )
+    return job_accepted(job_id)
+
+
+def build_attendance_csv(employee_id: str | None = None, start: str | None = None, end: str | None = None):
+    """Returns (csv text, row count)."""
+    records = find_all_tiers(employee_id, start, end)
 
     # employeeId -> fullName
     emp_map = {
@@ -805,15 +1227,7 @@ def export_attendance_csv(
             r.get("totalHours", "00:00"),
         ])
 
-    filename = "attendance.csv"
-    if user["role"] == "EMPLOYEE":
-        filename = f"my_attendance_{query['employeeId']}.csv"
-
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
-    )
+    return output.getvalue(), len(records)
 
 
 
@@ -843,37 +1257,49 @@ def export_attendance_csv(
 #     return records
 
 
-@app.patch("/api/attendance/edit")
+@router.patch("/api/attendance/edit")
 def edit_attendance(
     payload: AttendanceEdit,
     user=Depends(require_roles(["ADMIN", "HR"]))
 ):
     date_str = payload.date.isoformat()
 
-    existing = attendance_collection.find_one(
-        {"employeeId": payload.employeeId, "date": date_str}
-    )
+    existing = attendance_store.find_one(payload.employeeId, date_str)
     if not existing:
         raise HTTPException(status_code=404, detail="Attendance record not found")
 
     update_data = {
         "status": payload.status,
-        "checkInTime": payload.checkInTime or "",
-        "checkOutTime": payload.checkOutTime or "",
         "editedBy": user["email"],
         "editReason": payload.reason,
         "editedAt": datetime.utcnow().isoformat()
     }
 
-    # recalc totalHours
-    update_data["totalHours"] = calc_total_hours(
-        update_data["checkInTime"],
-        update_data["checkOutTime"]
+    # times + recalculated total, stored as minutes
+    update_data.update(encode_times(payload.checkInTime, payload.checkOutTime))
+
+    attendance_store.update(payload.employeeId, date_str, update_data, LEGACY_TIME_FIELDS)
+    invalidation_bus.notify(attendance_store.collection.name)
+    event_bus.publish(
+        "attendance.edited",
+        employeeId=payload.employeeId,
+        date=date_str,
+        oldStatus=existing.get("status"),
+        newStatus=payload.status,
+        wasOpen=bool(existing.get("checkInTime") and not existing.get("checkOutTime")),
+        isOpen=bool(payload.checkInTime and not payload.checkOutTime),
     )
 
-    attendance_collection.update_one(
-        {"employeeId": payload.employeeId, "date": date_str},
-        {"$set": update_data}
+    # editedBy / editReason only hold the latest edit; the audit log keeps them all
+    audit_log.record(
+        "attendance.edited", "attendance", f"{payload.employeeId}:{date_str}", user["email"],
+        {k: existing.get(k) for k in ("status", "checkInTime", "checkOutTime")},
+        {
+            "status": payload.status,
+            "checkInTime": payload.checkInTime or None,
+            "checkOutTime": payload.checkOutTime or None,
+        },
+        meta={"reason": payload.reason},
     )
 
     return {"message": "Attendance updated by HR/Admin"}
@@ -886,7 +1312,7 @@ def edit_attendance(
 # -----------------------
 # Leave Management
 # -----------------------
-@app.post("/api/leaves", status_code=201)
+@router.post("/api/leaves", status_code=201)
 def apply_leave(data: LeaveCreate, user=Depends(require_roles(["EMPLOYEE", "ADMIN", "HR"]))):
     # EMPLOYEE can only apply for self
     if user["role"] == "EMPLOYEE":
@@ -896,6 +1322,30 @@ def apply_leave(data: LeaveCreate, user=Depends(require_roles(["EMPLOYEE", "ADMI
         if data.employeeId != emp["employeeId"]:
             raise HTTPException(status_code=403, detail="Not allowed")
 
+    if data.endDate < data.startDate:
+        raise HTTPException(status_code=400, detail="End date cannot be before start date")
+
+    # overlap with this employee's pending/approved leaves: in-process index first,
+    # then Mongo (covers leaves applied through another worker)
+    conflict = leave_engine.find_overlap(data.employeeId, data.startDate, data.endDate)
+    if not conflict:
+        conflict = leaves_collection.find_one(
+            {
+                "employeeId": data.employeeId,
+                "status": {"$in": list(ACTIVE_LEAVE_STATUSES)},
+                "startDate": {"$lte": data.endDate.isoformat()},
+                "endDate": {"$gte": data.startDate.isoformat()},
+            },
+            {"_id": 0, "leaveId": 1, "startDate": 1, "endDate": 1, "status": 1},
+        )
+    if conflict:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Leave overlaps an existing {conflict['status']} leave ({conflict['startDate']} to {conflict['endDate']})"
+        )
+
+    days_by_year = leave_days_by_year(data.startDate, data.endDate)
+
     leave_doc = {
         "leaveId": str(uuid.uuid4()),
         "employeeId": data.employeeId,
@@ -905,18 +1355,90 @@ def apply_leave(data: LeaveCreate, user=Depends(require_roles(["EMPLOYEE", "ADMI
         "status": "PENDING",
         "remark": "",
         "appliedAt": datetime.utcnow().isoformat(),
+
+        # working days per year, as booked in the leave ledger
+        "days": sum(days_by_year.values()),
+        "daysByYear": days_by_year,
+        "ledgerApplied": True,
     }
 
-    leaves_collection.insert_one(leave_doc)
+    def book(session):
+        # stamped per attempt: a retried transaction must not commit an old syncSeq
+        leave_doc.update(next_sync_stamp())
+        # balance check + pending booking in one conditional update per year
+        short = reserve_pending(data.employeeId, days_by_year, session=session)
+        if short:
+            year, available, requested = short
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient leave balance for {year}: {available:g} day(s) available, {requested:g} requested"
+            )
+        try:
+            leaves_collection.insert_one(leave_doc, session=session)
+        except PyMongoError:
+            if session is None:
+                # no transaction to roll the booking back
+                release_pending(data.employeeId, days_by_year)
+            raise
+
+    # ledger and leave together, in one transaction where the deployment supports it
+    run_transaction(book)
+    leave_engine.on_leave_saved(leave_doc)
+    invalidation_bus.notify(leaves_collection.name)
+    event_bus.publish("leave.applied", employeeId=data.employeeId, leaveId=leave_doc["leaveId"])
     return {"message": "Leave applied successfully"}
 
 
-@app.get("/api/leaves")
+@router.get("/api/leaves")
 def get_all_leaves(user=Depends(require_roles(["ADMIN", "HR"]))):
     return list(leaves_collection.find({}, {"_id": 0}))
 
 
-@app.get("/api/leaves/{employee_id}")
+@router.get("/api/leaves/team-calendar")
+def team_calendar(
+    startDate: date,
+    endDate: date,
+    department: Optional[str] = None,
+    user=Depends(require_roles(["ADMIN", "HR", "EMPLOYEE"])),
+):
+    """How many people of a department are on (approved / pending) leave each day."""
+    # EMPLOYEE sees only their own department
+    if user["role"] == "EMPLOYEE":
+        emp = employee_collection.find_one({"email": user["email"]}, {"department": 1})
+        if not emp:
+            raise HTTPException(status_code=404, detail="Employee not linked")
+        department = emp.get("department")
+
+    if not department:
+        raise HTTPException(status_code=400, detail="department is required")
+
+    if endDate < startDate:
+        raise HTTPException(status_code=400, detail="End date cannot be before start date")
+
+    if (endDate - startDate).days > 366:
+        raise HTTPException(status_code=400, detail="Range cannot exceed one year")
+
+    return {
+        "department": department,
+        "days": leave_engine.team_calendar(department, startDate, endDate),
+    }
+
+
+@router.get("/api/leaves/balance/{employee_id}")
+def leave_balance(
+    employee_id: str,
+    year: Optional[int] = None,
+    user=Depends(require_roles(["ADMIN", "HR", "EMPLOYEE"])),
+):
+    if user["role"] == "EMPLOYEE":
+        emp = employee_collection.find_one({"email": user["email"]}, {"employeeId": 1})
+        if not emp or emp["employeeId"] != employee_id:
+            raise HTTPException(status_code=403, detail="Not allowed")
+
+    return get_balance(employee_id, year or date.today().year)
+
+
+@router.get("/api/leaves/{employee_id}")
 def get_employee_leaves(
     employee_id: str, user=Depends(require_roles(["ADMIN", "HR", "EMPLOYEE"]))
 ):
@@ -928,7 +1450,7 @@ def get_employee_leaves(
     return list(leaves_collection.find({"employeeId": employee_id}, {"_id": 0}))
 
 
-@app.put("/api/leaves/action/{leave_id}")
+@router.put("/api/leaves/action/{leave_id}")
 def action_leave(
     leave_id: str, action: LeaveAction, user=Depends(require_roles(["ADMIN", "HR"]))
 ):
@@ -936,9 +1458,67 @@ def action_leave(
     if not leave:
         raise HTTPException(status_code=404, detail="Leave request not found")
 
-    leaves_collection.update_one(
-        {"leaveId": leave_id},
-        {"$set": {"status": action.status, "remark": action.remark}},
+    # leaves applied before the ledger existed were never booked as pending
+    days_by_year = leave.get("daysByYear") or leave_days_by_year(
+        date.fromisoformat(leave["startDate"]), date.fromisoformat(leave["endDate"])
+    )
+    old_status = leave["status"] if leave.get("ledgerApplied") else None
+
+    # approved -> attendance shows "Leave" on each working day; un-approved -> undo
+    attendance_days = []
+    if action.status == "APPROVED" and leave["status"] != "APPROVED":
+        attendance_days = working_dates_between(
+            date.fromisoformat(leave["startDate"]), date.fromisoformat(leave["endDate"])
+        )
+
+    def save(session):
+        # stamped per attempt: a retried transaction must not commit an old syncSeq
+        stamp = next_sync_stamp()
+        # only from the status read above: of two concurrent actions one wins,
+        # the other changes nothing (ledger and attendance included)
+        result = leaves_collection.update_one(
+            {"leaveId": leave_id, "status": leave["status"]},
+            {"$set": {
+                "status": action.status,
+                "remark": action.remark,
+                "daysByYear": days_by_year,
+                "ledgerApplied": True,
+                **stamp,
+            }},
+            session=session,
+        )
+        if result.matched_count == 0:
+            raise HTTPException(status_code=409, detail="Leave was changed by someone else, reload and try again")
+        apply_status_change(leave["employeeId"], days_by_year, old_status, action.status, session=session)
+
+        if attendance_days:
+            attendance_store.upsert_leave_days(leave["employeeId"], attendance_days, leave_id, session=session)
+        elif leave["status"] == "APPROVED" and action.status != "APPROVED":
+            attendance_store.remove_leave_days(leave["employeeId"], leave_id, session=session)
+
+    # one transaction where the deployment supports it
+    run_transaction(save)
+    leave_engine.on_leave_saved({**leave, "status": action.status})
+    invalidation_bus.notify(leaves_collection.name)
+
+    today = date.today().isoformat()
+    event_bus.publish(
+        "leave.actioned",
+        employeeId=leave["employeeId"],
+        leaveId=leave_id,
+        oldStatus=leave["status"],
+        newStatus=action.status,
+        # attendance "Leave" rows for today were added or removed
+        touchesToday=(
+            leave["startDate"] <= today <= leave["endDate"]
+            and (leave["status"] == "APPROVED") != (action.status == "APPROVED")
+        ),
+    )
+    audit_log.record(
+        "leave.actioned", "leave", leave_id, user["email"],
+        {"status": leave["status"], "remark": leave.get("remark")},
+        {"status": action.status, "remark": action.remark},
+        meta={"employeeId": leave["employeeId"]},
     )
 
     return {"message": f"Leave {action.status}"}
@@ -947,60 +1527,70 @@ def action_leave(
 # -----------------------
 # Dashboards
 # -----------------------
-@app.get("/api/dashboard/total-employees")
+# total / today / pending are served from the in-memory live counters
+
+@router.get("/api/dashboard/total-employees")
 def total_employees(user=Depends(require_roles(["ADMIN", "HR"]))):
-    return {"totalEmployees": employee_collection.count_documents({})}
+    return {"totalEmployees": live_counters.snapshot()["totalEmployees"]}
 
 
-@app.get("/api/dashboard/today-attendance")
+@router.get("/api/dashboard/today-attendance")
 def today_attendance(user=Depends(require_roles(["ADMIN", "HR"]))):
-    today = date.today().isoformat()
-    records = list(attendance_collection.find({"date": today}, {"_id": 0}))
+    return live_counters.snapshot()["todayAttendance"]
 
-    summary = {"Present": 0, "Absent": 0, "Half-Day": 0, "Leave": 0}
-    for r in records:
-        if r["status"] in summary:
-            summary[r["status"]] += 1
 
-    return summary
+@router.get("/api/dashboard/pending-leaves")
+def pending_leaves(user=Depends(require_roles(["ADMIN", "HR"]))):
+    return {"pendingLeaves": live_counters.snapshot()["pendingLeaves"]}
 
 
-@app.get("/api/dashboard/pending-leaves")
-def pending_leaves(user=Depends(require_roles(["ADMIN", "HR"]))):
-    pending = leaves_collection.count_documents({"status": "PENDING"})
-    return {"pendingLeaves": pending}
+@router.get("/api/dashboard/live")
+async def dashboard_live(request: Request, user=Depends(require_roles(["ADMIN", "HR"]))):
+    """
+    Server-Sent Events: a "snapshot" of all counters, then a "delta" event
+    whenever attendance, leaves or headcount change.
+    """
+    entry = live_counters.subscribe_queue()
+    queue = entry[1]
 
+    async def stream():
+        try:
+            snapshot = await asyncio.to_thread(live_counters.snapshot)
+            yield sse_message("snapshot", snapshot)
+
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            live_counters.unsubscribe_queue(entry)
 
-@app.get("/api/dashboard/monthly-attendance")
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/api/dashboard/monthly-attendance")
 def monthly_attendance(user=Depends(require_roles(["ADMIN", "HR"]))):
+    use_reporting_reads()
     today = datetime.today()
     start_date = today - timedelta(days=30)
 
     start = start_date.date().isoformat()
     end = today.date().isoformat()
 
-    records = list(
-        attendance_collection.find({"date": {"$gte": start, "$lte": end}}, {"_id": 0})
-    )
+    records = attendance_store.find(start=start, end=end)
+    return count_statuses_by_date(records)
 
-    grouped = {}
-    for r in records:
-        d = r["date"]
-        if d not in grouped:
-            grouped[d] = {
-                "date": d,
-                "Present": 0,
-                "Absent": 0,
-                "Half-Day": 0,
-                "Leave": 0,
-            }
-        if r["status"] in grouped[d]:
-            grouped[d][r["status"]] += 1
-
-    return sorted(grouped.values(), key=lambda x: x["date"])
 
-
-@app.get("/api/dashboard/employee-summary")
+@router.get("/api/dashboard/employee-summary")
 def employee_dashboard_summary(user=Depends(require_roles(["EMPLOYEE"]))):
     emp = employee_collection.find_one({"email": user["email"]}, {"_id": 0})
     if not emp:
@@ -1008,59 +1598,24 @@ def employee_dashboard_summary(user=Depends(require_roles(["EMPLOYEE"]))):
 
     employeeId = emp["employeeId"]
 
-    records = list(attendance_collection.find({"employeeId": employeeId}, {"_id": 0}))
-    attendance_summary = {"Present": 0, "Absent": 0, "Half-Day": 0, "Leave": 0}
-
-    for r in records:
-        if r["status"] in attendance_summary:
-            attendance_summary[r["status"]] += 1
+    attendance_summary = status_counts_all_tiers(employeeId)
 
-    leave_summary = {"PENDING": 0, "APPROVED": 0, "REJECTED": 0}
     leaves = list(leaves_collection.find({"employeeId": employeeId}, {"_id": 0}))
-    for l in leaves:
-        if l["status"] in leave_summary:
-            leave_summary[l["status"]] += 1
+    leave_summary = count_statuses(leaves, keys=("PENDING", "APPROVED", "REJECTED"))
+
+    leave_balance = get_balance(employeeId, date.today().year)
 
     return {
         "employeeId": employeeId,
         "fullName": emp["fullName"],
         "attendanceSummary": attendance_summary,
         "leaveSummary": leave_summary,
+        "leaveBalance": leave_balance,
     }
 
 
-# Time calculation 
-
-def time_to_minutes(t: str):
-    # "09:10" -> 550
-    h, m = t.split(":")
-    return int(h) * 60 + int(m)
-
-def minutes_to_hhmm(total_minutes: int):
-    h = total_minutes // 60
-    m = total_minutes % 60
-    return f"{h:02d}:{m:02d}"
-
-
 # Location fetching function and api 
 
-def haversine_distance_m(lat1, lng1, lat2, lng2):
-    R = 6371000  # meters
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lng2 - lng1)
-
-    a = (
-        math.sin(dphi / 2) ** 2
-        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    )
-
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
-
-
 def validate_office_location(location: dict | None, action="Check-in"):
     """
     Validates employee location based on active office branches.
@@ -1078,7 +1633,7 @@ def validate_office_location(location: dict | None, action="Check-in"):
         raise HTTPException(status_code=400, detail=f"{action} location invalid")
 
     # Check if geo-fencing enabled
-    setting = settings_collection.find_one({"key": "attendance_geo_fencing"}, {"_id": 0})
+    setting = get_setting("attendance_geo_fencing")
     geo_enabled = setting.get("enabled", False) if setting else False
 
     # If disabled, allow any location
@@ -1090,66 +1645,17 @@ def validate_office_location(location: dict | None, action="Check-in"):
         }
 
     # Fetch all active offices
-    offices = list(office_collection.find({"isActive": True}, {"_id": 0}))
-
-    if not offices:
-        raise HTTPException(status_code=400, detail="No active office branches found")
-
-    # If employee selected officeId
-    selected_office_id = location.get("officeId")
-    if selected_office_id:
-        office = office_collection.find_one({"officeId": selected_office_id, "isActive": True}, {"_id": 0})
-        if not office:
-            raise HTTPException(status_code=400, detail="Selected office branch not found")
+    offices = active_offices()
 
-        dist = haversine_distance_m(lat, lng, office["lat"], office["lng"])
-
-        # Printing Longitude and Latitude for debugging 
-        print("EMPLOYEE LAT LNG:", lat, lng)
-        print("OFFICE LAT LNG:", office["lat"], office["lng"])
-        print("DISTANCE:", dist)
-        print("ALLOWED RADIUS:", office.get("radiusMeters", 300))
-
-        if dist > office.get("radiusMeters", 300):
-            raise HTTPException(
-                status_code=403,
-                detail=f"{action} denied. You are {int(dist)}m away from {office['officeName']} (allowed {office.get('radiusMeters',300)}m)"
-            )
-
-        return {
-            "officeId": office["officeId"],
-            "officeName": office["officeName"],
-            "distanceMeters": round(dist, 2),
-        }
-
-    # Else: auto-detect nearest office
-    nearest = None
-    nearest_dist = 999999999
-
-    for o in offices:
-        dist = haversine_distance_m(lat, lng, o["lat"], o["lng"])
-        if dist < nearest_dist:
-            nearest_dist = dist
-            nearest = o
-
-    # Validate nearest office radius
-    allowed_radius = nearest.get("radiusMeters", 300)
-
-    if nearest_dist > allowed_radius:
-        raise HTTPException(
-            status_code=403,
-            detail=f"{action} denied. Not in any office area (nearest: {nearest['officeName']} {int(nearest_dist)}m away)"
-        )
-
-    return {
-        "officeId": nearest["officeId"],
-        "officeName": nearest["officeName"],
-        "distanceMeters": round(nearest_dist, 2),
-    }
+    return match_office_location(
+        lat, lng, offices,
+        selected_office_id=location.get("officeId"),
+        action=action,
+    )
 
 
 
-@app.post("/api/attendance/preview-location")
+@router.post("/api/attendance/preview-location")
 def preview_location(
     location: LocationPayload,
     user=Depends(require_roles(["EMPLOYEE"]))
@@ -1160,7 +1666,7 @@ def preview_location(
 
 # Multiple Office binding with location 
 
-@app.post("/api/offices", status_code=201)
+@router.post("/api/offices", status_code=201)
 def create_office(
     office: OfficeCreate,
     user=Depends(require_roles(["ADMIN"]))
@@ -1169,17 +1675,18 @@ def create_office(
     if existing:
         raise HTTPException(status_code=400, detail="Office ID already exists")
 
-    office_collection.insert_one(office.dict())
+    office_collection.insert_one({**office.dict(), **next_sync_stamp()})
+    invalidation_bus.notify(office_collection.name)
     return {"message": "Office branch created"}
 
 
 
-@app.get("/api/offices")
+@router.get("/api/offices")
 def get_offices(user=Depends(require_roles(["ADMIN", "HR", "EMPLOYEE"]))):
     offices = list(office_collection.find({}, {"_id": 0}))
     return offices
 
-@app.patch("/api/settings/attendance-geo-fencing")
+@router.patch("/api/settings/attendance-geo-fencing")
 def update_geo_fencing(
     payload: GeoFenceSetting,
     user=Depends(require_roles(["ADMIN"]))
@@ -1189,10 +1696,11 @@ def update_geo_fencing(
         {"$set": {"enabled": payload.enabled}},
         upsert=True
     )
+    invalidation_bus.notify(settings_collection.name)
     return {"message": "Geo-fencing setting updated"}
 
 
-@app.put("/api/offices/{office_id}")
+@router.put("/api/offices/{office_id}")
 def update_office(
     office_id: str,
     office: OfficeCreate,
@@ -1204,12 +1712,15 @@ def update_office(
 
     office_collection.update_one(
         {"officeId": office_id},
-        {"$set": office.dict()}
+        {"$set": {**office.dict(), **next_sync_stamp()}}
     )
 
+    # also drops cached holiday calendars (region may have changed)
+    invalidation_bus.notify(office_collection.name)
+
     return {"message": "Office updated successfully"}
 
-@app.delete("/api/offices/{office_id}")
+@router.delete("/api/offices/{office_id}")
 def delete_office(
     office_id: str,
     user=Depends(require_roles(["ADMIN"]))
@@ -1219,56 +1730,220 @@ def delete_office(
         raise HTTPException(status_code=404, detail="Office not found")
 
     office_collection.delete_one({"officeId": office_id})
+    record_deletes(office_collection.name, [{"officeId": office_id}])
+    invalidation_bus.notify(office_collection.name)
 
     return {"message": "Office deleted successfully"}
 
 
-# Attendance Geo fencing apis
+# Holiday calendar APIs
 
-@app.get("/api/settings/attendance-geo-fencing")
-def get_geo_fencing(user=Depends(require_roles(["ADMIN"]))):
-    s = settings_collection.find_one({"key": "attendance_geo_fencing"}, {"_id": 0})
-    return {"enabled": s.get("enabled", False) if s else False}
+@router.post("/api/holidays", status_code=201)
+def create_holiday(
+    holiday: HolidayCreate,
+    user=Depends(require_roles(["ADMIN", "HR"]))
+):
+    if holiday.officeId and not office_collection.find_one({"officeId": holiday.officeId}):
+        raise HTTPException(status_code=404, detail="Office not found")
 
+    query = {"date": holiday.date.isoformat(), "officeId": holiday.officeId, "region": holiday.region}
+    if holidays_collection.find_one(query):
+        raise HTTPException(status_code=400, detail="Holiday already exists for this date")
 
+    holidays_collection.insert_one({
+        "holidayId": str(uuid.uuid4()),
+        **query,
+        "name": holiday.name.strip(),
+        "createdBy": user["email"],
+        "createdAt": datetime.utcnow().isoformat(),
+    })
+    invalidation_bus.notify(holidays_collection.name)
 
-# Auto Checkout attendance at 7:00 PM 
+    return {"message": "Holiday added"}
 
-def auto_checkout():
-    today = datetime.today().date().isoformat()
 
-    records = list(attendance_collection.find({
-        "date": today,
-        "checkInTime": {"$ne": ""},
-        "checkOutTime": ""
-    }))
+@router.get("/api/holidays")
+def get_holidays(
+    year: Optional[int] = None,
+    officeId: Optional[str] = None,
+    user=Depends(require_roles(["ADMIN", "HR", "EMPLOYEE"]))
+):
+    year = year or date.today().year
+    query = {"date": {"$gte": f"{year}-01-01", "$lte": f"{year}-12-31"}}
+    if officeId:
+        query["officeId"] = {"$in": [None, officeId]}
 
-    for r in records:
-        total = calc_total_hours(r.get("checkInTime"), "19:00")
-        attendance_collection.update_one(
-            {"employeeId": r["employeeId"], "date": today},
-            {"$set": {"checkOutTime": "19:00", "totalHours": total, "autoCheckout": True}}
-        )
+    return list(holidays_collection.find(query, {"_id": 0}).sort("date", 1))
+
+
+@router.delete("/api/holidays/{holiday_id}")
+def delete_holiday(
+    holiday_id: str,
+    user=Depends(require_roles(["ADMIN", "HR"]))
+):
+    result = holidays_collection.delete_one({"holidayId": holiday_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Holiday not found")
+
+    invalidation_bus.notify(holidays_collection.name)
+    return {"message": "Holiday deleted"}
+
+
+@router.get("/api/calendar/working-days")
+def get_working_days(
+    startDate: date,
+    endDate: date,
+    officeId: Optional[str] = None,
+    user=Depends(require_roles(["ADMIN", "HR", "EMPLOYEE"]))
+):
+    if endDate < startDate:
+        raise HTTPException(status_code=400, detail="End date cannot be before start date")
 
-    print(f"Auto checkout done for {len(records)} users on {today}")
+    return {
+        "startDate": startDate.isoformat(),
+        "endDate": endDate.isoformat(),
+        "officeId": officeId,
+        "workingDays": working_days_between(startDate, endDate, officeId),
+    }
 
 
-@app.post("/api/auto-checkout")
+# Attendance Geo fencing apis
+
+@router.get("/api/settings/attendance-geo-fencing")
+def get_geo_fencing(user=Depends(require_roles(["ADMIN"]))):
+    s = get_setting("attendance_geo_fencing")
+    return {"enabled": s.get("enabled", False) if s else False}
+
+
+
+# Auto Checkout attendance at each office's local cutoff (default 7:00 PM)
+
+def auto_checkout(force: bool = False):
+    # one bulk batch per (timezone, cutoff) group of offices
+    return auto_checkout_sweep(force=force)
+
+
+@router.post("/api/auto-checkout")
 def trigger_auto_checkout():
-    auto_checkout()
+    auto_checkout(force=True)
     return {"message": "Auto checkout completed manually."}
 
 # -----------------------------
-# Scheduler: Run Auto-Checkout Daily at 19:00
+# Scheduler: sweep every 5 minutes; each office group is checked out
+# once per local day after its cutoff.
+# Jobs are registered here and started from the app lifespan.
+# Only the worker holding the Mongo lease runs them.
 # -----------------------------
-scheduler = BackgroundScheduler()
-scheduler.add_job(auto_checkout, "cron", hour=19, minute=0)
-scheduler.start()
+register_job("auto_checkout_sweep", auto_checkout, "interval", record=False, minutes=5)
+
+# Nightly: move months older than HRMS_ARCHIVE_AFTER_DAYS to the cold tier
+register_job("attendance_archive", archive_old_attendance, "cron", hour=2, minute=30)
+
+# 1 Jan: create / top up every employee's leave ledger for the new year
+register_job("leave_accrual", accrue_year, "cron", month=1, day=1, hour=0, minute=10)
+
+# Nightly: drop sync tombstones older than HRMS_SYNC_TOMBSTONE_DAYS
+register_job("sync_tombstone_prune", prune_tombstones, "cron", hour=3, minute=0)
+
+
+@router.get("/api/scheduler/runs")
+def scheduler_runs(
+    jobId: Optional[str] = None,
+    limit: int = 50,
+    admin=Depends(require_roles(["ADMIN"]))
+):
+    return {
+        "instanceId": INSTANCE_ID,
+        "isLeader": is_leader(),
+        "runs": get_job_runs(jobId, min(limit, 500)),
+    }
+
+
+@router.get("/api/admin/cache-invalidation")
+def cache_invalidation_status(admin=Depends(require_roles(["ADMIN"]))):
+    return {"mode": invalidation_bus.mode, "collections": list(WATCHED_COLLECTIONS)}
+
+
+@router.get("/api/admin/read-routing")
+def read_routing_status(admin=Depends(require_roles(["ADMIN"]))):
+    # reads per route ("primary" / "reporting") and collection since startup
+    return read_routing_stats()
+
+
+@router.get("/api/admin/startup-profile")
+def startup_profile_report(admin=Depends(require_roles(["ADMIN"]))):
+    return startup_profile.report()
+
+
+@router.get("/api/admin/audit")
+def audit_entries(
+    actor: Optional[str] = None,
+    entity: Optional[str] = None,
+    entityId: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = DEFAULT_AUDIT_LIMIT,
+    admin=Depends(require_roles(["ADMIN"]))
+):
+    # entity: attendance | leave | employee | user | payslip; newest first
+    return query_audit(actor, entity, entityId, start, end, limit)
+
+
+@router.get("/api/admin/audit/status")
+def audit_status(admin=Depends(require_roles(["ADMIN"]))):
+    return audit_log.stats()
+
+
+@router.get("/api/admin/admission")
+def admission_status(admin=Depends(require_roles(["ADMIN"]))):
+    # per class: limit, queue depth, active / waiting now, admitted / queued / rejected so far
+    return admission_stats.report()
+
+
+@router.get("/api/admin/profiles")
+def request_profiles(
+    route: Optional[str] = None,
+    minLatencyMs: Optional[float] = None,
+    limit: int = 50,
+    admin=Depends(require_roles(["ADMIN"]))
+):
+    # newest first; route is the path template, e.g. /api/attendance/export/csv
+    return list_profiles(route, minLatencyMs, limit)
+
+
+@router.get("/api/admin/profiles/{profile_id}")
+def request_profile_download(
+    profile_id: str,
+    format: str = "html",
+    admin=Depends(require_roles(["ADMIN"]))
+):
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(PROFILE_FORMATS)}")
+
+    doc = request_profiles_collection.find_one({"_id": profile_id})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    try:
+        content = render_profile(doc, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    ext = {"html": "html", "speedscope": "speedscope.json", "text": "txt"}[format]
+    return Response(
+        content,
+        media_type=PROFILE_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename=profile-{profile_id}.{ext}"},
+    )
+
+
+@router.get("/api/admin/migrations")
+def migrations_status(admin=Depends(require_roles(["ADMIN"]))):
+    return get_migration_status()
 
 
 # Get Self Attendance 
 
-@app.get("/api/attendance/me")
+@router.get("/api/attendance/me")
 def get_my_attendance(user=Depends(require_roles(["EMPLOYEE"]))):
     emp = employee_collection.find_one(
         {"email": user["email"]},
@@ -1277,12 +1952,7 @@ def get_my_attendance(user=Depends(require_roles(["EMPLOYEE"]))):
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not linked")
 
-    records = list(
-        attendance_collection.find(
-            {"employeeId": emp["employeeId"]},
-            {"_id": 0}
-        ).sort("date", -1)
-    )
+    records = attendance_store.find(emp["employeeId"], newest_first=True)
 
     for r in records:
         r["fullName"] = emp.get("fullName", "")
@@ -1294,24 +1964,27 @@ def get_my_attendance(user=Depends(require_roles(["EMPLOYEE"]))):
 
 # Payslip generation APIs
 
-@app.post("/api/payslips/generate")
+# amounts a generated payslip is audited with
+PAYSLIP_AUDIT_FIELDS = ("basicSalary", "hra", "allowance", "deduction", "totalEarnings", "netSalary")
+
+
+@router.post("/api/payslips/generate")
 def generate_payslip(
     payload: PayslipGeneratePayload,
     admin=Depends(require_roles(["ADMIN", "HR"]))
 ):
     emp = employee_collection.find_one(
-        {"employeeId": payload.employeeId},
+        {"employeeId": payload.employeeId, **ACTIVE_EMPLOYEES},
         {"_id": 0, "password": 0}
     )
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    monthYear = f"{payload.month} {payload.year}"
+    month = month_number(payload.month)
+    monthName = calendar.month_name[month]
+    monthYear = f"{monthName} {payload.year}"
 
-    existing = payslips_collection.find_one({
-        "employeeId": payload.employeeId,
-        "monthYear": monthYear
-    })
+    existing = payslips_collection.find_one(period_filter(payload.employeeId, payload.year, month))
     if existing:
         raise HTTPException(status_code=400, detail="Payslip already generated for this month")
 
@@ -1320,7 +1993,7 @@ def generate_payslip(
     if netSalary < 0:
         netSalary = 0
 
-    payslipId = f"PS-{payload.year}-{payload.month[:3].upper()}-{payload.employeeId}"
+    payslipId = f"PS-{payload.year}-{monthName[:3].upper()}-{payload.employeeId}"
 
     doc = {
         "payslipId": payslipId,
@@ -1328,6 +2001,8 @@ def generate_payslip(
         "fullName": emp.get("fullName", ""),
         "email": emp.get("email", ""),
         "monthYear": monthYear,
+        **period_fields(payload.year, month),
+        "department": emp.get("department"),
 
         "basicSalary": float(payload.basicSalary),
         "hra": float(payload.hra),
@@ -1338,30 +2013,38 @@ def generate_payslip(
         "netSalary": float(netSalary),
 
         "generatedBy": admin["email"],
-        "generatedAt": datetime.utcnow().isoformat()
+        "generatedAt": datetime.utcnow().isoformat(),
+        **next_sync_stamp(),
     }
 
-    result = payslips_collection.insert_one(doc)
+    try:
+        result = payslips_collection.insert_one(doc)
+    except DuplicateKeyError:
+        # generated concurrently (another request or a payroll run) since the check above
+        raise HTTPException(status_code=400, detail="Payslip already generated for this month")
     doc["_id"] = str(result.inserted_id)
+    audit_log.record(
+        "payslip.generated", "payslip", payslipId, admin["email"],
+        None, {k: doc[k] for k in PAYSLIP_AUDIT_FIELDS},
+        meta={"employeeId": payload.employeeId, "monthYear": monthYear},
+    )
     return {"message": "Payslip generated successfully", "payslip": doc}
     
 
-@app.delete("/api/payslips/{employeeId}/{month}/{year}")
+@router.delete("/api/payslips/{employeeId}/{month}/{year}")
 def delete_payslip(
     employeeId: str,
     month: str,
     year: int,
     admin=Depends(require_roles(["ADMIN", "HR"]))
 ):
-    monthYear = f"{month} {year}"
-
-    result = payslips_collection.delete_one({
-        "employeeId": employeeId,
-        "monthYear": monthYear
-    })
+    deleted = payslips_collection.find_one_and_delete(
+        period_filter(employeeId, year, month_number(month)), {"payslipId": 1}
+    )
 
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Payslip not found")
+    record_deletes(payslips_collection.name, [{"payslipId": deleted.get("payslipId")}])
 
     return {"message": "Payslip deleted successfully"}
 
@@ -1423,7 +2106,7 @@ def delete_payslip(
 # Employee views own payslips
 
 
-@app.get("/api/payslips/me")
+@router.get("/api/payslips/me")
 def get_my_payslips(user=Depends(require_roles(["EMPLOYEE"]))):
 
     emp = employee_collection.find_one(
@@ -1439,14 +2122,137 @@ def get_my_payslips(user=Depends(require_roles(["EMPLOYEE"]))):
     slips = list(payslips_collection.find(
         {"employeeId": employeeId},
         {"_id": 0}
-    ).sort("generatedAt", -1))
+    ).sort([("period", -1), ("generatedAt", -1)]))
 
     return slips
 
 
+@router.get("/api/payslips/me/totals")
+def get_my_payslip_totals(
+    scope: str = "ytd",
+    user=Depends(require_roles(["EMPLOYEE"]))
+):
+    emp = employee_collection.find_one(
+        {"email": user["email"]},
+        {"employeeId": 1, "_id": 0}
+    )
+    if not emp:
+        raise HTTPException(status_code=404, detail="Employee not linked")
+
+    if scope == "ytd":
+        return payslip_totals_ytd(employeeId=emp["employeeId"], admin=user)
+    if scope == "financial-year":
+        return payslip_totals_financial_year(employeeId=emp["employeeId"], admin=user)
+    raise HTTPException(status_code=400, detail="scope must be ytd or financial-year")
+
+
+# Year-to-date / financial-year totals, summed by aggregation on the period index
+
+def _check_group_by(groupBy: str):
+    if groupBy not in ("employee", "department"):
+        raise HTTPException(status_code=400, detail="groupBy must be employee or department")
+
+
+@router.get("/api/payslips/totals/ytd")
+def payslip_totals_ytd(
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    employeeId: Optional[str] = None,
+    department: Optional[str] = None,
+    groupBy: str = "employee",
+    admin=Depends(require_roles(["ADMIN", "HR"]))
+):
+    _check_group_by(groupBy)
+    use_reporting_reads()
+    today = date.today()
+    year = year or today.year
+    month = month or (today.month if year == today.year else 12)
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="month must be 1-12")
+
+    return {
+        "year": year,
+        "throughMonth": month,
+        "results": payslip_totals(year * 100 + 1, year * 100 + month, employeeId, department, groupBy),
+    }
+
+
+@router.get("/api/payslips/totals/financial-year")
+def payslip_totals_financial_year(
+    fyStartYear: Optional[int] = None,
+    employeeId: Optional[str] = None,
+    department: Optional[str] = None,
+    groupBy: str = "employee",
+    admin=Depends(require_roles(["ADMIN", "HR"]))
+):
+    _check_group_by(groupBy)
+    use_reporting_reads()
+    fyStartYear = fyStartYear or financial_year_start()
+    start, end = financial_year_range(fyStartYear)
+
+    return {
+        "fyStartYear": fyStartYear,
+        "fromPeriod": start,
+        "toPeriod": end,
+        "results": payslip_totals(start, end, employeeId, department, groupBy),
+    }
+
+
+# Server-side PDFs: one slip, or a whole month for a department as a streamed ZIP
+
+@router.get("/api/payslips/export/zip")
+def export_payslips_zip(
+    month: str,
+    year: int,
+    department: Optional[str] = None,
+    admin=Depends(require_roles(["ADMIN", "HR"]))
+):
+    use_reporting_reads()
+    m = month_number(month)
+    query = {"period": year * 100 + m}
+    if department:
+        query["department"] = department
+
+    # cursor, not a list: slips are pulled, rendered and zipped in batches
+    cursor = payslips_collection.find(query, {"_id": 0}).sort("employeeId", 1)
+
+    filename = f"payslips_{calendar.month_name[m]}_{year}"
+    if department:
+        filename += f"_{department.replace(' ', '_')}"
+
+    return StreamingResponse(
+        stream_payslip_zip(cursor),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.zip"'},
+    )
+
+
+@router.get("/api/payslips/{employeeId}/{month}/{year}/pdf")
+def get_payslip_pdf_file(
+    employeeId: str,
+    month: str,
+    year: int,
+    user=Depends(require_roles(["ADMIN", "HR", "EMPLOYEE"]))
+):
+    if user.get("role") == "EMPLOYEE":
+        emp = employee_collection.find_one({"email": user["email"]}, {"employeeId": 1, "_id": 0})
+        if not emp or emp["employeeId"] != employeeId:
+            raise HTTPException(status_code=403, detail="Not allowed")
+
+    slip = payslips_collection.find_one(period_filter(employeeId, year, month_number(month)), {"_id": 0})
+    if not slip:
+        raise HTTPException(status_code=404, detail="Payslip not found")
+
+    return Response(
+        content=get_payslip_pdf(slip),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{pdf_filename(slip)}"'},
+    )
+
+
 # Admin/HR views payslips of any employee
 
-@app.get("/api/payslips/{employeeId}")
+@router.get("/api/payslips/{employeeId}")
 def get_employee_payslips(
     employeeId: str,
     admin=Depends(require_roles(["ADMIN", "HR"]))
@@ -1454,6 +2260,212 @@ def get_employee_payslips(
     slips = list(payslips_collection.find(
         {"employeeId": employeeId},
         {"_id": 0}
-    ).sort("generatedAt", -1))
+    ).sort([("period", -1), ("generatedAt", -1)]))
 
     return slips
+
+
+# Payroll run: payslips for a whole month from attendance + salary
+
+@router.get("/api/settings/payroll-rules")
+def payroll_rules(user=Depends(require_roles(["ADMIN", "HR"]))):
+    return get_payroll_rules()
+
+
+@router.put("/api/settings/payroll-rules")
+def update_payroll_rules(
+    payload: PayrollRules,
+    admin=Depends(require_roles(["ADMIN"]))
+):
+    if payload.basicPercent + payload.hraPercent > 1:
+        raise HTTPException(status_code=400, detail="basicPercent + hraPercent cannot exceed 1")
+
+    save_payroll_rules(payload)
+    return {"message": "Payroll rules updated"}
+
+
+@router.post("/api/payroll/run")
+def payroll_run(
+    payload: PayrollRunPayload,
+    response: Response,
+    admin=Depends(require_roles(["ADMIN", "HR"]))
+):
+    # a dry run writes nothing and answers inline; a real run is a job
+    if payload.dryRun:
+        return run_payroll(
+            payload.month,
+            payload.year,
+            generated_by=admin["email"],
+            department=payload.department,
+            overwrite=payload.overwrite,
+            dry_run=True,
+        )
+
+    month_number(payload.month)  # 400 on a bad month before queueing
+    job_id = enqueue_job(
+        "payroll_run",
+        {**payload.dict(exclude={"dryRun"}), "generatedBy": admin["email"]},
+        created_by=admin["email"],
+    )
+    response.status_code = 202
+    return job_accepted(job_id)
+
+
+# -----------------------
+# Background jobs
+# -----------------------
+# Job types are registered here and run by the worker pool started from
+# the app lifespan. POST endpoints answer 202 with a jobId; poll
+# GET /api/jobs/{jobId} and fetch files from /api/jobs/{jobId}/download.
+EMPLOYEE_IMPORT_CHUNK = 500
+EMPLOYEE_IMPORT_HASH_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def job_accepted(job_id: str):
+    return {"jobId": job_id, "status": "QUEUED", "statusUrl": f"/api/jobs/{job_id}"}
+
+
+def attendance_export_job(ctx, employeeId=None, startDate=None, endDate=None):
+    use_reporting_reads()
+    content, rows = build_attendance_csv(employeeId, startDate, endDate)
+    return {"rows": rows, **ctx.save_file("attendance.csv", content, "text/csv")}
+
+
+def payroll_run_job(ctx, month, year, department=None, overwrite=False, generatedBy=None):
+    return run_payroll(month, year, generated_by=generatedBy, department=department, overwrite=overwrite)
+
+
+def employee_import_job(ctx, employees: list):
+    # passwords arrive hashed (import_employees)
+    emails = [r["email"].lower().strip() for r in employees]
+    taken_emails = {u["email"] for u in users_collection.find({"email": {"$in": emails}}, {"email": 1})}
+    taken_emails |= {e["email"] for e in employee_collection.find({"email": {"$in": emails}}, {"email": 1})}
+    taken_ids = {
+        e["employeeId"]
+        for e in employee_collection.find({"employeeId": {"$in": [r["employeeId"] for r in employees]}}, {"employeeId": 1})
+    }
+    held = {}
+    for e in employee_collection.find(
+        {"status": "INACTIVE", "$or": [
+            {"employeeId": {"$in": list(taken_ids)}},
+            {"formerEmail": {"$in": emails}},
+        ]},
+        {"employeeId": 1, "formerEmail": 1, "purgeAfter": 1},
+    ):
+        held[e["employeeId"]] = held[e.get("formerEmail")] = e
+
+    # a retried run finds its own earlier inserts here and skips them
+    docs, skipped = [], []
+    created_at = datetime.utcnow().isoformat()
+    for r, email in zip(employees, emails):
+        if r["employeeId"] in held or email in held:
+            emp = held.get(r["employeeId"]) or held[email]
+            skipped.append({"employeeId": r["employeeId"], "reason": held_employee_error(emp)})
+            continue
+        if email in taken_emails:
+            skipped.append({"employeeId": r["employeeId"], "reason": "Email already exists"})
+            continue
+        if r["employeeId"] in taken_ids:
+            skipped.append({"employeeId": r["employeeId"], "reason": "Employee ID already exists"})
+            continue
+        taken_emails.add(email)
+        taken_ids.add(r["employeeId"])
+        docs.append({
+            "employeeId": r["employeeId"],
+            "fullName": r["fullName"],
+            "email": email,
+            "department": r["department"],
+            "designation": r["designation"],
+            "salary": r["salary"],
+            "password": r["passwordHash"],
+            "createdAt": created_at,
+        })
+
+    for i in range(0, len(docs), EMPLOYEE_IMPORT_CHUNK):
+        chunk = docs[i:i + EMPLOYEE_IMPORT_CHUNK]
+        stamp = next_sync_stamp()
+        employee_collection.insert_many([{**d, **stamp} for d in chunk])
+        for d in chunk:
+            employee_search_index.upsert(d["employeeId"])
+            event_bus.publish("employee.created", employeeId=d["employeeId"])
+        ctx.progress(i + len(chunk), len(docs), "Creating employees", force=True)
+
+    if docs:
+        invalidation_bus.notify(employee_collection.name)
+
+    return {"requested": len(employees), "created": len(docs), "skipped": skipped}
+
+
+register_job_type("attendance_export_csv", attendance_export_job)
+register_job_type("payroll_run", payroll_run_job)
+register_job_type("employee_import", employee_import_job)
+register_job_type("employee_purge", purge_employee, max_attempts=5)
+
+# finished jobs (and their files) are kept for HRMS_JOB_RETENTION_DAYS
+register_job("job_cleanup", purge_finished_jobs, "cron", hour=3, minute=30)
+# the leader's host; other hosts prune their own cache as they write (payslip_pdf.py)
+register_job("pdf_cache_prune", prune_pdf_cache, "cron", hour=3, minute=45)
+
+
+def _visible_job(job_id: str, user: dict):
+    job = get_job(job_id)
+    # other users' jobs look the same as missing ones
+    if not job or (user["role"] != "ADMIN" and job.get("createdBy") != user["email"]):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/api/jobs")
+def get_jobs(
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+    mine: bool = False,
+    limit: int = 50,
+    user=Depends(require_roles(["ADMIN", "HR"]))
+):
+    # HR sees its own jobs; ADMIN sees all unless mine=true
+    created_by = user["email"] if mine or user["role"] != "ADMIN" else None
+    return list_jobs(status, type, created_by, max(1, min(limit, 500)))
+
+
+@router.get("/api/jobs/{job_id}")
+def get_job_status(job_id: str, user=Depends(get_current_user)):
+    return job_view(_visible_job(job_id, user))
+
+
+@router.get("/api/jobs/{job_id}/download")
+def download_job_file(job_id: str, user=Depends(get_current_user)):
+    job = _visible_job(job_id, user)
+    if job["status"] != "SUCCESS":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    result = job.get("result")
+    if not isinstance(result, dict) or "fileId" not in result:
+        raise HTTPException(status_code=404, detail="Job has no file")
+
+    chunks = open_job_file(result["fileId"])
+    if chunks is None:
+        raise HTTPException(status_code=404, detail="File no longer available")
+
+    return StreamingResponse(
+        chunks,
+        media_type=result["contentType"],
+        headers={"Content-Disposition": f"attachment; filename={result['filename']}"},
+    )
+
+
+# -----------------------
+# Delta sync ("changes since")
+# -----------------------
+@router.get("/api/sync/{collection}")
+def sync_changes(
+    collection: str,
+    since: int = 0,
+    limit: int = DEFAULT_SYNC_LIMIT,
+    user=Depends(require_roles(["ADMIN", "HR"]))
+):
+    # collection: employees | attendance | leaves | offices | payslips
+    return changes_since(collection, since, limit)
+
+
+app = create_app()
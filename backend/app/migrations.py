@@ -0,0 +1,347 @@
+"""
+Batched, resumable data migrations.
+
+Run from the backend folder, e.g. in the background on a worker box:
+
+    python -m app.migrations attendance_v2 --batch-size 1000 --sleep 0.2
+
+Progress is checkpointed in the `migrations` collection after every batch,
+so an interrupted run continues where it stopped when started again.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.database import (
+    attendance_collection,
+    attendance_monthly_collection,
+    employee_collection,
+    leaves_collection,
+    office_collection,
+    migrations_collection,
+    payslips_collection,
+)
+from app.attendance_codec import SCHEMA_VERSION, LEGACY_TIME_FIELDS, encode_times
+from app.attendance_store import MonthlyBucketAttendanceStore, attendance_store
+from app.payslip_periods import ensure_payslip_indexes, parse_month_year, period_fields
+from app.sync_sequence import next_sync_stamp
+
+
+def get_migration_status(name: str | None = None):
+    query = {"_id": name} if name else {}
+    docs = list(migrations_collection.find(query))
+    for d in docs:
+        d["name"] = d.pop("_id")
+    return docs
+
+
+def _checkpoint(name: str, **fields):
+    migrations_collection.update_one(
+        {"_id": name},
+        {"$set": {**fields, "updatedAt": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+def migrate_attendance_v2(batch_size: int = 1000, sleep_seconds: float = 0.0, max_batches: int | None = None):
+    """
+    Rewrites legacy attendance documents (HH:MM strings) into schema v2
+    (integer minutes). Walks the collection in _id order from the last
+    checkpoint. Documents upgraded concurrently by the API are skipped by
+    the update filter; documents with unparsable times are left as they are
+    and counted as failed.
+    """
+    name = "attendance_v2"
+    state = migrations_collection.find_one({"_id": name}) or {}
+    last_id = state.get("lastId")
+    migrated = state.get("migrated", 0)
+    failed = state.get("failed", 0)
+
+    _checkpoint(name, status="RUNNING", startedAt=state.get("startedAt") or datetime.utcnow())
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        query = {"schemaVersion": {"$ne": SCHEMA_VERSION}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+
+        docs = list(
+            attendance_collection.find(query, {"_id": 1, "checkInTime": 1, "checkOutTime": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+        if not docs:
+            _checkpoint(name, status="DONE", finishedAt=datetime.utcnow())
+            return {"migrated": migrated, "failed": failed, "status": "DONE"}
+
+        ops = []
+        for d in docs:
+            try:
+                fields = encode_times(d.get("checkInTime"), d.get("checkOutTime"))
+            except HTTPException:
+                failed += 1
+                continue
+
+            ops.append(UpdateOne(
+                {"_id": d["_id"], "schemaVersion": {"$ne": SCHEMA_VERSION}},
+                {"$set": fields, "$unset": LEGACY_TIME_FIELDS},
+            ))
+
+        if ops:
+            result = attendance_collection.bulk_write(ops, ordered=False)
+            migrated += result.modified_count
+
+        last_id = docs[-1]["_id"]
+        batches += 1
+        _checkpoint(name, lastId=last_id, migrated=migrated, failed=failed)
+
+        if sleep_seconds:
+            # keep the primary responsive for foreground traffic
+            time.sleep(sleep_seconds)
+
+    _checkpoint(name, status="PAUSED")
+    return {"migrated": migrated, "failed": failed, "status": "PAUSED"}
+
+
+def migrate_attendance_monthly(batch_size: int = 1000, sleep_seconds: float = 0.0, max_batches: int | None = None):
+    """
+    Copies daily attendance documents into monthly buckets
+    (for switching to HRMS_ATTENDANCE_STORAGE=monthly). Legacy time strings
+    are converted to schema v2 on the way. Days already present in a bucket
+    are skipped, so re-running is safe. The daily collection is not modified.
+    """
+    name = "attendance_monthly"
+    state = migrations_collection.find_one({"_id": name}) or {}
+    last_id = state.get("lastId")
+    migrated = state.get("migrated", 0)
+    failed = state.get("failed", 0)
+
+    _checkpoint(name, status="RUNNING", startedAt=state.get("startedAt") or datetime.utcnow())
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        docs = list(attendance_collection.find(query).sort("_id", 1).limit(batch_size))
+        if not docs:
+            _checkpoint(name, status="DONE", finishedAt=datetime.utcnow())
+            return {"migrated": migrated, "failed": failed, "status": "DONE"}
+
+        ops = []
+        for d in docs:
+            day = {k: v for k, v in d.items() if k not in ("_id", "employeeId")}
+            if day.get("schemaVersion") != SCHEMA_VERSION:
+                try:
+                    day.update(encode_times(day.get("checkInTime"), day.get("checkOutTime")))
+                except HTTPException:
+                    failed += 1
+                    continue
+                for f in LEGACY_TIME_FIELDS:
+                    day.pop(f, None)
+
+            update = {
+                "$setOnInsert": {"employeeId": d["employeeId"], "month": d["date"][:7]},
+                "$push": {"days": day},
+                "$inc": {f"counts.{d['status']}": 1},
+            }
+            if "syncSeq" in day:
+                update["$max"] = {"syncSeq": day["syncSeq"]}
+            ops.append(UpdateOne(
+                {"_id": MonthlyBucketAttendanceStore.bucket_id(d["employeeId"], d["date"]), "days.date": {"$ne": d["date"]}},
+                update,
+                upsert=True,
+            ))
+
+        if ops:
+            try:
+                result = attendance_monthly_collection.bulk_write(ops, ordered=False)
+                migrated += result.upserted_count + result.modified_count
+            except BulkWriteError as e:
+                # duplicate key = day already in its bucket (re-run), not a failure
+                details = e.details
+                migrated += details.get("nUpserted", 0) + details.get("nModified", 0)
+                failed += sum(1 for err in details.get("writeErrors", []) if err.get("code") != 11000)
+
+        last_id = docs[-1]["_id"]
+        batches += 1
+        _checkpoint(name, lastId=last_id, migrated=migrated, failed=failed)
+
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    _checkpoint(name, status="PAUSED")
+    return {"migrated": migrated, "failed": failed, "status": "PAUSED"}
+
+
+def migrate_payslip_periods(batch_size: int = 1000, sleep_seconds: float = 0.0, max_batches: int | None = None):
+    """
+    Backfills numeric year / month / period (and the employee's current
+    department) on payslips that only have the monthYear string. Slips whose
+    monthYear cannot be parsed, or whose period the employee already has a
+    slip for, are left alone and counted as failed.
+    """
+    name = "payslip_periods"
+    state = migrations_collection.find_one({"_id": name}) or {}
+    last_id = state.get("lastId")
+    migrated = state.get("migrated", 0)
+    failed = state.get("failed", 0)
+
+    _checkpoint(name, status="RUNNING", startedAt=state.get("startedAt") or datetime.utcnow())
+    ensure_payslip_indexes()
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        query = {"period": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+
+        docs = list(
+            payslips_collection.find(query, {"_id": 1, "employeeId": 1, "monthYear": 1, "department": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+        if not docs:
+            _checkpoint(name, status="DONE", finishedAt=datetime.utcnow())
+            return {"migrated": migrated, "failed": failed, "status": "DONE"}
+
+        departments = {
+            e["employeeId"]: e.get("department")
+            for e in employee_collection.find(
+                {"employeeId": {"$in": list({d.get("employeeId") for d in docs})}},
+                {"_id": 0, "employeeId": 1, "department": 1},
+            )
+        }
+
+        ops = []
+        for d in docs:
+            try:
+                year, month = parse_month_year(d.get("monthYear"))
+            except HTTPException:
+                failed += 1
+                continue
+
+            fields = period_fields(year, month)
+            if not d.get("department"):
+                fields["department"] = departments.get(d.get("employeeId"))
+            ops.append(UpdateOne({"_id": d["_id"], "period": {"$exists": False}}, {"$set": fields}))
+
+        if ops:
+            try:
+                result = payslips_collection.bulk_write(ops, ordered=False)
+                migrated += result.modified_count
+            except BulkWriteError as e:
+                # a slip for the same employee and period already exists: the
+                # unique index keeps both as they are, to be resolved by hand
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+                migrated += e.details.get("nModified", 0)
+                failed += len(e.details["writeErrors"])
+
+        last_id = docs[-1]["_id"]
+        batches += 1
+        _checkpoint(name, lastId=last_id, migrated=migrated, failed=failed)
+
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    _checkpoint(name, status="PAUSED")
+    return {"migrated": migrated, "failed": failed, "status": "PAUSED"}
+
+
+def migrate_sync_sequence(batch_size: int = 1000, sleep_seconds: float = 0.0, max_batches: int | None = None):
+    """
+    Stamps documents written before the sync feed existed with a syncSeq /
+    updatedAt, so a client syncing from since=0 receives them too. One
+    sequence number per batch. Attendance is stamped in the active layout
+    (for monthly buckets: only the days that have no stamp yet).
+    """
+    name = "sync_sequence"
+    state = migrations_collection.find_one({"_id": name}) or {}
+    migrated = state.get("migrated", 0)
+
+    _checkpoint(name, status="RUNNING", startedAt=state.get("startedAt") or datetime.utcnow())
+
+    unstamped = {"syncSeq": {"$exists": False}}
+    monthly = isinstance(attendance_store, MonthlyBucketAttendanceStore)
+    targets = [employee_collection, leaves_collection, office_collection, payslips_collection]
+    if not monthly:
+        targets.append(attendance_collection)
+
+    batches = 0
+    for collection in targets:
+        while max_batches is None or batches < max_batches:
+            ids = [d["_id"] for d in collection.find(unstamped, {"_id": 1}).limit(batch_size)]
+            if not ids:
+                break
+            result = collection.update_many({"_id": {"$in": ids}, **unstamped}, {"$set": next_sync_stamp()})
+            migrated += result.modified_count
+            batches += 1
+            _checkpoint(name, collection=collection.name, migrated=migrated)
+            if sleep_seconds:
+                time.sleep(sleep_seconds)
+
+    if monthly:
+        buckets = attendance_monthly_collection
+        unstamped_days = {"days": {"$elemMatch": {"syncSeq": {"$exists": False}}}}
+        while max_batches is None or batches < max_batches:
+            ids = [d["_id"] for d in buckets.find(unstamped_days, {"_id": 1}).limit(batch_size)]
+            if not ids:
+                break
+            stamp = next_sync_stamp()
+            result = buckets.update_many(
+                {"_id": {"$in": ids}},
+                {
+                    "$set": {f"days.$[d].{k}": v for k, v in stamp.items()},
+                    "$max": {"syncSeq": stamp["syncSeq"]},
+                },
+                array_filters=[{"d.syncSeq": {"$exists": False}}],
+            )
+            migrated += result.modified_count
+            batches += 1
+            _checkpoint(name, collection=buckets.name, migrated=migrated)
+            if sleep_seconds:
+                time.sleep(sleep_seconds)
+
+    if max_batches is not None and batches >= max_batches:
+        _checkpoint(name, status="PAUSED")
+        return {"migrated": migrated, "status": "PAUSED"}
+
+    _checkpoint(name, status="DONE", finishedAt=datetime.utcnow())
+    return {"migrated": migrated, "status": "DONE"}
+
+
+MIGRATIONS = {
+    "attendance_v2": migrate_attendance_v2,
+    "attendance_monthly": migrate_attendance_monthly,
+    "payslip_periods": migrate_payslip_periods,
+    "sync_sequence": migrate_sync_sequence,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a batched HRMS data migration")
+    parser.add_argument("name", choices=sorted(MIGRATIONS))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--sleep", type=float, default=0.0, help="seconds to pause between batches")
+    parser.add_argument("--max-batches", type=int, default=None)
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    args = parser.parse_args(argv)
+
+    if args.restart:
+        migrations_collection.delete_one({"_id": args.name})
+
+    result = MIGRATIONS[args.name](
+        batch_size=args.batch_size,
+        sleep_seconds=args.sleep,
+        max_batches=args.max_batches,
+    )
+    print(f"{args.name}: {result}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import logging
+import os
+import uuid
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from tzlocal import get_localzone_name
+
+from app.database import office_collection
+from app.config_cache import get_office
+from app.attendance_codec import LEGACY_TIME_FIELDS, encode_times
+from app.attendance_store import attendance_store
+from app.invalidation import invalidation_bus
+from app.live_counters import event_bus
+from app.scheduler import run_once
+
+logger = logging.getLogger(__name__)
+
+
+# Offices without a timezone (and check-ins without an office, e.g. geo-fencing
+# disabled) fall back to this zone. Defaults to the server zone = old behaviour.
+DEFAULT_TIMEZONE = os.getenv("HRMS_DEFAULT_TIMEZONE") or get_localzone_name()
+DEFAULT_CHECKOUT_CUTOFF = os.getenv("HRMS_DEFAULT_CHECKOUT_CUTOFF", "19:00")
+# how far back a sweep looks for check-ins its earlier batches missed
+AUTO_CHECKOUT_LOOKBACK_DAYS = int(os.getenv("HRMS_AUTO_CHECKOUT_LOOKBACK_DAYS", "7"))
+
+
+@lru_cache(maxsize=None)
+def get_zone(tz_name: str | None) -> ZoneInfo:
+    return ZoneInfo(tz_name or DEFAULT_TIMEZONE)
+
+
+def local_now(tz_name: str | None = None) -> datetime:
+    return datetime.now(get_zone(tz_name))
+
+
+def local_today(tz_name: str | None = None) -> date:
+    return local_now(tz_name).date()
+
+
+def office_timezone(office_id: str | None) -> str:
+    if not office_id:
+        return DEFAULT_TIMEZONE
+
+    return (get_office(office_id) or {}).get("timezone") or DEFAULT_TIMEZONE
+
+
+# -----------------------
+# Auto checkout batches
+# -----------------------
+def office_checkout_groups():
+    """
+    Groups offices by (timezone, checkoutCutoff).
+    The default group also owns check-ins with no office recorded (officeId None).
+    """
+    groups = {}
+    default_key = (DEFAULT_TIMEZONE, DEFAULT_CHECKOUT_CUTOFF)
+    groups[default_key] = [None]
+
+    for o in office_collection.find({}, {"_id": 0, "officeId": 1, "timezone": 1, "checkoutCutoff": 1}):
+        key = (o.get("timezone") or DEFAULT_TIMEZONE, o.get("checkoutCutoff") or DEFAULT_CHECKOUT_CUTOFF)
+        groups.setdefault(key, []).append(o["officeId"])
+
+    return groups
+
+
+def _checkout_at_cutoff(rows: list, cutoff: str):
+    # a check-in made after the cutoff is closed at its own time (0 hours)
+    updates = [
+        (
+            r["employeeId"],
+            r["date"],
+            {**encode_times(r["checkInTime"], max(cutoff, r["checkInTime"])), "autoCheckout": True},
+            LEGACY_TIME_FIELDS,
+        )
+        for r in rows
+    ]
+
+    updated = attendance_store.bulk_update(updates)
+    if updated:
+        invalidation_bus.notify(attendance_store.collection.name)
+    return updated
+
+
+def auto_checkout_batch(office_ids: list, day: str, cutoff: str):
+    """
+    Checks out everyone still checked in on `day` whose check-in was recorded
+    at one of `office_ids`, using one bulk_write. Returns rows updated.
+    """
+    updated = _checkout_at_cutoff(attendance_store.open_checkins(day, office_ids), cutoff)
+    event_bus.publish("attendance.auto_checkout", date=day, count=updated)
+    return updated
+
+
+def stale_checkout_batch(office_ids: list, before: str, cutoff: str):
+    """
+    Checks out what is still open in the AUTO_CHECKOUT_LOOKBACK_DAYS before
+    `before`: check-ins made after that day's batch ran, or days the sweep
+    never ran for.
+    """
+    since = (date.fromisoformat(before) - timedelta(days=AUTO_CHECKOUT_LOOKBACK_DAYS)).isoformat()
+    rows = attendance_store.open_checkins({"$gte": since, "$lt": before}, office_ids)
+    return _checkout_at_cutoff(rows, cutoff)
+
+
+def auto_checkout_sweep(force: bool = False):
+    """
+    Runs every few minutes on the scheduler leader. Each timezone group is
+    checked out once per local day, as soon as its local cutoff has passed,
+    and once per local day (from its first sweep) for earlier days still open.
+    `force` ignores the cutoff (manual trigger).
+    Returns total rows updated by this sweep.
+    """
+    total = 0
+
+    for (tz_name, cutoff), office_ids in office_checkout_groups().items():
+        now = local_now(tz_name)
+        day = now.date().isoformat()
+
+        stale = run_once(
+            "auto_checkout",
+            f"{tz_name}:{cutoff}:before:{day}",
+            lambda ids=office_ids, d=day, c=cutoff: stale_checkout_batch(ids, d, c),
+            scheduled_for=now,
+        )
+        if stale is not None:
+            total += stale.get("rowsAffected") or 0
+
+        if not force and now.strftime("%H:%M") < cutoff:
+            continue
+
+        # scheduled slots are claimed once per local day; manual runs never block them
+        slot = f"{tz_name}:{cutoff}:{day}"
+        if force:
+            slot += f":manual:{uuid.uuid4().hex[:8]}"
+
+        result = run_once(
+            "auto_checkout",
+            slot,
+            lambda ids=office_ids, d=day, c=cutoff: auto_checkout_batch(ids, d, c),
+            scheduled_for=now,
+            trigger_type="manual" if force else "scheduled",
+        )
+        if result is None:
+            # another sweep already did this group today
+            continue
+
+        total += result.get("rowsAffected") or 0
+        logger.info("auto checkout done", extra={
+            "timezone": tz_name,
+            "cutoff": cutoff,
+            "day": day,
+            "rowsAffected": result.get("rowsAffected"),
+        })
+
+    return total
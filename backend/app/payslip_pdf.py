@@ -0,0 +1,205 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from app.payslip_render import RENDERER_VERSION, render_payslip_pdf
+
+
+# -----------------------
+# Payslip PDFs
+# -----------------------
+# Rendering is CPU bound, so it runs in a process pool (spawned, so workers
+# never inherit the parent's MongoClient). Finished PDFs are cached on disk
+# under the SHA-256 of the payslip content: an unchanged slip is rendered
+# once, an edited or regenerated slip gets a new key automatically.
+# Superseded PDFs are never read again, so the cache is pruned: files not
+# read for PDF_CACHE_MAX_AGE_DAYS go, then the least recently read ones until
+# the directory is under PDF_CACHE_MAX_MB. A hit touches the file's mtime, so
+# mtime is the last read. Pruning runs nightly and, because the cache lives
+# on each host's disk and the scheduler only runs on one, also after every
+# PDF_CACHE_PRUNE_EVERY writes of this process.
+PDF_CACHE_DIR = os.getenv("HRMS_PDF_CACHE_DIR", os.path.join("cache", "payslip_pdfs"))
+PDF_CACHE_MAX_MB = int(os.getenv("HRMS_PDF_CACHE_MAX_MB", "512"))
+PDF_CACHE_MAX_AGE_DAYS = int(os.getenv("HRMS_PDF_CACHE_MAX_AGE_DAYS", "30"))
+PDF_CACHE_PRUNE_EVERY = int(os.getenv("HRMS_PDF_CACHE_PRUNE_EVERY", "500"))
+PDF_WORKERS = int(os.getenv("HRMS_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# slips rendered per pool round trip while streaming a ZIP
+ZIP_RENDER_BATCH = 16
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_cache_writes = 0
+_prune_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pdf_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def content_hash(slip: dict):
+    doc = {k: v for k, v in slip.items() if k != "_id"}
+    raw = json.dumps(doc, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(f"v{RENDERER_VERSION}:{raw}".encode()).hexdigest()
+
+
+def _cache_path(key: str):
+    return os.path.join(PDF_CACHE_DIR, key[:2], f"{key}.pdf")
+
+
+def _cache_get(key: str):
+    path = _cache_path(key)
+    try:
+        with open(path, "rb") as f:
+            pdf = f.read()
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)      # last read, for pruning
+    except FileNotFoundError:
+        pass                # pruned meanwhile; we already have the bytes
+    return pdf
+
+
+def _cache_put(key: str, pdf: bytes):
+    global _cache_writes
+    path = _cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # write-then-rename so concurrent readers never see a partial file
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(pdf)
+    os.replace(tmp, path)
+
+    with _prune_lock:
+        _cache_writes += 1
+        due = PDF_CACHE_PRUNE_EVERY and _cache_writes % PDF_CACHE_PRUNE_EVERY == 0
+    if due:
+        prune_pdf_cache()
+
+
+def prune_pdf_cache(now: float | None = None):
+    """
+    Removes cached PDFs not read for PDF_CACHE_MAX_AGE_DAYS, then the least
+    recently read ones until the cache fits PDF_CACHE_MAX_MB. Returns how
+    many files were removed.
+    """
+    now = now or time.time()
+    max_age = PDF_CACHE_MAX_AGE_DAYS * 86400
+    entries = []
+    for root, _, names in os.walk(PDF_CACHE_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            # leftovers of a crashed write are never renamed into place
+            if name.endswith(".tmp") and now - st.st_mtime > 3600:
+                entries.append((0, 0, path))
+            elif name.endswith(".pdf"):
+                entries.append((st.st_mtime, st.st_size, path))
+
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    budget = PDF_CACHE_MAX_MB * 1024 * 1024
+
+    removed = 0
+    for mtime, size, path in entries:
+        if now - mtime <= max_age and total <= budget:
+            break       # oldest first: everything after this is newer
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    return removed
+
+
+def render_many(slips: list):
+    """PDF bytes for each slip, in order; cache misses are rendered in parallel."""
+    keys = [content_hash(s) for s in slips]
+    pdfs = [_cache_get(k) for k in keys]
+
+    missing = [i for i, pdf in enumerate(pdfs) if pdf is None]
+    if missing:
+        rendered = _get_pool().map(render_payslip_pdf, [slips[i] for i in missing])
+        for i, pdf in zip(missing, rendered):
+            _cache_put(keys[i], pdf)
+            pdfs[i] = pdf
+    return pdfs
+
+
+def get_payslip_pdf(slip: dict):
+    return render_many([slip])[0]
+
+
+def pdf_filename(slip: dict):
+    month = (slip.get("monthYear") or "").replace(" ", "_")
+    return f"{slip.get('employeeId')}_{month}_payslip.pdf"
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write target for ZipFile; chunks are drained after every entry."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_payslip_zip(slips):
+    """
+    Generator of ZIP bytes for an iterable (e.g. a cursor) of payslips.
+    Only one render batch is held in memory at a time; PDFs are already
+    compressed, so entries are stored rather than deflated.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        batch = []
+        for slip in slips:
+            batch.append(slip)
+            if len(batch) == ZIP_RENDER_BATCH:
+                for s, pdf in zip(batch, render_many(batch)):
+                    zf.writestr(pdf_filename(s), pdf)
+                    yield sink.drain()
+                batch = []
+
+        for s, pdf in zip(batch, render_many(batch)):
+            zf.writestr(pdf_filename(s), pdf)
+            yield sink.drain()
+
+    yield sink.drain()
@@ -0,0 +1,120 @@
+import calendar
+import os
+from datetime import date
+
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING
+
+from app.database import payslips_collection
+
+
+# -----------------------
+# Payslip periods
+# -----------------------
+# Every payslip carries numeric period keys next to the display string:
+# {monthYear: "March 2026", year: 2026, month: 3, period: 202603, department}
+# `period` (year * 100 + month) turns "year to date" and "financial year"
+# into one indexed range each.
+FY_START_MONTH = int(os.getenv("HRMS_FY_START_MONTH", "4"))
+
+# money fields summed by the totals endpoints
+PAYSLIP_AMOUNT_FIELDS = ("basicSalary", "hra", "allowance", "deduction", "totalEarnings", "netSalary")
+
+
+def month_number(month: str):
+    """ "March" / "mar" / "3" -> 3 """
+    m = month.strip().lower()
+    if m.isdigit() and 1 <= int(m) <= 12:
+        return int(m)
+    for i in range(1, 13):
+        if m in (calendar.month_name[i].lower(), calendar.month_abbr[i].lower()):
+            return i
+    raise HTTPException(status_code=400, detail=f"Invalid month: {month}")
+
+
+def period_fields(year: int, month: int):
+    return {"year": year, "month": month, "period": year * 100 + month}
+
+
+def parse_month_year(month_year: str):
+    """ "March 2026" -> (2026, 3); raises HTTPException on anything else. """
+    parts = (month_year or "").split()
+    if len(parts) != 2 or not parts[1].isdigit():
+        raise HTTPException(status_code=400, detail=f"Invalid monthYear: {month_year}")
+    return int(parts[1]), month_number(parts[0])
+
+
+def period_filter(employee_id: str, year: int, month: int):
+    # monthYear fallback covers slips the payslip_periods migration has not reached yet
+    return {
+        "employeeId": employee_id,
+        "$or": [
+            {"period": year * 100 + month},
+            {"period": {"$exists": False}, "monthYear": f"{calendar.month_name[month]} {year}"},
+        ],
+    }
+
+
+def ensure_payslip_indexes():
+    payslips_collection.create_index([("employeeId", ASCENDING), ("period", DESCENDING)])
+    # one payslip per employee and month, even when two writers race; slips the
+    # payslip_periods migration has not reached yet have no period and are exempt
+    payslips_collection.create_index(
+        [("employeeId", ASCENDING), ("period", ASCENDING)],
+        unique=True,
+        partialFilterExpression={"period": {"$exists": True}},
+        name="employeeId_period_unique",
+    )
+    payslips_collection.create_index([("department", ASCENDING), ("period", DESCENDING)])
+
+
+def financial_year_start(today: date | None = None):
+    """Calendar year in which the current financial year began."""
+    today = today or date.today()
+    return today.year if today.month >= FY_START_MONTH else today.year - 1
+
+
+def financial_year_range(fy_start_year: int):
+    start = fy_start_year * 100 + FY_START_MONTH
+    end_year = fy_start_year + 1 if FY_START_MONTH > 1 else fy_start_year
+    end_month = FY_START_MONTH - 1 if FY_START_MONTH > 1 else 12
+    return start, end_year * 100 + end_month
+
+
+def payslip_totals(start_period: int, end_period: int, employee_id: str | None = None,
+                   department: str | None = None, group_by: str = "employee"):
+    """
+    Sums of the payslip amounts in [start_period, end_period], per employee
+    or per department, in one aggregation.
+    """
+    match = {"period": {"$gte": start_period, "$lte": end_period}}
+    if employee_id:
+        match["employeeId"] = employee_id
+    if department:
+        match["department"] = department
+
+    key = "$department" if group_by == "department" else "$employeeId"
+    group = {
+        "_id": key,
+        "payslips": {"$sum": 1},
+        "fromPeriod": {"$min": "$period"},
+        "toPeriod": {"$max": "$period"},
+        **{f: {"$sum": {"$ifNull": [f"${f}", 0]}} for f in PAYSLIP_AMOUNT_FIELDS},
+    }
+    if group_by != "department":
+        group["fullName"] = {"$first": "$fullName"}
+        group["department"] = {"$first": "$department"}
+
+    rows = payslips_collection.aggregate([
+        {"$match": match},
+        {"$group": group},
+        {"$sort": {"_id": 1}},
+    ])
+
+    results = []
+    for r in rows:
+        r["department" if group_by == "department" else "employeeId"] = r.pop("_id")
+        for f in PAYSLIP_AMOUNT_FIELDS:
+            r[f] = round(r[f], 2)
+        results.append(r)
+    return results
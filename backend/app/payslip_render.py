@@ -0,0 +1,91 @@
+"""
+Payslip -> PDF bytes (fpdf2, pure Python).
+
+Kept free of database / app imports: it runs inside worker processes, which
+import only this module. fpdf2 itself is imported on the first render, so
+the API process (which only needs RENDERER_VERSION) never loads it.
+"""
+
+# bump when the layout changes so cached PDFs are re-rendered
+RENDERER_VERSION = 1
+
+
+def _text(value):
+    # core PDF fonts are latin-1 only
+    return str(value if value is not None else "-").encode("latin-1", "replace").decode("latin-1")
+
+
+def _amount(value):
+    return f"{float(value or 0):,.2f}"
+
+
+def _table(pdf, heading: str, rows: list):
+    pdf.set_font("Helvetica", "B", 11)
+    pdf.set_fill_color(41, 128, 185)
+    pdf.set_text_color(255, 255, 255)
+    pdf.cell(120, 8, _text(heading), border=1, fill=True)
+    pdf.cell(60, 8, "Amount (INR)", border=1, fill=True, align="R", new_x="LMARGIN", new_y="NEXT")
+
+    pdf.set_text_color(0, 0, 0)
+    for label, value, bold in rows:
+        pdf.set_font("Helvetica", "B" if bold else "", 11)
+        pdf.cell(120, 8, _text(label), border=1)
+        pdf.cell(60, 8, _amount(value), border=1, align="R", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(6)
+
+
+def render_payslip_pdf(slip: dict) -> bytes:
+    """Same layout as the client-side payslip download."""
+    basic = float(slip.get("basicSalary") or 0)
+    hra = float(slip.get("hra") or 0)
+    allowance = float(slip.get("allowance") or 0)
+    overtime = float(slip.get("overtimePay") or 0)
+    total = slip.get("totalEarnings")
+    total = float(total) if total is not None else basic + hra + allowance + overtime
+
+    from fpdf import FPDF
+
+    pdf = FPDF(format="A4")
+    pdf.set_creator("HRMS Lite")
+    pdf.set_title(_text(f"Payslip {slip.get('employeeId')} {slip.get('monthYear')}"))
+    pdf.add_page()
+
+    pdf.set_font("Helvetica", "B", 18)
+    pdf.cell(0, 12, "HRMS Lite - Payslip", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(2)
+
+    pdf.set_font("Helvetica", "", 12)
+    for label, key in (
+        ("Employee Name", "fullName"),
+        ("Email", "email"),
+        ("Employee ID", "employeeId"),
+        ("Department", "department"),
+        ("Month", "monthYear"),
+    ):
+        pdf.cell(0, 8, _text(f"{label}: {slip.get(key) or '-'}"), new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(4)
+
+    earnings = [
+        ("Basic Salary", basic, False),
+        ("HRA", hra, False),
+        ("Allowance", allowance, False),
+    ]
+    if overtime:
+        earnings.append((f"Overtime ({slip.get('overtimeHours', 0)} h)", overtime, False))
+    earnings.append(("Total Earnings", total, True))
+    _table(pdf, "Earnings", earnings)
+
+    lop = f" (loss of pay, {slip['lopDays']} days)" if slip.get("lopDays") else ""
+    _table(pdf, "Deductions", [(f"Deductions{lop}", slip.get("deduction"), False)])
+
+    pdf.set_font("Helvetica", "B", 14)
+    pdf.cell(0, 10, _text(f"Net Salary: INR {_amount(slip.get('netSalary'))}"), new_x="LMARGIN", new_y="NEXT")
+
+    pdf.set_font("Helvetica", "", 10)
+    pdf.cell(
+        0, 8,
+        _text(f"Generated By: {slip.get('generatedBy') or '-'} | Generated At: {slip.get('generatedAt') or '-'}"),
+        new_x="LMARGIN", new_y="NEXT",
+    )
+
+    return bytes(pdf.output())
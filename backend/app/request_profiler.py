@@ -0,0 +1,270 @@
+import asyncio
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime
+
+from bson import Binary
+from fastapi.routing import APIRoute
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from app.database import db_backend, get_db, request_profiles_collection
+
+
+# -----------------------
+# Per-request profiling
+# -----------------------
+# Opt-in: a request is profiled when an ADMIN sends "X-Profile: 1", or when
+# it is picked by HRMS_PROFILE_SAMPLE (share of requests, default 0),
+# optionally only under HRMS_PROFILE_PATHS (comma separated path prefixes).
+#
+# The endpoint runs under the profiler in the thread that executes it, and
+# every Mongo command it issues is timed by a command listener. The result
+# (route, status, latency, Mongo breakdown, profile) goes to a capped
+# collection, so old profiles age out on their own:
+#   GET /api/admin/profiles                       -> list
+#   GET /api/admin/profiles/{id}?format=html      -> pyinstrument page
+#   GET /api/admin/profiles/{id}?format=speedscope -> https://www.speedscope.app
+#
+# HRMS_PROFILER: pyinstrument (sampling, default) | cprofile (deterministic,
+# text report only). Only sync endpoints are profiled; async ones (SSE)
+# still get the Mongo breakdown.
+PROFILE_SAMPLE = float(os.getenv("HRMS_PROFILE_SAMPLE", "0"))
+PROFILE_PATHS = tuple(p for p in os.getenv("HRMS_PROFILE_PATHS", "").split(",") if p)
+PROFILER = os.getenv("HRMS_PROFILER", "pyinstrument").lower()
+PROFILE_INTERVAL_SECONDS = float(os.getenv("HRMS_PROFILE_INTERVAL_SECONDS", "0.001"))
+PROFILE_STORE_MB = int(os.getenv("HRMS_PROFILE_STORE_MB", "256"))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# cProfile text report: functions listed, by cumulative time
+CPROFILE_REPORT_LINES = 80
+
+_active = ContextVar("request_profile", default=None)
+
+
+def ensure_profile_store():
+    # mongomock has no capped collections: a plain one (tests / local tools)
+    if db_backend() != "memory":
+        try:
+            get_db().create_collection(
+                request_profiles_collection.name, capped=True, size=PROFILE_STORE_MB * 1024 * 1024
+            )
+        except CollectionInvalid:
+            pass    # already there
+    request_profiles_collection.create_index([("at", -1)])
+
+
+def wants_profile(path: str, header: str | None, role: str | None):
+    """'header' / 'sample' when this request should be profiled, else None."""
+    if header and header.lower() in ("1", "true", "yes") and role == "ADMIN":
+        return "header"
+    if PROFILE_SAMPLE > 0 and (not PROFILE_PATHS or path.startswith(PROFILE_PATHS)):
+        if random.random() < PROFILE_SAMPLE:
+            return "sample"
+    return None
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, trigger: str, request_id: str | None):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._pending = {}      # Mongo request id -> (command, collection)
+        self._commands = {}     # (command, collection) -> [count, micros]
+        self.profiler = None
+        self.data = None        # compressed profile
+
+    # ---- Mongo commands (called by the listener) ----
+    def command_started(self, event):
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else None
+        with self._lock:
+            self._pending[event.request_id] = (event.command_name, collection)
+
+    def command_finished(self, event):
+        with self._lock:
+            key = self._pending.pop(event.request_id, None)
+            if key is None:
+                return
+            stats = self._commands.setdefault(key, [0, 0])
+            stats[0] += 1
+            stats[1] += event.duration_micros
+
+    def mongo_breakdown(self):
+        with self._lock:
+            rows = [
+                {"command": cmd, "collection": coll, "count": n, "totalMs": round(us / 1000, 2)}
+                for (cmd, coll), (n, us) in self._commands.items()
+            ]
+        rows.sort(key=lambda r: -r["totalMs"])
+        return {
+            "commands": sum(r["count"] for r in rows),
+            "totalMs": round(sum(r["totalMs"] for r in rows), 2),
+            "byCommand": rows,
+        }
+
+    # ---- profiler ----
+    def run(self, func, *args, **kwargs):
+        if PROFILER == "cprofile":
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(func, *args, **kwargs)
+            finally:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(CPROFILE_REPORT_LINES)
+                self.profiler, self.data = "cprofile", zlib.compress(out.getvalue().encode())
+
+        # imported on first use: keeps pyinstrument out of app startup
+        from pyinstrument import Profiler
+
+        profiler = Profiler(interval=PROFILE_INTERVAL_SECONDS)
+        profiler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            session = profiler.stop()
+            self.profiler, self.data = "pyinstrument", zlib.compress(json.dumps(session.to_json()).encode())
+
+    def document(self, route: str | None, status: int):
+        return {
+            "_id": self.id,
+            "at": datetime.utcnow(),
+            "method": self.method,
+            "path": self.path,
+            "route": route or self.path,
+            "status": status,
+            "latencyMs": round((time.perf_counter() - self.started) * 1000, 2),
+            "trigger": self.trigger,
+            "requestId": self.request_id,
+            "mongo": self.mongo_breakdown(),
+            "profiler": self.profiler,
+            "data": Binary(self.data) if self.data else None,
+        }
+
+
+def begin_profile(method: str, path: str, trigger: str, request_id: str | None = None):
+    profile = RequestProfile(method, path, trigger, request_id)
+    _active.set(profile)
+    return profile
+
+
+def save_profile(profile: RequestProfile, route: str | None, status: int):
+    """Call from the event loop; stored in the default executor, the response is not held up."""
+    doc = profile.document(route, status)
+    asyncio.get_running_loop().run_in_executor(None, _insert_profile, doc)
+
+
+def _insert_profile(doc: dict):
+    try:
+        request_profiles_collection.insert_one(doc)
+    except PyMongoError:
+        pass    # profiling must never fail anything
+
+
+# -----------------------
+# Hooks
+# -----------------------
+class _CommandTimer(monitoring.CommandListener):
+    # listeners run in the thread that sent the command, so the request
+    # context (and its profile) is visible here
+    def started(self, event):
+        profile = _active.get()
+        if profile is not None:
+            profile.command_started(event)
+
+    def succeeded(self, event):
+        profile = _active.get()
+        if profile is not None:
+            profile.command_finished(event)
+
+    def failed(self, event):
+        self.succeeded(event)
+
+
+# applies to clients created after this import, i.e. the app's (connect() runs in the lifespan)
+monitoring.register(_CommandTimer())
+
+
+def _profiled(endpoint):
+    # include_router() builds every route again with the same route class:
+    # wrap once, a nested wrapper would start a second profiler on the thread
+    if getattr(endpoint, "_hrms_profiled", False):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _active.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        return profile.run(endpoint, *args, **kwargs)
+
+    wrapper._hrms_profiled = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Route class that lets a sync endpoint run under the request's profiler."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+# -----------------------
+# Reading profiles back
+# -----------------------
+PROFILE_FORMATS = {
+    "html": "text/html",
+    "speedscope": "application/json",
+    "text": "text/plain",
+}
+
+
+def list_profiles(route: str | None = None, min_latency_ms: float | None = None, limit: int = 50):
+    query = {}
+    if route:
+        query["route"] = route
+    if min_latency_ms:
+        query["latencyMs"] = {"$gte": min_latency_ms}
+    cursor = request_profiles_collection.find(query, {"data": 0}).sort("at", -1).limit(max(1, min(limit, 500)))
+    return [{"profileId": d.pop("_id"), **d} for d in cursor]
+
+
+def render_profile(doc: dict, fmt: str):
+    """Profile in the given format; ValueError when that format is not available."""
+    if not doc.get("data"):
+        raise ValueError("Profile has no profiler output (async endpoint)")
+    raw = zlib.decompress(doc["data"]).decode()
+
+    if doc["profiler"] == "cprofile":
+        if fmt != "text":
+            raise ValueError("cProfile profiles are available as text only")
+        return raw
+
+    from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer, SpeedscopeRenderer
+    from pyinstrument.session import Session
+
+    session = Session.from_json(json.loads(raw))
+    if fmt == "html":
+        return HTMLRenderer().render(session)
+    if fmt == "speedscope":
+        return SpeedscopeRenderer().render(session)
+    return ConsoleRenderer(unicode=True, color=False).render(session)
@@ -0,0 +1,269 @@
+import os
+import socket
+import time
+import uuid
+import traceback
+from datetime import datetime, timedelta
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.database import scheduler_lease_collection, job_runs_collection
+
+
+# -----------------------
+# Config
+# -----------------------
+SCHEDULER_ENABLED = os.getenv("HRMS_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LEASE_NAME = "hrms-scheduler"
+LEASE_TTL_SECONDS = int(os.getenv("HRMS_SCHEDULER_LEASE_TTL", "60"))
+LEASE_RENEW_SECONDS = max(LEASE_TTL_SECONDS // 3, 1)
+
+# APScheduler still fires a job this late (e.g. process was busy / clock jump)
+MISFIRE_GRACE_SECONDS = 15 * 60
+
+# on becoming leader, missed runs newer than this are executed once
+CATCHUP_WINDOW_HOURS = int(os.getenv("HRMS_SCHEDULER_CATCHUP_HOURS", "12"))
+
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+_jobs = {}          # job_id -> {"func": callable, "trigger": BaseTrigger, "record": bool}
+_scheduler = None
+_is_leader = False
+
+
+# -----------------------
+# Job registry
+# -----------------------
+def register_job(job_id: str, func, trigger: str, record: bool = True, **trigger_args):
+    """
+    Registers a cluster-wide job. Nothing runs until start_scheduler().
+    `func` may return the number of rows it touched; it is stored in history.
+    With record=False the job just runs on the leader each tick (useful for
+    frequent sweeps that claim their own slots through run_once()).
+    """
+    if trigger == "cron":
+        trigger_obj = CronTrigger(**trigger_args)
+    elif trigger == "interval":
+        trigger_obj = IntervalTrigger(**trigger_args)
+    else:
+        raise ValueError(f"Unsupported trigger: {trigger}")
+
+    _jobs[job_id] = {"func": func, "trigger": trigger_obj, "record": record}
+
+
+# -----------------------
+# Leader lease
+# -----------------------
+def acquire_lease() -> bool:
+    """
+    Takes or renews the single scheduler lease document.
+    Succeeds if we already own it or the previous owner's lease expired.
+    """
+    now = datetime.utcnow()
+    try:
+        doc = scheduler_lease_collection.find_one_and_update(
+            {
+                "_id": LEASE_NAME,
+                "$or": [{"owner": INSTANCE_ID}, {"expiresAt": {"$lt": now}}],
+            },
+            {"$set": {
+                "owner": INSTANCE_ID,
+                "expiresAt": now + timedelta(seconds=LEASE_TTL_SECONDS),
+                "renewedAt": now,
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # lease exists and belongs to a live worker
+        return False
+
+    return bool(doc) and doc.get("owner") == INSTANCE_ID
+
+
+def release_lease():
+    scheduler_lease_collection.delete_one({"_id": LEASE_NAME, "owner": INSTANCE_ID})
+
+
+def _heartbeat():
+    global _is_leader
+
+    was_leader = _is_leader
+    try:
+        _is_leader = acquire_lease()
+    except Exception:
+        # can't reach Mongo -> stop acting as leader until we can renew
+        _is_leader = False
+        return
+
+    if _is_leader and not was_leader:
+        catch_up_missed_runs()
+
+
+def is_leader() -> bool:
+    return _is_leader
+
+
+# -----------------------
+# Running jobs
+# -----------------------
+def _previous_fire_time(trigger, now: datetime):
+    # latest fire time <= now inside the catch-up window
+    t = trigger.get_next_fire_time(None, now - timedelta(hours=CATCHUP_WINDOW_HOURS))
+    prev = None
+    while t and t <= now:
+        prev = t
+        t = trigger.get_next_fire_time(t, t + timedelta(microseconds=1))
+    return prev
+
+
+def _execute(job_id: str, run_id: str, scheduled_for, trigger_type: str, func=None):
+    """
+    Claims `run_id` in job_runs (unique _id) and runs the job.
+    A duplicate key means another worker already ran this slot.
+    """
+    func = func or _jobs[job_id]["func"]
+
+    try:
+        job_runs_collection.insert_one({
+            "_id": run_id,
+            "jobId": job_id,
+            "trigger": trigger_type,
+            "scheduledFor": scheduled_for,
+            "startedAt": datetime.utcnow(),
+            "owner": INSTANCE_ID,
+            "status": "RUNNING",
+        })
+    except DuplicateKeyError:
+        return None
+
+    started = time.perf_counter()
+    update = {}
+    try:
+        result = func()
+        update["status"] = "SUCCESS"
+        update["rowsAffected"] = result if isinstance(result, int) else None
+    except Exception as e:
+        update["status"] = "FAILED"
+        update["error"] = str(e)
+        update["traceback"] = traceback.format_exc()
+
+    update["durationMs"] = round((time.perf_counter() - started) * 1000, 2)
+    update["finishedAt"] = datetime.utcnow()
+
+    job_runs_collection.update_one({"_id": run_id}, {"$set": update})
+    return update
+
+
+def _fire(job_id: str):
+    if not _is_leader:
+        return
+
+    job = _jobs[job_id]
+    if not job["record"]:
+        job["func"]()
+        return
+
+    trigger = job["trigger"]
+    scheduled_for = _previous_fire_time(trigger, datetime.now(trigger.timezone))
+    if scheduled_for is None:
+        return
+
+    _execute(job_id, f"{job_id}@{scheduled_for.isoformat()}", scheduled_for, "scheduled")
+
+
+def catch_up_missed_runs():
+    """
+    Runs each job's most recent slot if no worker recorded it
+    (e.g. every worker was down at 19:00).
+    """
+    for job_id, job in _jobs.items():
+        if not job["record"]:
+            continue
+
+        trigger = job["trigger"]
+        scheduled_for = _previous_fire_time(trigger, datetime.now(trigger.timezone))
+        if scheduled_for is None:
+            continue
+
+        _execute(job_id, f"{job_id}@{scheduled_for.isoformat()}", scheduled_for, "catch-up")
+
+
+def run_once(job_id: str, slot: str, func, scheduled_for=None, trigger_type: str = "scheduled"):
+    """
+    Runs `func` at most once per cluster for the given slot key
+    (e.g. one batch per timezone per local day) and records it in history.
+    Returns None if the slot was already taken.
+    """
+    return _execute(job_id, f"{job_id}@{slot}", scheduled_for or datetime.utcnow(), trigger_type, func)
+
+
+def run_job_now(job_id: str):
+    """Manual trigger (API). Always runs, but is still recorded in history."""
+    if job_id not in _jobs:
+        raise KeyError(job_id)
+
+    now = datetime.utcnow()
+    return _execute(job_id, f"{job_id}@manual:{uuid.uuid4().hex}", now, "manual")
+
+
+def get_job_runs(job_id: str | None = None, limit: int = 50):
+    query = {"jobId": job_id} if job_id else {}
+    runs = list(job_runs_collection.find(query, {"traceback": 0}).sort("startedAt", -1).limit(limit))
+    for r in runs:
+        r["runId"] = r.pop("_id")
+    return runs
+
+
+# -----------------------
+# Lifecycle (called from app lifespan)
+# -----------------------
+def start_scheduler():
+    global _scheduler
+
+    if not SCHEDULER_ENABLED or _scheduler is not None:
+        return
+
+    job_runs_collection.create_index([("jobId", 1), ("startedAt", -1)])
+
+    _scheduler = BackgroundScheduler(job_defaults={
+        "coalesce": True,
+        "max_instances": 1,
+        "misfire_grace_time": MISFIRE_GRACE_SECONDS,
+    })
+
+    _scheduler.add_job(
+        _heartbeat,
+        "interval",
+        seconds=LEASE_RENEW_SECONDS,
+        id="_lease_heartbeat",
+        next_run_time=datetime.now(),
+    )
+
+    for job_id, job in _jobs.items():
+        _scheduler.add_job(_fire, job["trigger"], args=[job_id], id=job_id)
+
+    _scheduler.start()
+
+
+def shutdown_scheduler():
+    global _scheduler, _is_leader
+
+    if _scheduler is None:
+        return
+
+    _scheduler.shutdown(wait=False)
+    _scheduler = None
+
+    if _is_leader:
+        _is_leader = False
+        try:
+            release_lease()
+        except Exception:
+            pass
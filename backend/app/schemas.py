@@ -1,6 +1,9 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from datetime import date
 from typing import Optional, Literal, List
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+HHMM_PATTERN = r"^([01]\d|2[0-3]):[0-5]\d$"
 
 # -----------------------
 # Employee
@@ -14,6 +17,10 @@ class EmployeeCreate(BaseModel):
     salary: float
     password: str
 
+# bulk import, runs as a background job
+class EmployeeImportPayload(BaseModel):
+    employees: List[EmployeeCreate]
+
 class UpdateMePayload(BaseModel):
     fullName: str
     department: Optional[str] = ""
@@ -65,6 +72,23 @@ class OfficeCreate(BaseModel):
     radiusMeters: float = 300
     isActive: bool = True
 
+    # IANA name, e.g. "Asia/Kolkata". None = server default timezone
+    timezone: Optional[str] = None
+    # local time at which open check-ins are auto checked out
+    checkoutCutoff: str = Field("19:00", pattern=HHMM_PATTERN)
+    # holiday calendar region, e.g. "IN-WB"
+    region: Optional[str] = None
+
+    @field_validator("timezone")
+    @classmethod
+    def validate_timezone(cls, v):
+        if v:
+            try:
+                ZoneInfo(v)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"Unknown timezone: {v}")
+        return v
+
 
 class OfficeResponse(BaseModel):
     officeId: str
@@ -73,6 +97,9 @@ class OfficeResponse(BaseModel):
     lng: float
     radiusMeters: float
     isActive: bool
+    timezone: Optional[str] = None
+    checkoutCutoff: str = "19:00"
+    region: Optional[str] = None
 
 class LocationPayload(BaseModel):
     lat: float
@@ -89,6 +116,18 @@ class GeoFenceSetting(BaseModel):
 
 
 
+# -----------------------
+# Holidays
+# -----------------------
+class HolidayCreate(BaseModel):
+    date: date
+    name: str = Field(..., min_length=2)
+
+    # both empty = company-wide
+    officeId: Optional[str] = None
+    region: Optional[str] = None
+
+
 # -----------------------
 # Attendance
 # -----------------------
@@ -204,6 +243,10 @@ class PayslipResponse(BaseModel):
     email: EmailStr
 
     monthYear: str 
+    year: Optional[int] = None
+    month: Optional[int] = None
+    period: Optional[int] = None
+    department: Optional[str] = None
 
     basicSalary: float
     hra: float
@@ -214,4 +257,31 @@ class PayslipResponse(BaseModel):
     netSalary: float
 
     generatedBy: EmailStr
-    generatedAt: str
\ No newline at end of file
+    generatedAt: str
+
+# Payroll run (attendance driven)
+
+class PayrollRules(BaseModel):
+    # split of employee.salary (monthly gross); allowance gets the remainder
+    basicPercent: float = Field(0.5, ge=0, le=1)
+    hraPercent: float = Field(0.2, ge=0, le=1)
+
+    # fraction of a day's pay earned on a Half-Day
+    halfDayPayFactor: float = Field(0.5, ge=0, le=1)
+    # working days with no attendance record count as loss of pay
+    missingDaysAsAbsent: bool = True
+
+    # minutes beyond standardDayMinutes on a day are overtime
+    standardDayMinutes: int = Field(480, gt=0)
+    overtimeEnabled: bool = True
+    overtimeMultiplier: float = Field(1.5, ge=0)
+
+
+class PayrollRunPayload(BaseModel):
+    month: str
+    year: int
+    department: Optional[str] = None
+    # replace payslips already generated for the month
+    overwrite: bool = False
+    # compute only, write nothing
+    dryRun: bool = False
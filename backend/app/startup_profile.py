@@ -0,0 +1,63 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------
+# Startup profile
+# -----------------------
+# Wall time of each startup phase: module imports (measured from the first
+# app import) and every lifespan step, including the ones that finish in
+# the background after the app is already serving.
+# GET /api/admin/startup-profile returns it; HRMS_STARTUP_PROFILE=1 also
+# logs it once the app is ready. For a per-module import breakdown use
+#     python -X importtime -c "import app.main"
+STARTUP_PROFILE_LOG = os.getenv("HRMS_STARTUP_PROFILE", "false").lower() in ("1", "true", "yes")
+
+
+def _ms(since: float):
+    return round((time.perf_counter() - since) * 1000, 2)
+
+
+class StartupProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._steps = []
+        self._ready_ms = None
+
+    def record(self, name: str, since: float):
+        with self._lock:
+            self._steps.append({"step": name, "ms": _ms(since), "atMs": _ms(self.started)})
+
+    @contextmanager
+    def step(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, t)
+
+    def ready(self):
+        """The app accepts requests from here on."""
+        with self._lock:
+            self._ready_ms = _ms(self.started)
+        if STARTUP_PROFILE_LOG:
+            logger.info(self.format(), extra=self.report())
+
+    def report(self):
+        with self._lock:
+            return {"readyMs": self._ready_ms, "steps": list(self._steps)}
+
+    def format(self):
+        report = self.report()
+        lines = [f"Startup: ready after {report['readyMs']} ms"]
+        lines += [f"  {s['step']:<24} {s['ms']:>9.2f} ms" for s in report["steps"]]
+        return "\n".join(lines)
+
+
+startup_profile = StartupProfile()
@@ -0,0 +1,113 @@
+import heapq
+import os
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from pymongo import ASCENDING
+
+from app.database import (
+    employee_collection,
+    leaves_collection,
+    office_collection,
+    payslips_collection,
+    sync_tombstones_collection,
+)
+from app.attendance_store import attendance_store, ATTENDANCE_FEED
+from app.sync_sequence import ensure_tombstone_indexes, pruned_through
+
+
+# -----------------------
+# Delta sync feed
+# -----------------------
+# GET /api/sync/{collection}?since=<next of the previous page>
+#   -> {"changed": [current documents], "deleted": [tombstones], "next", "hasMore"}
+# Start with since=0; apply `deleted` before `changed`; keep calling with
+# `next` while hasMore. The documents of one write are never split across
+# pages.
+#
+# A sequence number is taken just before its write lands, so a reader could
+# see seq 11 while a slower seq 10 is still in flight. A page therefore ends
+# at the first change younger than SYNC_SETTLE_SECONDS; it shows up on the
+# next poll.
+SYNC_SETTLE_SECONDS = float(os.getenv("HRMS_SYNC_SETTLE_SECONDS", "2"))
+
+DEFAULT_SYNC_LIMIT = 500
+MAX_SYNC_LIMIT = 5000
+
+# feed name -> (collection, projection); attendance goes through the store
+SYNC_COLLECTIONS = {
+    "employees": (employee_collection, {"_id": 0, "password": 0}),
+    "leaves": (leaves_collection, {"_id": 0}),
+    "offices": (office_collection, {"_id": 0}),
+    "payslips": (payslips_collection, {"_id": 0}),
+}
+SYNC_FEEDS = tuple(SYNC_COLLECTIONS) + (ATTENDANCE_FEED,)
+
+
+def ensure_sync_indexes():
+    ensure_tombstone_indexes()
+    for collection, _ in SYNC_COLLECTIONS.values():
+        collection.create_index([("syncSeq", ASCENDING)])
+
+
+def _find_changed(feed: str, seq, limit: int | None):
+    if feed == ATTENDANCE_FEED:
+        return attendance_store.changes_since(seq, limit)
+
+    collection, projection = SYNC_COLLECTIONS[feed]
+    cursor = collection.find({"syncSeq": seq}, projection).sort("syncSeq", 1)
+    return list(cursor.limit(limit) if limit else cursor)
+
+
+def _find_deleted(feed: str, seq, limit: int | None):
+    cursor = sync_tombstones_collection.find(
+        {"collection": feed, "syncSeq": seq},
+        {"_id": 0, "key": 1, "syncSeq": 1, "updatedAt": 1},
+    ).sort("syncSeq", 1)
+    return list(cursor.limit(limit) if limit else cursor)
+
+
+def changes_since(feed: str, since: int = 0, limit: int = DEFAULT_SYNC_LIMIT):
+    if feed not in SYNC_FEEDS:
+        raise HTTPException(status_code=404, detail=f"Unknown sync collection '{feed}'")
+    if since < 0:
+        raise HTTPException(status_code=400, detail="since must be >= 0")
+    limit = max(1, min(limit, MAX_SYNC_LIMIT))
+
+    # deletes older than the pruned tombstones can no longer be reported
+    if since and since < pruned_through():
+        raise HTTPException(status_code=410, detail="Sync cursor expired, start again from since=0")
+
+    changed = _find_changed(feed, {"$gt": since}, limit + 1)
+    deleted = _find_deleted(feed, {"$gt": since}, limit + 1)
+    rows = heapq.merge(
+        ((r["syncSeq"], 0, i) for i, r in enumerate(changed)),
+        ((r["syncSeq"], 1, i) for i, r in enumerate(deleted)),
+    )
+
+    settled = (datetime.utcnow() - timedelta(seconds=SYNC_SETTLE_SECONDS)).isoformat()
+    page = []
+    for seq, kind, i in rows:
+        row = (changed if kind == 0 else deleted)[i]
+        if row.get("updatedAt", "") > settled:
+            break
+        page.append((seq, kind, row))
+        if len(page) > limit:
+            break
+
+    has_more = len(page) > limit
+    if has_more:
+        # finish the write the page ends in, however many rows it touched
+        last = page[limit - 1][0]
+        page = [p for p in page if p[0] < last]
+        page += [(last, 0, r) for r in _find_changed(feed, last, None)]
+        page += [(last, 1, r) for r in _find_deleted(feed, last, None)]
+
+    return {
+        "collection": feed,
+        "since": since,
+        "next": page[-1][0] if page else since,
+        "hasMore": has_more,
+        "changed": [row for _, kind, row in page if kind == 0],
+        "deleted": [row for _, kind, row in page if kind == 1],
+    }
@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING
+
+from app.database import sync_counters_collection, sync_tombstones_collection
+
+
+# -----------------------
+# Sync stamps / tombstones
+# -----------------------
+# Every write to a synced collection stamps the documents it touches with
+# `syncSeq` and `updatedAt`. Deletes record a tombstone {collection, key}
+# under a new stamp. All documents touched by one write may share a number;
+# gaps are normal.
+#
+# syncSeq is taken from the clock, not from a shared counter: microseconds
+# since the epoch, strictly increasing within a process. A stamp costs no
+# Mongo round trip and writers never contend on one counter document (the
+# check-in storm stamps every write). Across processes the order is the
+# clocks' order; the feed already holds back changes younger than
+# SYNC_SETTLE_SECONDS (by updatedAt, the same clocks), so servers have to
+# be NTP-synced well within that. Stamps stay far below 2**53 (exact as JSON
+# numbers in browsers) and above the counter values stamped before.
+#
+# Tombstones are pruned after SYNC_TOMBSTONE_DAYS; the highest pruned
+# sequence is remembered so the feed can tell a client its cursor is too old.
+SYNC_TOMBSTONE_DAYS = int(os.getenv("HRMS_SYNC_TOMBSTONE_DAYS", "30"))
+
+PRUNED_ID = "tombstones_pruned"
+
+_seq_lock = threading.Lock()
+_last_seq = 0
+
+
+def next_sync_stamp():
+    """{"syncSeq", "updatedAt"} for one write. No database access."""
+    global _last_seq
+    now = datetime.utcnow()
+    with _seq_lock:
+        _last_seq = max(_last_seq + 1, time.time_ns() // 1000)
+        seq = _last_seq
+    return {"syncSeq": seq, "updatedAt": now.isoformat()}
+
+
+def record_deletes(collection: str, keys: list, stamp: dict | None = None, session=None):
+    """One tombstone per deleted document key, e.g. {"employeeId": "EMP001"}."""
+    if not keys:
+        return 0
+    stamp = stamp or next_sync_stamp()
+    deleted_at = datetime.utcnow()
+    sync_tombstones_collection.insert_many(
+        [{"collection": collection, "key": key, **stamp, "deletedAt": deleted_at} for key in keys],
+        ordered=False,
+        session=session,
+    )
+    return len(keys)
+
+
+def pruned_through():
+    doc = sync_counters_collection.find_one({"_id": PRUNED_ID})
+    return doc.get("seq", 0) if doc else 0
+
+
+def prune_tombstones():
+    """Nightly: drops tombstones older than SYNC_TOMBSTONE_DAYS. Returns rows deleted."""
+    cutoff = datetime.utcnow() - timedelta(days=SYNC_TOMBSTONE_DAYS)
+    newest = sync_tombstones_collection.find_one(
+        {"deletedAt": {"$lt": cutoff}}, {"syncSeq": 1}, sort=[("syncSeq", -1)]
+    )
+    if not newest:
+        return 0
+
+    # remember the cursor floor before deleting, so no reader misses the cut
+    sync_counters_collection.update_one(
+        {"_id": PRUNED_ID}, {"$max": {"seq": newest["syncSeq"]}}, upsert=True
+    )
+    return sync_tombstones_collection.delete_many({"syncSeq": {"$lte": newest["syncSeq"]}}).deleted_count
+
+
+def ensure_tombstone_indexes():
+    sync_tombstones_collection.create_index([("collection", ASCENDING), ("syncSeq", ASCENDING)])
+    sync_tombstones_collection.create_index([("syncSeq", ASCENDING)])
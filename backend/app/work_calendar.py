@@ -0,0 +1,116 @@
+import calendar
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import accumulate
+
+from app.database import holidays_collection, office_collection
+from app.invalidation import invalidation_bus
+
+
+# -----------------------
+# Working-day calendar
+# -----------------------
+# Mon-Fri are working days unless a holiday applies:
+# {"holidayId", "date": "YYYY-MM-DD", "name", "officeId": str | None, "region": str | None}
+# officeId and region both None = company-wide holiday; otherwise it applies
+# to that office, or to every office with that region.
+#
+# Per (office, year) we build one bitmap per month (bit d-1 set = day d is a
+# working day) and a prefix sum over the year, so "working days between A
+# and B" is two array lookups per calendar year touched.
+WEEKEND_DAYS = (5, 6)
+
+
+class YearCalendar:
+    def __init__(self, year: int, holidays: set):
+        self.year = year
+        self.month_bitmaps = []
+        working = []
+
+        for month in range(1, 13):
+            bitmap = 0
+            for day in range(1, calendar.monthrange(year, month)[1] + 1):
+                d = date(year, month, day)
+                is_working = d.weekday() not in WEEKEND_DAYS and d not in holidays
+                if is_working:
+                    bitmap |= 1 << (day - 1)
+                working.append(1 if is_working else 0)
+            self.month_bitmaps.append(bitmap)
+
+        # prefix[i] = working days among the first i days of the year
+        self.prefix = [0, *accumulate(working)]
+
+    def is_working_day(self, d: date):
+        return bool(self.month_bitmaps[d.month - 1] >> (d.day - 1) & 1)
+
+    def count(self, start: date, end: date):
+        # both inclusive, both inside self.year
+        a = start.timetuple().tm_yday - 1
+        b = end.timetuple().tm_yday
+        return self.prefix[b] - self.prefix[a]
+
+
+def _office_region(office_id: str | None):
+    if not office_id:
+        return None
+    office = office_collection.find_one({"officeId": office_id}, {"_id": 0, "region": 1})
+    return (office or {}).get("region")
+
+
+def holidays_for(office_id: str | None, year: int):
+    scopes = [{"officeId": None, "region": None}]
+    if office_id:
+        scopes.append({"officeId": office_id})
+        region = _office_region(office_id)
+        if region:
+            scopes.append({"officeId": None, "region": region})
+
+    query = {"date": {"$gte": f"{year}-01-01", "$lte": f"{year}-12-31"}, "$or": scopes}
+    return {date.fromisoformat(h["date"]) for h in holidays_collection.find(query, {"_id": 0, "date": 1})}
+
+
+@lru_cache(maxsize=256)
+def year_calendar(office_id: str | None, year: int) -> YearCalendar:
+    return YearCalendar(year, holidays_for(office_id, year))
+
+
+def invalidate_calendar(change=None):
+    """Call whenever holidays (or an office's region) change."""
+    year_calendar.cache_clear()
+
+
+# holidays / office regions written by another worker
+invalidation_bus.subscribe(holidays_collection.name, invalidate_calendar)
+invalidation_bus.subscribe(office_collection.name, invalidate_calendar)
+
+
+def working_days_between(start: date, end: date, office_id: str | None = None):
+    """Working days in [start, end], both inclusive. O(1) per calendar year."""
+    if end < start:
+        return 0
+
+    total = 0
+    for year in range(start.year, end.year + 1):
+        seg_start = max(start, date(year, 1, 1))
+        seg_end = min(end, date(year, 12, 31))
+        total += year_calendar(office_id, year).count(seg_start, seg_end)
+    return total
+
+
+def is_working_day(d: date, office_id: str | None = None):
+    return year_calendar(office_id, d.year).is_working_day(d)
+
+
+def working_days_in_month(year: int, month: int, office_id: str | None = None):
+    return bin(year_calendar(office_id, year).month_bitmaps[month - 1]).count("1")
+
+
+def working_dates_between(start: date, end: date, office_id: str | None = None):
+    """ISO dates of the working days in [start, end]."""
+    dates = []
+    d = start
+    while d <= end:
+        if is_working_day(d, office_id):
+            dates.append(d.isoformat())
+        d += timedelta(days=1)
+    return dates
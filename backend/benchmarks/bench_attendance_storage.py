@@ -0,0 +1,100 @@
+"""
+Compares the daily and monthly-bucket attendance layouts against a real
+mongod (use a local / throwaway instance, the database is dropped).
+
+Run from the backend folder:
+
+    python -m benchmarks.bench_attendance_storage --employees 200 --days 250
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from pymongo import MongoClient
+
+from app.attendance_codec import encode_times
+from app.attendance_store import DailyAttendanceStore, MonthlyBucketAttendanceStore
+
+
+def make_day(employee_id, day):
+    return {
+        "employeeId": employee_id,
+        "date": day,
+        "status": random.choice(["Present", "Present", "Present", "Half-Day", "Leave", "Absent"]),
+        **encode_times("09:00", ""),
+        "checkInLocation": {"lat": 22.57, "lng": 88.36, "officeId": "OFF-1", "officeName": "HQ"},
+        "checkOutLocation": None,
+    }
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - started
+
+
+def bench_store(store, employee_ids, days, reads):
+    # writes: same pattern as the API (one check-in insert + one check-out update per day)
+    insert_s = 0.0
+    update_s = 0.0
+    for d in days:
+        for e in employee_ids:
+            insert_s += timed(store.insert, make_day(e, d))
+            update_s += timed(store.update, e, d, encode_times("09:00", "18:00"))
+
+    writes = len(days) * len(employee_ids)
+
+    # reads: per-employee history + all-time summary
+    sample = [random.choice(employee_ids) for _ in range(reads)]
+    history_s = sum(timed(store.find, e, newest_first=True) for e in sample)
+    summary_s = sum(timed(store.status_counts, e) for e in sample)
+
+    stats = store.collection.database.command("collStats", store.collection.name)
+
+    return {
+        "insert ms/op": insert_s / writes * 1000,
+        "update ms/op": update_s / writes * 1000,
+        "history read ms": history_s / reads * 1000,
+        "summary read ms": summary_s / reads * 1000,
+        "documents": stats["count"],
+        "data MB": stats["size"] / 1e6,
+        "index MB": stats["totalIndexSize"] / 1e6,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily vs monthly-bucket attendance storage")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="hrms_bench")
+    parser.add_argument("--employees", type=int, default=100)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    random.seed(7)
+    client = MongoClient(args.mongo_uri)
+    client.drop_database(args.db)
+    db = client[args.db]
+
+    employee_ids = [f"EMP{i:05d}" for i in range(args.employees)]
+    start = date(2025, 1, 1)
+    days = [(start + timedelta(days=i)).isoformat() for i in range(args.days)]
+
+    results = {}
+    for store in (DailyAttendanceStore(db["attendance"]), MonthlyBucketAttendanceStore(db["attendance_monthly"])):
+        store.ensure_indexes()
+        results[store.name] = bench_store(store, employee_ids, days, args.reads)
+
+    print(f"{args.employees} employees x {args.days} days")
+    print(f"{'metric':<20} {'daily':>12} {'monthly':>12}")
+    for metric in results["daily"]:
+        print(f"{metric:<20} {results['daily'][metric]:>12.3f} {results['monthly'][metric]:>12.3f}")
+
+    client.drop_database(args.db)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
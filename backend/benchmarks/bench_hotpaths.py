@@ -0,0 +1,199 @@
+"""
+Microbenchmarks for the CPU-bound hot paths of the attendance API.
+
+Nothing here touches MongoDB, so results measure pure Python cost only.
+
+Run from the backend folder:
+
+    python -m benchmarks.bench_hotpaths                  # run + compare to baseline
+    python -m benchmarks.bench_hotpaths --save-baseline  # store current numbers
+    python -m benchmarks.bench_hotpaths -k haversine     # only matching benchmarks
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+from datetime import date, timedelta
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from app.attendance_utils import (
+    count_statuses,
+    count_statuses_by_date,
+    haversine_distance_m,
+    match_office_location,
+    minutes_to_hhmm,
+    time_to_minutes,
+)
+from app.schemas import AttendanceCreate, LocationPayload
+from app.sync_sequence import next_sync_stamp
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# a result slower than baseline by more than this ratio is reported as regression
+REGRESSION_THRESHOLD = 1.10
+
+random.seed(42)
+
+
+# -----------------------
+# Fixtures
+# -----------------------
+def make_offices(n):
+    return [
+        {
+            "officeId": f"OFF-{i}",
+            "officeName": f"Office {i}",
+            "lat": random.uniform(8.0, 30.0),
+            "lng": random.uniform(70.0, 90.0),
+            "radiusMeters": 300,
+            "isActive": True,
+        }
+        for i in range(n)
+    ]
+
+
+def make_attendance_rows(n):
+    statuses = ["Present", "Absent", "Half-Day", "Leave"]
+    start = date(2026, 1, 1)
+    rows = []
+    for i in range(n):
+        rows.append({
+            "employeeId": f"EMP{i % 500:04d}",
+            "date": (start + timedelta(days=i // 500)).isoformat(),
+            "status": random.choice(statuses),
+            "checkInTime": "09:12",
+            "checkOutTime": "18:47",
+            "totalHours": "09:35",
+            "fullName": f"Employee {i % 500}",
+            "checkInLocation": {
+                "lat": 22.57, "lng": 88.36, "accuracy": 12.5, "address": None,
+                "officeId": "OFF-1", "officeName": "Office 1", "distanceMeters": 42.1,
+            },
+            "checkOutLocation": None,
+        })
+    return rows
+
+
+OFFICES_1000 = make_offices(1000)
+ROWS_10K = make_attendance_rows(10_000)
+ATTENDANCE_PAYLOAD = {
+    "employeeId": "EMP0001",
+    "date": "2026-03-02",
+    "status": "Present",
+    "checkInTime": "09:12",
+    "checkInLocation": {"lat": 22.57, "lng": 88.36, "accuracy": 12.5, "officeId": "OFF-1"},
+}
+LOCATION_PAYLOAD = ATTENDANCE_PAYLOAD["checkInLocation"]
+
+
+def _nearest_office_miss():
+    # worst case: scans every office and then rejects
+    try:
+        match_office_location(0.0, 0.0, OFFICES_1000)
+    except HTTPException:
+        pass
+
+
+def _selected_office():
+    o = OFFICES_1000[-1]
+    match_office_location(o["lat"], o["lng"], OFFICES_1000, selected_office_id=o["officeId"])
+
+
+# name -> (callable, number of calls per timing sample)
+BENCHMARKS = {
+    "haversine_distance_m": (lambda: haversine_distance_m(22.57, 88.36, 28.61, 77.20), 100_000),
+    "match_office_location[1000 offices, nearest]": (_nearest_office_miss, 50),
+    "match_office_location[1000 offices, selected]": (_selected_office, 500),
+    "time_to_minutes": (lambda: time_to_minutes("09:12"), 200_000),
+    "minutes_to_hhmm": (lambda: minutes_to_hhmm(575), 200_000),
+    "count_statuses[10k rows]": (lambda: count_statuses(ROWS_10K), 50),
+    "monthly_attendance grouping[10k rows]": (lambda: count_statuses_by_date(ROWS_10K), 20),
+    "AttendanceCreate.model_validate": (lambda: AttendanceCreate.model_validate(ATTENDANCE_PAYLOAD), 20_000),
+    "LocationPayload.model_validate": (lambda: LocationPayload.model_validate(LOCATION_PAYLOAD), 50_000),
+    "json.dumps[10k attendance rows]": (lambda: json.dumps(ROWS_10K), 5),
+    "jsonable_encoder+json.dumps[10k attendance rows]": (lambda: json.dumps(jsonable_encoder(ROWS_10K)), 2),
+    # taken on every synced write, check-ins included
+    "next_sync_stamp": (next_sync_stamp, 100_000),
+}
+
+
+# -----------------------
+# Runner
+# -----------------------
+def run_benchmark(fn, number, repeat):
+    # best-of-N per-call time in microseconds (least noisy estimate)
+    timings = timeit.repeat(fn, number=number, repeat=repeat)
+    return min(timings) / number * 1e6
+
+
+def machine_info():
+    # stored with the baseline: timings only compare on the same machine / interpreter
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpuCount": os.cpu_count(),
+        "python": f"{platform.python_implementation()} {platform.python_version()}",
+    }
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HRMS hot path microbenchmarks")
+    parser.add_argument("-k", dest="keyword", default="", help="only run benchmarks containing this text")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save-baseline", action="store_true", help="write results to baseline.json")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline()
+    results = {}
+    regressions = []
+
+    meta = baseline.pop("_meta", None)
+    if meta and meta != machine_info():
+        print(f"note: baseline recorded on {meta.get('platform')} / {meta.get('python')}, "
+              f"ratios are only indicative here")
+
+    print(f"{'benchmark':<52} {'us/call':>12} {'baseline':>12} {'ratio':>8}")
+    for name, (fn, number) in BENCHMARKS.items():
+        if args.keyword and args.keyword not in name:
+            continue
+
+        us = run_benchmark(fn, number, args.repeat)
+        results[name] = round(us, 3)
+
+        base = baseline.get(name)
+        if base:
+            ratio = us / base
+            flag = "  <-- slower" if ratio > REGRESSION_THRESHOLD else ""
+            if flag:
+                regressions.append(name)
+            print(f"{name:<52} {us:>12.3f} {base:>12.3f} {ratio:>7.2f}x{flag}")
+        else:
+            print(f"{name:<52} {us:>12.3f} {'-':>12} {'-':>8}")
+
+    if args.save_baseline:
+        baseline.update(results)
+        baseline["_meta"] = machine_info()
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {BASELINE_FILE}")
+        return 0
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
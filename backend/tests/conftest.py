@@ -0,0 +1,124 @@
+import os
+
+# before any app import: in-memory database, startup tasks inline, no
+# background scheduler / job workers (tests run jobs explicitly)
+os.environ.setdefault("HRMS_DB_BACKEND", "memory")
+os.environ.setdefault("HRMS_STARTUP_TASKS", "blocking")
+os.environ.setdefault("HRMS_SCHEDULER_ENABLED", "false")
+os.environ.setdefault("HRMS_JOB_WORKERS", "0")
+os.environ.setdefault("HRMS_ADMISSION", "off")
+os.environ.setdefault("HRMS_AUDIT_FLUSH_SECONDS", "0.05")
+
+import inspect
+import re
+from types import SimpleNamespace
+
+import mongomock
+from mongomock.collection import BulkOperationBuilder
+from mongomock.gridfs import enable_gridfs_integration
+
+
+def _patch_mongomock():
+    # pymongo >= 4.11 passes sort= with every bulk UpdateOne; mongomock 4.3
+    # does not take it (an update without sort means the same thing)
+    add_update = BulkOperationBuilder.add_update
+    if "sort" not in inspect.signature(add_update).parameters:
+        def add_update_with_sort(self, *args, sort=None, **kwargs):
+            if sort:
+                raise NotImplementedError("mongomock: bulk update with sort")
+            return add_update(self, *args, **kwargs)
+
+        BulkOperationBuilder.add_update = add_update_with_sort
+
+    # gridfs (job files): accept mongomock databases
+    enable_gridfs_integration()
+    # read by GridFSBucket; mongomock would hand back a database named "options"
+    mongomock.MongoClient.options = SimpleNamespace(timeout=None)
+
+
+_patch_mongomock()
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import employee_search
+from app.database import ACTIVE_EMPLOYEES, employee_collection
+from app.invalidation import invalidation_bus
+from app.leave_engine import leave_engine
+from app.live_counters import live_counters
+from app.main import DEFAULT_ADMIN_EMAIL, DEFAULT_ADMIN_PASSWORD, app
+
+
+def _memory_text_search(query: str, limit: int = employee_search.DEFAULT_SEARCH_LIMIT):
+    # mongomock has no $text / textScore: every word must be a whole word of some field
+    words = [t for t in re.split(r"[^0-9a-z]+", query.lower()) if t]
+    if not words:
+        return []
+    query = {"$and": [
+        {"$or": [{f: {"$regex": rf"\b{re.escape(w)}\b", "$options": "i"}} for f in employee_search.SEARCH_FIELDS]}
+        for w in words
+    ], **ACTIVE_EMPLOYEES}
+    cursor = employee_collection.find(query, {"_id": 0, **{f: 1 for f in employee_search.SEARCH_FIELDS}})
+    return list(cursor.sort("fullName", 1).limit(limit))
+
+
+employee_search.mongo_text_search = _memory_text_search
+
+
+def _reset_caches():
+    # every test gets a new in-memory database; drop what this process cached
+    invalidation_bus._dispatch_all("resync")
+    leave_engine.invalidate()
+    live_counters.invalidate()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.payslip_pdf.PDF_CACHE_DIR", str(tmp_path / "pdf_cache"))
+    # the lifespan connects on start and drops the client on exit: a fresh database per test
+    with TestClient(app) as c:
+        _reset_caches()
+        yield c
+
+
+def login(client, email: str, password: str):
+    r = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest.fixture
+def admin(client):
+    return login(client, DEFAULT_ADMIN_EMAIL, DEFAULT_ADMIN_PASSWORD)
+
+
+@pytest.fixture
+def make_employee(client, admin):
+    """Creates an employee through the API; returns (employeeId, auth headers)."""
+
+    def make(employee_id: str = "E1", department: str = "Engineering", salary: float = 30000):
+        email = f"{employee_id.lower()}@example.com"
+        r = client.post("/api/employees", headers=admin, json={
+            "employeeId": employee_id,
+            "fullName": f"Employee {employee_id}",
+            "email": email,
+            "department": department,
+            "designation": "Engineer",
+            "salary": salary,
+            "password": "secret123",
+        })
+        assert r.status_code == 200, r.text
+        return employee_id, login(client, email, "secret123")
+
+    return make
+
+
+def run_jobs():
+    """Runs every due job inline (no worker threads in tests); returns how many ran."""
+    from app.jobs import _claim, _run
+
+    ran = 0
+    while (job := _claim()) is not None:
+        _run(job)
+        ran += 1
+    return ran
@@ -0,0 +1,91 @@
+import asyncio
+
+from app import admission
+from app.admission import BULK, CRITICAL, NORMAL, AdmissionControl, _Lane, route_class
+
+
+def test_route_classes():
+    assert route_class("POST", "/api/auth/login") == CRITICAL
+    assert route_class("POST", "/api/attendance") == CRITICAL
+    assert route_class("GET", "/api/attendance") == BULK
+    assert route_class("GET", "/api/attendance/export/csv") == BULK
+    assert route_class("POST", "/api/payroll/run") == BULK
+    assert route_class("GET", "/api/employees") == NORMAL
+    assert route_class("GET", "/api/dashboard/live") is None
+    assert route_class("OPTIONS", "/api/attendance") is None
+
+
+def _lane(monkeypatch, spec: str, timeout: float = 0.05):
+    monkeypatch.setenv("HRMS_ADMISSION_BULK", spec)
+    monkeypatch.setitem(admission.QUEUE_TIMEOUT_SECONDS, BULK, timeout)
+    return _Lane(BULK)
+
+
+def test_lane_queues_then_times_out(monkeypatch):
+    async def scenario():
+        lane = _lane(monkeypatch, "1:1")
+        assert await lane.acquire()
+        # queued behind the running request, then gives up
+        assert not await lane.acquire()
+        return lane.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["admitted"], stats["queued"], stats["rejected"], stats["waiting"]) == (1, 1, 1, 0)
+
+
+def test_lane_rejects_when_queue_is_full_and_hands_over_slots(monkeypatch):
+    async def scenario():
+        lane = _lane(monkeypatch, "1:1", timeout=1)
+        assert await lane.acquire()
+        waiter = asyncio.create_task(lane.acquire())
+        await asyncio.sleep(0)
+        assert lane.waiting == 1
+        assert not await lane.acquire()             # queue full
+        lane.release()
+        assert await waiter                         # the queued request gets the slot
+        assert not await lane.acquire(may_queue=False)
+        return lane.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["active"], stats["admitted"], stats["rejected"]) == (1, 2, 2)
+
+
+def _request(path: str, method: str = "GET"):
+    return {"type": "http", "method": method, "path": path}
+
+
+def test_bulk_is_shed_while_critical_waits(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", True)
+    monkeypatch.setenv("HRMS_ADMISSION_BULK", "1:4")
+    monkeypatch.setattr(admission.admission_stats, "_middleware", None)
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def scenario():
+        control = AdmissionControl(app)
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await control.lanes[BULK].acquire()         # the only bulk slot is busy
+        control.lanes[CRITICAL].waiting = 1         # and a check-in is queued
+        await control(_request("/api/attendance"), None, send)
+        control.lanes[CRITICAL].waiting = 0
+        await control(_request("/api/employees"), None, send)
+        return sent
+
+    sent = asyncio.run(scenario())
+    rejected, admitted = sent[0], sent[-1]
+    assert rejected["status"] == 429
+    assert (b"retry-after", str(admission.RETRY_AFTER_SECONDS[BULK]).encode()) in rejected["headers"]
+    assert admitted["status"] == 200
+    report = admission.admission_stats.report()["classes"]
+    assert (report[BULK]["rejected"], report[BULK]["queued"], report[NORMAL]["admitted"]) == (1, 0, 1)
+
+
+def test_admin_admission_report(client, admin):
+    r = client.get("/api/admin/admission", headers=admin)
+    assert r.status_code == 200
+    assert r.json()["enabled"] is False         # HRMS_ADMISSION=off in tests
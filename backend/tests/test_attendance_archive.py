@@ -0,0 +1,94 @@
+from app import attendance_archive
+from app.attendance_archive import archive_month, archive_old_attendance, find_all_tiers, status_counts_all_tiers
+from app.attendance_codec import encode_times
+from app.attendance_store import attendance_store
+from app.database import attendance_archive_collection
+from app.main import build_attendance_csv
+
+
+def _day(employee_id: str, day: str, status: str = "Present", check_out: str | None = "17:00"):
+    attendance_store.insert({
+        "employeeId": employee_id,
+        "date": day,
+        "status": status,
+        **encode_times("09:00" if status == "Present" else None, check_out if status == "Present" else None),
+    })
+
+
+def _history(make_employee):
+    make_employee("E1", department="Engineering")
+    make_employee("E2", department="Sales")
+    _day("E1", "2020-01-06")
+    _day("E1", "2020-01-07", status="Absent")
+    _day("E2", "2020-01-06")
+
+
+def test_archived_months_leave_the_hot_store_and_read_back(client, admin, make_employee):
+    _history(make_employee)
+    assert archive_month("2020-01") == 3
+    assert attendance_store.find(start="2020-01-01", end="2020-01-31") == []
+
+    blocks = {b["department"]: b for b in attendance_archive_collection.find({}, {"data": 0})}
+    assert (blocks["Engineering"]["rowCount"], blocks["Sales"]["employeeIds"]) == (2, ["E2"])
+
+    assert find_all_tiers("E1") == []       # no range: the archive is not read
+    rows = find_all_tiers("E1", "2020-01-01", "2020-12-31", newest_first=True)
+    assert [(r["date"], r["status"], r["totalHours"]) for r in rows] == [
+        ("2020-01-07", "Absent", "00:00"),
+        ("2020-01-06", "Present", "08:00"),
+    ]
+    assert status_counts_all_tiers("E1")["Present"] == 1
+    assert status_counts_all_tiers(None, "2020-01-01", "2020-01-31")["Present"] == 2
+
+
+def test_endpoints_include_archived_months(client, admin, make_employee):
+    _history(make_employee)
+    _day("E1", "2020-02-03")        # still hot
+    archive_month("2020-01")
+
+    rows = client.get("/api/attendance?employeeId=E1", headers=admin).json()
+    assert [r["date"] for r in rows] == ["2020-02-03"]
+    rows = client.get("/api/attendance?employeeId=E1&startDate=2020-01-01&endDate=2020-02-29", headers=admin).json()
+    assert [r["date"] for r in rows] == ["2020-02-03", "2020-01-07", "2020-01-06"]
+    assert rows[0]["fullName"] == "Employee E1"
+
+    summary = client.get("/api/attendance/summary?employeeId=E1", headers=admin).json()
+    assert (summary["Present"], summary["Absent"]) == (2, 1)
+
+    hours = client.get("/api/attendance/total-hours?employeeId=E1", headers=admin).json()
+    assert hours == [{"employeeId": "E1", "days": 3, "totalMinutes": 960, "totalHours": "16:00"}]
+
+
+def test_late_write_to_an_archived_month_is_merged(client, admin, make_employee):
+    _history(make_employee)
+    archive_month("2020-01")
+    _day("E1", "2020-01-07")        # corrected after archiving: hot wins
+
+    assert find_all_tiers("E1", "2020-01-07", "2020-01-07")[0]["status"] == "Present"
+    archive_month("2020-01")
+    assert attendance_store.find("E1") == []
+    rows = find_all_tiers("E1", "2020-01-01", "2020-01-31")
+    assert [(r["date"], r["status"]) for r in rows] == [("2020-01-06", "Present"), ("2020-01-07", "Present")]
+
+
+def test_scheduled_archive_stops_at_the_cutoff(client, make_employee, monkeypatch):
+    monkeypatch.setattr("app.attendance_archive.archive_cutoff_month", lambda: "2020-02")
+    _history(make_employee)
+    _day("E1", "2020-02-03")
+
+    assert archive_old_attendance() == 3
+    assert [r["date"] for r in attendance_store.find("E1")] == ["2020-02-03"]
+
+
+def test_open_ended_reads_never_decompress_blocks(client, admin, make_employee, monkeypatch):
+    _history(make_employee)
+    archive_month("2020-01")
+    calls = []
+    real = attendance_archive._decompress_rows
+    monkeypatch.setattr(attendance_archive, "_decompress_rows", lambda blob: calls.append(1) or real(blob))
+
+    assert client.get("/api/attendance", headers=admin).json() == []
+    assert client.get("/api/attendance/summary", headers=admin).json()["Present"] == 2
+    assert client.get("/api/attendance/total-hours", headers=admin).json()[0]["totalMinutes"] == 480
+    assert build_attendance_csv()[1] == 0
+    assert calls == []
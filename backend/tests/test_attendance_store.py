@@ -0,0 +1,97 @@
+import pytest
+
+from app import attendance_store as store_module
+from app.attendance_codec import encode_times
+from app.attendance_store import MonthlyBucketAttendanceStore
+from app.database import attendance_monthly_collection
+
+
+class _RacingCollection:
+    """Runs `race` once, right after the first find() has been read."""
+
+    def __init__(self, collection, race):
+        self._collection = collection
+        self._race = race
+
+    def find(self, *args, **kwargs):
+        docs = list(self._collection.find(*args, **kwargs))
+        if self._race:
+            race, self._race = self._race, None
+            race()
+        return docs
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+@pytest.fixture
+def monthly(client):
+    return MonthlyBucketAttendanceStore(attendance_monthly_collection)
+
+
+def _bucket(employee_id="E1", month="2026-11"):
+    return attendance_monthly_collection.find_one({"_id": f"{employee_id}:{month}"})
+
+
+def test_leave_days_are_added_and_removed_per_day(monthly):
+    monthly.insert({"employeeId": "E1", "date": "2026-11-02", "status": "Absent", **encode_times(None, None)})
+    monthly.upsert_leave_days("E1", ["2026-11-02", "2026-11-03"], "L1")
+    assert _bucket()["counts"]["Leave"] == 2
+
+    assert monthly.remove_leave_days("E1", "L1") == 2
+    bucket = _bucket()
+    assert [(d["date"], d["status"]) for d in bucket["days"]] == [("2026-11-02", "Absent")]
+    assert "leaveId" not in bucket["days"][0]
+    assert (bucket["counts"]["Leave"], bucket["counts"]["Absent"]) == (0, 1)
+
+
+def test_check_in_during_leave_removal_is_kept(monthly):
+    monthly.upsert_leave_days("E1", ["2026-11-02", "2026-11-03"], "L1")
+
+    def check_in():
+        monthly_direct.insert({
+            "employeeId": "E1", "date": "2026-11-04", "status": "Present", **encode_times("09:00", None),
+        })
+
+    monthly_direct = MonthlyBucketAttendanceStore(attendance_monthly_collection)
+    monthly.collection = _RacingCollection(attendance_monthly_collection, check_in)
+    monthly.remove_leave_days("E1", "L1")
+
+    bucket = _bucket()
+    assert [(d["date"], d["status"]) for d in bucket["days"]] == [("2026-11-04", "Present")]
+    assert (bucket["counts"]["Present"], bucket["counts"]["Leave"]) == (1, 0)
+
+
+def test_day_changed_after_the_read_is_retried(monthly):
+    monthly.insert({"employeeId": "E1", "date": "2026-11-02", "status": "Absent", **encode_times(None, None)})
+    monthly.upsert_leave_days("E1", ["2026-11-02"], "L1")
+
+    def hr_edit():
+        # status edited between the read and the write: the first update misses
+        attendance_monthly_collection.update_one(
+            {"_id": "E1:2026-11", "days.date": "2026-11-02"},
+            {"$set": {"days.$.status": "Half-Day"}, "$inc": {"counts.Leave": -1, "counts.Half-Day": 1}},
+        )
+
+    monthly.collection = _RacingCollection(attendance_monthly_collection, hr_edit)
+    assert monthly.remove_leave_days("E1", "L1") == 1
+
+    bucket = _bucket()
+    assert bucket["days"][0]["status"] == "Absent" and "leaveId" not in bucket["days"][0]
+    assert sum(bucket["counts"].values()) == 1 and bucket["counts"]["Absent"] == 1
+
+
+def test_removed_days_are_tombstoned(monthly, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(store_module, "record_deletes", lambda feed, keys, *a, **k: recorded.extend(keys))
+    monthly.upsert_leave_days("E1", ["2026-11-02"], "L1")
+    monthly.remove_leave_days("E1", "L1")
+    assert recorded == [{"employeeId": "E1", "date": "2026-11-02"}]
+
+
+def test_bucket_prefilter_narrows_open_date_ranges():
+    prefilter = MonthlyBucketAttendanceStore._bucket_prefilter
+    assert prefilter({"date": {"$gte": "2026-02-24", "$lt": "2026-03-03"}}) == {
+        "month": {"$gte": "2026-02", "$lte": "2026-03"},
+    }
+    assert prefilter({"date": {"$gt": "2026-02-24"}}) == {"month": {"$gte": "2026-02"}}
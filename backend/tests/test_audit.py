@@ -0,0 +1,71 @@
+import time
+
+from app.audit import REDACTED, AuditLog, diff, query_audit
+from app.database import audit_log_collection
+
+
+def _entries(**query):
+    # written by the background writer (HRMS_AUDIT_FLUSH_SECONDS=0.05 in tests)
+    for _ in range(100):
+        found = query_audit(**query)
+        if found:
+            return found
+        time.sleep(0.02)
+    return []
+
+
+def test_diff_lists_changed_fields_and_redacts_passwords():
+    assert diff({"salary": 1, "department": "A"}, {"salary": 2, "department": "A"}) == {
+        "salary": {"from": 1, "to": 2},
+    }
+    assert diff(None, {"password": "hash"}) == {"password": {"from": None, "to": REDACTED}}
+    assert diff({"password": "a"}, {"password": "b"}) == {"password": {"from": REDACTED, "to": REDACTED}}
+
+
+def test_full_queue_drops_and_counts(monkeypatch):
+    monkeypatch.setattr("app.audit.AUDIT_QUEUE_SIZE", 1)
+    log = AuditLog()
+    log.record("a", "user", "x", "admin@hrms.com")
+    log.record("b", "user", "x", "admin@hrms.com")
+    assert log.stats() == {"written": 0, "dropped": 1, "failedWrites": 0, "queued": 1}
+
+
+def test_stop_flushes_queued_entries(client):
+    log = AuditLog()
+    for i in range(3):
+        log.record("employee.updated", "employee", f"E{i}", "hr@example.com")
+    log.start()
+    log.stop()
+    assert log.stats()["written"] == 3
+    assert audit_log_collection.count_documents({"actor": "hr@example.com"}) == 3
+
+
+def test_employee_update_is_audited(client, admin, make_employee):
+    make_employee("E1", salary=30000)
+    r = client.put("/api/employees/E1", headers=admin, json={"salary": 35000})
+    assert r.status_code == 200, r.text
+
+    entries = _entries(entity="employee", entity_id="E1")
+    assert entries[0]["action"] == "employee.updated"
+    assert entries[0]["actor"] == "admin@hrms.com"
+    assert entries[0]["changes"] == {"salary": {"from": 30000, "to": 35000}}
+
+    listed = client.get("/api/admin/audit?entity=employee&entityId=E1", headers=admin).json()
+    assert [e["action"] for e in listed] == ["employee.updated"]
+    assert client.get("/api/admin/audit/status", headers=admin).json()["written"] >= 1
+
+
+def test_password_reset_audit_never_stores_the_hash(client, admin, make_employee):
+    make_employee("E1")
+    r = client.put("/api/users/reset-password/e1@example.com", headers=admin, json={
+        "newPassword": "another1", "confirmPassword": "another1",
+    })
+    assert r.status_code == 200, r.text
+
+    entry = _entries(entity="employee", entity_id="E1")[0]
+    assert entry["changes"] == {"password": {"from": REDACTED, "to": REDACTED}}
+
+
+def test_audit_needs_admin(client, make_employee):
+    _, employee = make_employee("E1")
+    assert client.get("/api/admin/audit", headers=employee).status_code == 403
@@ -0,0 +1,37 @@
+from app.config_cache import CachedLoader, get_office
+from app.database import office_collection
+
+
+def test_cached_loader_drops_values_on_invalidation(client, admin):
+    r = client.post("/api/offices", headers=admin, json={
+        "officeId": "KOL", "officeName": "Office KOL", "lat": 22.57, "lng": 88.36, "timezone": "Asia/Kolkata",
+    })
+    assert r.status_code == 201, r.text
+    assert get_office("KOL")["timezone"] == "Asia/Kolkata"
+
+    # written behind the cache's back: still the cached value
+    office_collection.update_one({"officeId": "KOL"}, {"$set": {"timezone": "UTC"}})
+    assert get_office("KOL")["timezone"] == "Asia/Kolkata"
+
+    # through the API: every cache of the collection is dropped
+    r = client.put("/api/offices/KOL", headers=admin, json={
+        "officeId": "KOL", "officeName": "Office KOL", "lat": 22.57, "lng": 88.36, "timezone": "Europe/London",
+    })
+    assert r.status_code == 200, r.text
+    assert get_office("KOL")["timezone"] == "Europe/London"
+
+
+def test_cached_loader_ignores_a_load_that_raced_an_invalidation():
+    loads = []
+    cache = None
+
+    def loader(key):
+        loads.append(key)
+        if len(loads) == 1:
+            cache.invalidate()      # a write lands while the first load runs
+        return len(loads)
+
+    cache = CachedLoader(loader)
+    assert cache.get("k") == 1
+    assert cache.get("k") == 2      # the stale first value was not stored
+    assert cache.get("k") == 2
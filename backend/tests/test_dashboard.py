@@ -0,0 +1,23 @@
+from datetime import date, timedelta
+
+from app.attendance_store import attendance_store
+
+
+def test_monthly_attendance_counts_statuses_per_day(client, admin, make_employee):
+    make_employee("E1")
+    make_employee("E2")
+    today = date.today()
+    yesterday = (today - timedelta(days=1)).isoformat()
+    for employee_id, day, status in (
+        ("E1", yesterday, "Present"),
+        ("E2", yesterday, "Absent"),
+        ("E1", today.isoformat(), "Half-Day"),
+    ):
+        attendance_store.insert({"employeeId": employee_id, "date": day, "status": status})
+
+    r = client.get("/api/dashboard/monthly-attendance", headers=admin)
+    assert r.status_code == 200
+    assert r.json() == [
+        {"date": yesterday, "Present": 1, "Absent": 1, "Half-Day": 0, "Leave": 0},
+        {"date": today.isoformat(), "Present": 0, "Absent": 0, "Half-Day": 1, "Leave": 0},
+    ]
@@ -0,0 +1,114 @@
+import pytest
+
+from app import employee_purge
+from app.attendance_archive import archive_month, find_archived
+from app.attendance_codec import encode_times
+from app.attendance_store import attendance_store
+from app.database import (
+    attendance_archive_collection,
+    employee_collection,
+    leave_balances_collection,
+    leaves_collection,
+    sync_tombstones_collection,
+)
+from app.leave_balance import ledger_id
+
+from tests.conftest import run_jobs
+
+
+@pytest.fixture(autouse=True)
+def no_batch_pause(monkeypatch):
+    monkeypatch.setattr(employee_purge, "PURGE_BATCH_PAUSE_SECONDS", 0)
+
+
+def _day(employee_id: str, day: str):
+    attendance_store.insert({
+        "employeeId": employee_id,
+        "date": day,
+        "status": "Present",
+        **encode_times("09:00", "17:00"),
+    })
+
+
+def test_purge_rewrites_archive_blocks(client, admin, make_employee):
+    make_employee("E1")
+    make_employee("E2")
+    for day in ("2020-01-06", "2020-01-07"):
+        _day("E1", day)
+        _day("E2", day)
+    _day("E1", "2020-02-03")        # a block holding nobody else
+    archive_month("2020-01")
+    archive_month("2020-02")
+    assert attendance_archive_collection.count_documents({"employeeIds": "E1"}) == 2
+
+    r = client.delete("/api/employees/E1", headers=admin)
+    assert r.status_code == 202
+    run_jobs()
+
+    assert not find_archived("E1")
+    assert [r["date"] for r in find_archived("E2")] == ["2020-01-06", "2020-01-07"]
+    blocks = list(attendance_archive_collection.find({}, {"data": 0}))
+    assert [(b["month"], b["employeeIds"], b["rowCount"]) for b in blocks] == [("2020-01", ["E2"], 2)]
+    assert [s["employeeId"] for s in blocks[0]["stats"]] == ["E2"]
+    assert sync_tombstones_collection.count_documents({"collection": "attendance", "key.employeeId": "E1"}) == 3
+    assert employee_collection.find_one({"employeeId": "E1"}) is None
+
+
+def test_recreate_during_hold_names_the_hold(client, admin, make_employee):
+    make_employee("E1")
+    r = client.delete("/api/employees/E1?holdDays=30", headers=admin)
+    purge_after = r.json()["purgeAfter"]
+
+    for employee_id, email in (("E1", "new@example.com"), ("E9", "e1@example.com")):
+        r = client.post("/api/employees", headers=admin, json={
+            "employeeId": employee_id,
+            "fullName": "Again",
+            "email": email,
+            "department": "Engineering",
+            "designation": "Engineer",
+            "salary": 1,
+            "password": "secret123",
+        })
+        assert r.status_code == 409
+        assert "deactivated" in r.json()["detail"] and purge_after in r.json()["detail"]
+
+
+def test_recreate_after_purge(client, admin, make_employee):
+    make_employee("E1")
+    client.delete("/api/employees/E1", headers=admin)
+    run_jobs()
+    make_employee("E1")
+
+
+def test_deactivation_rejects_pending_leaves(client, admin, make_employee):
+    emp, employee = make_employee("E1")
+    r = client.post("/api/leaves", headers=employee, json={
+        "employeeId": emp, "startDate": "2026-11-02", "endDate": "2026-11-03", "reason": "trip",
+    })
+    assert r.status_code == 201
+    assert leave_balances_collection.find_one({"_id": ledger_id(emp, 2026)})["pending"] == 2
+
+    client.delete(f"/api/employees/{emp}?holdDays=30", headers=admin)
+
+    leave = leaves_collection.find_one({"employeeId": emp})
+    assert (leave["status"], leave["remark"]) == ("REJECTED", "Employee deactivated")
+    assert leave_balances_collection.find_one({"_id": ledger_id(emp, 2026)})["pending"] == 0
+
+
+def test_tombstones_are_written_before_the_delete(client, make_employee, monkeypatch):
+    make_employee("E1")
+    _day("E1", "2026-03-02")
+    real_delete_many = attendance_store.collection.delete_many
+
+    def crash_after(*args, **kwargs):
+        # the delete itself fails: the tombstone must already be there
+        assert sync_tombstones_collection.count_documents({"key.employeeId": "E1"}) == 1
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(attendance_store.collection, "delete_many", crash_after)
+    with pytest.raises(RuntimeError):
+        attendance_store.delete_employee("E1")
+    monkeypatch.setattr(attendance_store.collection, "delete_many", real_delete_many)
+
+    assert attendance_store.delete_employee("E1") == 1
+    assert not attendance_store.find("E1")
@@ -0,0 +1,80 @@
+from app.database import employee_collection
+from app.employee_search import employee_search_index, mongo_text_search
+
+
+def _ids(results):
+    return [r["employeeId"] for r in results]
+
+
+def _people(client, admin):
+    for employee_id, name, designation in (
+        ("E1", "Asha Rajkumar", "Backend Engineer"),
+        ("E2", "Ravi Kumar", "Designer"),
+        ("E3", "Kumari Devi", "Backend Lead"),
+    ):
+        r = client.post("/api/employees", headers=admin, json={
+            "employeeId": employee_id,
+            "fullName": name,
+            "email": f"{employee_id.lower()}@example.com",
+            "department": "Engineering",
+            "designation": designation,
+            "salary": 1,
+            "password": "secret123",
+        })
+        assert r.status_code == 200, r.text
+
+
+def test_memory_index_ranks_prefix_and_infix_hits(client, admin):
+    _people(client, admin)
+    employee_search_index.rebuild()
+
+    r = client.get("/api/employees/search?q=kum", headers=admin).json()
+    assert r["source"] == "memory"
+    # word starts (Kumar, Kumari) before "kum" inside Rajkumar
+    assert _ids(r["results"]) == ["E3", "E2", "E1"]
+
+    assert _ids(employee_search_index.search("backend kum")) == ["E3", "E1"]
+    assert _ids(employee_search_index.search("e2")) == ["E2"]
+    assert employee_search_index.search("   ") == []
+
+
+def test_index_follows_creates_updates_and_deletes(client, admin):
+    _people(client, admin)
+    employee_search_index.rebuild()
+
+    client.put("/api/employees/E2", headers=admin, json={"fullName": "Ravi Shankar"})
+    assert "E2" not in _ids(employee_search_index.search("kumar"))
+    assert _ids(employee_search_index.search("shankar")) == ["E2"]
+
+    client.delete("/api/employees/E3", headers=admin)
+    assert employee_search_index.search("kumari") == []
+
+
+def test_other_workers_writes_reach_the_index(client, admin):
+    _people(client, admin)
+    employee_search_index.rebuild()
+    doc = employee_collection.find_one({"employeeId": "E1"})
+
+    employee_collection.update_one({"_id": doc["_id"]}, {"$set": {"fullName": "Asha Menon"}})
+    employee_search_index.on_change({"operation": "update", "documentKey": {"_id": doc["_id"]}})
+    assert _ids(employee_search_index.search("menon")) == ["E1"]
+
+    employee_search_index.on_change({"operation": "delete", "documentKey": {"_id": doc["_id"]}})
+    assert employee_search_index.search("menon") == []
+
+
+def test_falls_back_to_mongo_until_the_index_is_built(client, admin, monkeypatch):
+    _people(client, admin)
+    employee_search_index.on_change({"operation": "resync"})
+    monkeypatch.setattr(employee_search_index, "build_async", lambda: None)
+
+    r = client.get("/api/employees/search?q=backend", headers=admin).json()
+    assert r["source"] == "mongo"
+    assert _ids(r["results"]) == ["E1", "E3"]       # whole words only, by name
+    assert mongo_text_search("kum") == []
+
+
+def test_search_needs_text_and_hr(client, admin, make_employee):
+    assert client.get("/api/employees/search?q=%20", headers=admin).status_code == 400
+    _, employee = make_employee("E9")
+    assert client.get("/api/employees/search?q=x", headers=employee).status_code == 403
@@ -0,0 +1,34 @@
+import pytest
+
+from app.database import cache_versions_collection, office_collection, settings_collection
+from app.invalidation import InvalidationBus
+
+
+@pytest.fixture
+def bus(client):
+    return InvalidationBus()
+
+
+def test_notify_invalidates_locally_and_bumps_the_version(bus):
+    seen = []
+    unsubscribe = bus.subscribe(office_collection.name, seen.append)
+    bus.notify(office_collection.name, {"_id": "KOL"})
+    unsubscribe()
+    bus.notify(office_collection.name)
+
+    assert seen == [{"collection": "offices", "operation": "local", "documentKey": {"_id": "KOL"}}]
+    assert cache_versions_collection.find_one({"_id": office_collection.name})["version"] == 2
+
+
+def test_polling_sees_other_workers_writes_once(bus):
+    seen = []
+    bus.subscribe(settings_collection.name, seen.append)
+    bus.subscribe(settings_collection.name, lambda change: 1 / 0)     # never stops the others
+    bus._poll_once()        # first look: remembers versions, dispatches nothing
+
+    other_worker = InvalidationBus()
+    other_worker.notify(settings_collection.name)
+    bus._poll_once()
+    bus._poll_once()
+
+    assert [c["operation"] for c in seen] == ["version"]
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.auth_utils import verify_password
+from app.database import employee_collection, jobs_collection
+from app.jobs import enqueue_job, get_job, register_job_type
+from tests.conftest import login, run_jobs
+
+
+@pytest.fixture
+def flaky_job():
+    calls = []
+
+    def handler(ctx, fail_times=0):
+        calls.append(ctx.attempt)
+        if len(calls) <= fail_times:
+            raise RuntimeError("boom")
+        ctx.progress(1, 1, force=True)
+        return {"calls": len(calls)}
+
+    register_job_type("test_flaky", handler, max_attempts=2)
+    return calls
+
+
+def _make_due(job_id: str):
+    jobs_collection.update_one({"_id": job_id}, {"$set": {"runAfter": datetime.utcnow()}})
+
+
+def test_job_runs_to_success(client, flaky_job):
+    job_id = enqueue_job("test_flaky", {}, "admin@hrms.com")
+    assert get_job(job_id)["status"] == "QUEUED"
+
+    assert run_jobs() == 1
+    job = get_job(job_id)
+    assert job["status"] == "SUCCESS"
+    assert job["result"] == {"calls": 1}
+    assert job["progress"]["done"] == 1
+
+
+def test_failed_attempt_is_retried_with_backoff(client, flaky_job):
+    job_id = enqueue_job("test_flaky", {"fail_times": 1}, "admin@hrms.com")
+
+    run_jobs()
+    job = get_job(job_id)
+    assert job["status"] == "QUEUED"
+    assert job["attempts"] == 1
+    assert job["error"] == "boom"
+    assert job["runAfter"] > datetime.utcnow()
+    assert run_jobs() == 0      # not due yet
+
+    _make_due(job_id)
+    run_jobs()
+    assert get_job(job_id)["status"] == "SUCCESS"
+    assert flaky_job == [1, 2]
+
+
+def test_job_fails_after_max_attempts(client, flaky_job):
+    job_id = enqueue_job("test_flaky", {"fail_times": 5}, "admin@hrms.com")
+    run_jobs()
+    _make_due(job_id)
+    run_jobs()
+
+    job = get_job(job_id)
+    assert job["status"] == "FAILED"
+    assert job["attempts"] == 2
+    assert job["finishedAt"]
+
+
+def test_expired_lease_is_claimed_again(client, flaky_job):
+    job_id = enqueue_job("test_flaky", {}, "admin@hrms.com")
+    # a worker claimed it and died
+    jobs_collection.update_one({"_id": job_id}, {"$set": {
+        "status": "RUNNING", "attempts": 1, "leaseOwner": "dead-worker",
+        "leaseUntil": datetime.utcnow() - timedelta(seconds=1),
+    }})
+
+    assert run_jobs() == 1
+    job = get_job(job_id)
+    assert job["status"] == "SUCCESS"
+    assert job["attempts"] == 2
+
+
+def test_unknown_job_type_is_rejected(client):
+    with pytest.raises(ValueError):
+        enqueue_job("no_such_job", {}, "admin@hrms.com")
+
+
+def test_employee_import_never_stores_plaintext_passwords(client, admin):
+    r = client.post("/api/employees/import", headers=admin, json={"employees": [{
+        "employeeId": "IMP1",
+        "fullName": "Imported One",
+        "email": "imp1@example.com",
+        "department": "Sales",
+        "designation": "Rep",
+        "salary": 20000,
+        "password": "plain-secret",
+    }]})
+    assert r.status_code == 202, r.text
+    job_id = r.json()["jobId"]
+
+    params = jobs_collection.find_one({"_id": job_id})["params"]
+    assert "plain-secret" not in repr(params)
+    assert verify_password("plain-secret", params["employees"][0]["passwordHash"])
+
+    run_jobs()
+    status = client.get(f"/api/jobs/{job_id}", headers=admin).json()
+    assert status["status"] == "SUCCESS"
+    assert status["result"]["created"] == 1
+    assert employee_collection.find_one({"employeeId": "IMP1"})
+    login(client, "imp1@example.com", "plain-secret")
+
+
+def test_attendance_export_job_file_download(client, admin, make_employee):
+    make_employee("E1")
+    client.post("/api/attendance", headers=admin, json={
+        "employeeId": "E1", "date": "2026-01-05", "status": "Present",
+        "checkInTime": "09:00", "checkOutTime": "17:30",
+    })
+
+    r = client.post("/api/attendance/export/csv", headers=admin)
+    assert r.status_code == 202
+    job_id = r.json()["jobId"]
+    run_jobs()
+
+    r = client.get(f"/api/jobs/{job_id}/download", headers=admin)
+    assert r.status_code == 200
+    lines = r.text.strip().splitlines()
+    assert lines[0].startswith("Employee ID")
+    assert lines[1].startswith("E1,Employee E1,2026-01-05,Present")
+
+
+def test_jobs_of_other_users_are_hidden(client, admin, make_employee):
+    _, employee = make_employee("E1")
+    job_id = client.post("/api/attendance/export/csv", headers=admin).json()["jobId"]
+    assert client.get(f"/api/jobs/{job_id}", headers=employee).status_code == 404
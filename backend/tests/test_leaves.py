@@ -0,0 +1,149 @@
+import pytest
+from pymongo.errors import PyMongoError
+
+from app import main
+from app.attendance_store import attendance_store
+from app.database import cache_versions_collection, leave_balances_collection, leaves_collection
+from app.invalidation import invalidation_bus
+from app.leave_balance import get_balance, ledger_id
+from app.schemas import LeaveAction
+
+# Monday / Tuesday: two working days
+LEAVE = {"startDate": "2026-11-02", "endDate": "2026-11-03", "reason": "trip"}
+
+
+def _apply(client, headers, employee_id, **overrides):
+    return client.post("/api/leaves", headers=headers, json={"employeeId": employee_id, **LEAVE, **overrides})
+
+
+def _leave_id(client, admin, employee_id):
+    return client.get(f"/api/leaves/{employee_id}", headers=admin).json()[0]["leaveId"]
+
+
+def test_apply_and_approve_moves_ledger_and_attendance(client, admin, make_employee):
+    emp, employee = make_employee("E1")
+    assert _apply(client, employee, emp).status_code == 201
+    assert get_balance(emp, 2026)["pending"] == 2
+
+    leave_id = _leave_id(client, admin, emp)
+    r = client.put(f"/api/leaves/action/{leave_id}", headers=admin, json={"status": "APPROVED"})
+    assert r.status_code == 200
+
+    balance = get_balance(emp, 2026)
+    assert (balance["pending"], balance["used"]) == (0, 2)
+    rows = attendance_store.find(emp)
+    assert sorted(r["date"] for r in rows if r["status"] == "Leave") == ["2026-11-02", "2026-11-03"]
+
+
+def test_concurrent_action_loses_with_409(client, admin, make_employee, monkeypatch):
+    emp, employee = make_employee("E1")
+    _apply(client, employee, emp)
+    leave_id = _leave_id(client, admin, emp)
+
+    # a second HR approves between this request's read and its write
+    stamp, raced = main.next_sync_stamp, []
+
+    def racing_stamp():
+        if not raced:
+            raced.append(True)
+            main.action_leave(leave_id, LeaveAction(status="APPROVED"), {"email": "hr2@hrms.com"})
+        return stamp()
+
+    monkeypatch.setattr(main, "next_sync_stamp", racing_stamp)
+    r = client.put(f"/api/leaves/action/{leave_id}", headers=admin, json={"status": "APPROVED"})
+    assert r.status_code == 409
+
+    balance = get_balance(emp, 2026)
+    assert (balance["pending"], balance["used"]) == (0, 2)
+    assert len([r for r in attendance_store.find(emp) if r["status"] == "Leave"]) == 2
+
+
+def _set_accrued(employee_id, year, days):
+    get_balance(employee_id, year)
+    leave_balances_collection.update_one({"_id": ledger_id(employee_id, year)}, {"$set": {"accrued": days}})
+
+
+def test_apply_cannot_overdraw_balance(client, make_employee):
+    emp, employee = make_employee("E1")
+    _set_accrued(emp, 2026, 3)
+
+    assert _apply(client, employee, emp).status_code == 201
+    r = _apply(client, employee, emp, startDate="2026-11-09", endDate="2026-11-10")
+    assert r.status_code == 400
+    assert "1 day(s) available, 2 requested" in r.json()["detail"]
+
+    assert get_balance(emp, 2026)["pending"] == 2
+    assert len(client.get(f"/api/leaves/{emp}", headers=employee).json()) == 1
+
+
+def test_short_second_year_books_nothing(client, make_employee):
+    emp, employee = make_employee("E1")
+    _set_accrued(emp, 2027, 0)
+
+    # Thu 31 Dec 2026 - Fri 1 Jan 2027
+    r = _apply(client, employee, emp, startDate="2026-12-31", endDate="2027-01-01")
+    assert r.status_code == 400
+    assert get_balance(emp, 2026)["pending"] == 0
+    assert get_balance(emp, 2027)["pending"] == 0
+
+
+def test_failed_insert_releases_the_booking(client, make_employee):
+    emp, employee = make_employee("E1")
+
+    def broken_insert(*args, **kwargs):
+        raise PyMongoError("insert failed")
+
+    # on the proxy instance; removed again so later tests see the real collection
+    leaves_collection.insert_one = broken_insert
+    try:
+        with pytest.raises(PyMongoError):
+            _apply(client, employee, emp)
+    finally:
+        del leaves_collection.insert_one
+
+    assert get_balance(emp, 2026)["pending"] == 0
+
+
+def _calendar(client, headers, start="2026-11-02", end="2026-11-03"):
+    r = client.get(f"/api/leaves/team-calendar?startDate={start}&endDate={end}&department=Engineering", headers=headers)
+    assert r.status_code == 200, r.text
+    return [(d["onLeave"], d["pending"]) for d in r.json()["days"]]
+
+
+def _leave_from_another_worker(employee_id, leave_id="L-OTHER"):
+    leaves_collection.insert_one({
+        "leaveId": leave_id, "employeeId": employee_id, "status": "APPROVED",
+        "startDate": "2026-11-03", "endDate": "2026-11-03",
+    })
+    # what notify() on that worker does
+    cache_versions_collection.update_one({"_id": leaves_collection.name}, {"$inc": {"version": 1}}, upsert=True)
+
+
+def test_team_calendar_follows_own_writes(client, admin, make_employee):
+    emp, employee = make_employee("E1")
+    _apply(client, employee, emp)
+    assert _calendar(client, admin) == [(0, 1), (0, 1)]
+
+    client.put(f"/api/leaves/action/{_leave_id(client, admin, emp)}", headers=admin, json={"status": "APPROVED"})
+    assert _calendar(client, admin) == [(1, 0), (1, 0)]
+
+
+def test_team_calendar_sees_leaves_of_other_workers(client, admin, make_employee):
+    make_employee("E1")
+    emp2, _ = make_employee("E2")
+    assert _calendar(client, admin) == [(0, 0), (0, 0)]     # index built
+    invalidation_bus._poll_once()                           # versions seen so far
+
+    _leave_from_another_worker(emp2)
+    invalidation_bus._poll_once()
+    assert _calendar(client, admin) == [(0, 0), (1, 0)]
+
+
+def test_change_stream_event_updates_one_leave(client, admin, make_employee):
+    emp, _ = make_employee("E1")
+    assert _calendar(client, admin) == [(0, 0), (0, 0)]
+
+    _leave_from_another_worker(emp)
+    doc = leaves_collection.find_one({"leaveId": "L-OTHER"})
+    invalidation_bus._dispatch(leaves_collection.name, "insert", {"_id": doc["_id"]})
+    assert _calendar(client, admin) == [(0, 0), (1, 0)]
@@ -0,0 +1,87 @@
+import asyncio
+import time
+from datetime import date
+
+from app import live_counters as live_counters_module
+from app.database import leaves_collection
+from app.invalidation import invalidation_bus
+from app.live_counters import EventBus, LiveCounters, live_counters, sse_message
+
+
+def test_bus_isolates_failing_handlers_and_unsubscribes():
+    bus, seen = EventBus(), []
+
+    def broken(e):
+        raise RuntimeError("boom")
+
+    bus.subscribe(broken)
+    unsubscribe = bus.subscribe(seen.append)
+    bus.publish("leave.applied", leaveId="L1")
+    unsubscribe()
+    bus.publish("leave.applied", leaveId="L2")
+    assert seen == [{"type": "leave.applied", "leaveId": "L1"}]
+
+
+def test_events_move_counters_without_recounting(client, admin, make_employee, monkeypatch):
+    emp, employee = make_employee("E1")
+    before = live_counters.snapshot()
+    assert before["totalEmployees"] == 1 and before["openCheckins"] == 0
+
+    seeds = []
+    real_seed = LiveCounters._seed
+    monkeypatch.setattr(LiveCounters, "_seed", lambda self: seeds.append(1) or real_seed(self))
+
+    r = client.post("/api/attendance", headers=admin, json={
+        "employeeId": emp, "date": date.today().isoformat(), "status": "Present", "checkInTime": "09:00",
+    })
+    assert r.status_code == 201, r.text
+    r = client.post("/api/leaves", headers=employee, json={
+        "employeeId": emp, "startDate": "2026-11-02", "endDate": "2026-11-03", "reason": "trip",
+    })
+    assert r.status_code == 201, r.text
+
+    after = client.get("/api/dashboard/today-attendance", headers=admin).json()
+    assert after["Present"] == before["todayAttendance"]["Present"] + 1
+    snap = live_counters.snapshot()
+    assert (snap["openCheckins"], snap["pendingLeaves"]) == (1, 1)
+    assert seeds == []
+
+
+def test_deleting_an_employee_recounts(client, admin, make_employee):
+    make_employee("E1")
+    make_employee("E2")
+    assert live_counters.snapshot()["totalEmployees"] == 2
+    client.delete("/api/employees/E2", headers=admin)
+    assert client.get("/api/dashboard/total-employees", headers=admin).json() == {"totalEmployees": 1}
+
+
+def test_writes_on_other_workers_trigger_a_recount(client, make_employee, monkeypatch):
+    make_employee("E1")
+    assert live_counters.snapshot()["pendingLeaves"] == 0
+    monkeypatch.setattr(live_counters_module, "LIVE_COUNTERS_REMOTE_DELAY_SECONDS", 0)
+    loop = asyncio.new_event_loop()
+    entry = (loop, asyncio.Queue())
+    live_counters._subscribers.add(entry)
+    try:
+        # this worker's own notify: its event already moved the counters
+        invalidation_bus._dispatch(leaves_collection.name, "local")
+        assert live_counters._counters is not None
+
+        # a leave applied on another worker only shows up through the bus
+        _id = leaves_collection.insert_one({
+            "leaveId": "L1", "employeeId": "E1", "status": "PENDING",
+            "startDate": "2026-11-02", "endDate": "2026-11-03",
+        }).inserted_id
+        invalidation_bus._dispatch(leaves_collection.name, "insert", {"_id": _id})
+
+        deadline = time.monotonic() + 5
+        while (live_counters._counters is None or live_counters._reseed_timer) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert live_counters._counters["pendingLeaves"] == 1
+    finally:
+        live_counters.unsubscribe_queue(entry)
+        loop.close()
+
+
+def test_sse_message_format():
+    assert sse_message("delta", {"n": 1}) == 'event: delta\ndata: {"n": 1}\n\n'
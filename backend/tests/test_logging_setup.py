@@ -0,0 +1,50 @@
+import json
+import logging
+
+from app import logging_setup
+from app.logging_setup import REQUEST_ID_HEADER, ContextFilter, JsonFormatter, _parse_routes, begin_request
+
+
+def _record(level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_json_formatter_keeps_extra_fields():
+    line = json.loads(JsonFormatter().format(_record(jobId="J1", rows=3, empty=None)))
+    assert line["msg"] == "hello world"
+    assert line["level"] == "INFO" and line["logger"] == "app.test"
+    assert (line["jobId"], line["rows"]) == ("J1", 3)
+    assert "empty" not in line
+
+
+def test_longest_route_prefix_wins(monkeypatch):
+    routes = _parse_routes("/api=0.5, /api/attendance=0.05,broken")
+    assert list(routes) == ["/api/attendance", "/api"]
+    monkeypatch.setattr(logging_setup, "LOG_DEBUG_ROUTES", routes)
+    assert logging_setup.debug_sample_rate("/api/attendance/me") == 0.05
+    assert logging_setup.debug_sample_rate("/api/leaves") == 0.5
+    assert logging_setup.debug_sample_rate("/health") == logging_setup.LOG_DEBUG_SAMPLE
+
+
+def test_debug_lines_are_sampled_per_request(monkeypatch):
+    monkeypatch.setattr(logging_setup, "LOG_LEVEL", logging.INFO)
+    monkeypatch.setattr(logging_setup, "LOG_DEBUG_ROUTES", {"/api/attendance": 1.0, "/api/auth": 0.0})
+    f = ContextFilter()
+
+    begin_request("/api/attendance", "req-1")
+    debug = _record(logging.DEBUG)
+    assert f.filter(debug) and debug.requestId == "req-1" and debug.path == "/api/attendance"
+
+    begin_request("/api/auth/login")
+    assert not f.filter(_record(logging.DEBUG))
+    assert f.filter(_record(logging.INFO))
+
+
+def test_request_id_is_echoed_or_generated(client):
+    r = client.get("/api/auth/me", headers={REQUEST_ID_HEADER: "abc-123"})
+    assert r.headers[REQUEST_ID_HEADER] == "abc-123"
+    r = client.get("/api/auth/me")
+    assert len(r.headers[REQUEST_ID_HEADER]) == 32
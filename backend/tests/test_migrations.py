@@ -0,0 +1,67 @@
+from app.attendance_store import attendance_store
+from app.database import attendance_collection, employee_collection, payslips_collection
+from app.migrations import get_migration_status, migrate_attendance_v2, migrate_payslip_periods, migrate_sync_sequence
+
+
+def _legacy_days(n: int):
+    attendance_collection.insert_many([
+        {
+            "employeeId": "E1",
+            "date": f"2026-01-{day:02d}",
+            "status": "Present",
+            "checkInTime": "09:00",
+            "checkOutTime": "17:30",
+            "totalHours": "08:30",
+        }
+        for day in range(1, n + 1)
+    ])
+
+
+def test_attendance_v2_resumes_from_its_checkpoint(client):
+    _legacy_days(5)
+    attendance_collection.insert_one({"employeeId": "E1", "date": "2026-01-06", "checkInTime": "late"})
+
+    assert migrate_attendance_v2(batch_size=2, max_batches=1)["status"] == "PAUSED"
+    assert get_migration_status("attendance_v2")[0]["migrated"] == 2
+
+    result = migrate_attendance_v2(batch_size=2)
+    assert result == {"migrated": 5, "failed": 1, "status": "DONE"}
+
+    row = attendance_collection.find_one({"date": "2026-01-01"})
+    assert (row["schemaVersion"], row["checkInMin"], row["totalMin"]) == (2, 540, 510)
+    assert "checkInTime" not in row
+    # the API shape is unchanged
+    assert attendance_store.find_one("E1", "2026-01-01")["totalHours"] == "08:30"
+
+
+def test_payslip_periods_backfills_period_and_department(client):
+    employee_collection.insert_many([
+        {"employeeId": "E1", "department": "Sales"},
+        {"employeeId": "E2", "department": "Sales"},
+        {"employeeId": "E3", "department": "Sales"},
+    ])
+    payslips_collection.insert_many([
+        {"employeeId": "E1", "monthYear": "March 2026"},
+        {"employeeId": "E2", "monthYear": "sometime"},
+        # already has a slip with the period: stays unmigrated
+        {"employeeId": "E3", "monthYear": "March 2026"},
+        {"employeeId": "E3", "monthYear": "March 2026", "period": 202603},
+    ])
+
+    assert migrate_payslip_periods(batch_size=2) == {"migrated": 1, "failed": 2, "status": "DONE"}
+    slip = payslips_collection.find_one({"employeeId": "E1"})
+    assert (slip["period"], slip["year"], slip["month"], slip["department"]) == (202603, 2026, 3, "Sales")
+    assert payslips_collection.count_documents({"employeeId": "E3", "period": {"$exists": False}}) == 1
+
+
+def test_sync_sequence_stamps_old_documents_once(client):
+    employee_collection.insert_many([{"employeeId": f"E{i}"} for i in range(3)])
+    _legacy_days(2)
+
+    result = migrate_sync_sequence(batch_size=2)
+    assert result["status"] == "DONE"
+    assert employee_collection.count_documents({"syncSeq": {"$exists": False}}) == 0
+    assert attendance_collection.count_documents({"syncSeq": {"$exists": False}}) == 0
+
+    # nothing left to stamp: a re-run touches nothing
+    assert migrate_sync_sequence(batch_size=2)["migrated"] == result["migrated"]
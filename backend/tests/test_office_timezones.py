@@ -0,0 +1,83 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app import office_timezones
+from app.attendance_codec import encode_times
+from app.attendance_store import attendance_store
+from app.database import office_collection
+from app.office_timezones import auto_checkout_sweep, office_checkout_groups
+
+DAY = "2026-03-02"
+
+
+@pytest.fixture
+def offices(client, monkeypatch):
+    office_collection.insert_many([
+        {"officeId": "KOL", "timezone": "Asia/Kolkata", "checkoutCutoff": "18:00"},
+        {"officeId": "NYC", "timezone": "America/New_York", "checkoutCutoff": "19:00"},
+    ])
+    clocks = {"day": DAY, "Asia/Kolkata": "18:30", "America/New_York": "08:00"}
+
+    def local_now(tz_name=None):
+        hh, mm = clocks.get(tz_name, "08:00").split(":")
+        return datetime.fromisoformat(f"{clocks['day']}T{hh}:{mm}").replace(tzinfo=ZoneInfo(tz_name or "UTC"))
+
+    monkeypatch.setattr(office_timezones, "local_now", local_now)
+    for employee_id, office_id in (("E1", "KOL"), ("E2", "NYC")):
+        attendance_store.insert({
+            "employeeId": employee_id,
+            "date": DAY,
+            "status": "Present",
+            "checkInLocation": {"officeId": office_id},
+            **encode_times("09:15", None),
+        })
+    return clocks
+
+
+def test_offices_are_grouped_by_timezone_and_cutoff(offices):
+    groups = office_checkout_groups()
+    assert groups[("Asia/Kolkata", "18:00")] == ["KOL"]
+    assert groups[("America/New_York", "19:00")] == ["NYC"]
+    # check-ins without an office belong to the default group
+    assert None in groups[(office_timezones.DEFAULT_TIMEZONE, office_timezones.DEFAULT_CHECKOUT_CUTOFF)]
+
+
+def test_sweep_checks_out_each_zone_once_after_its_cutoff(offices):
+    assert auto_checkout_sweep() == 1
+    e1 = attendance_store.find_one("E1", DAY)
+    assert (e1["checkOutTime"], e1["totalHours"], e1["autoCheckout"]) == ("18:00", "08:45", True)
+    assert attendance_store.find_one("E2", DAY)["checkOutTime"] == ""
+
+    # slot already claimed for Kolkata's day; New York's cutoff not reached yet
+    assert auto_checkout_sweep() == 0
+
+
+def test_forced_sweep_ignores_cutoffs(offices):
+    assert auto_checkout_sweep(force=True) == 2
+    assert attendance_store.find_one("E2", DAY)["checkOutTime"] == "19:00"
+
+
+def test_check_in_after_the_cutoff_is_closed_the_next_day(offices):
+    assert auto_checkout_sweep() == 1
+
+    # Kolkata's batch for the day already ran when E3 checks in
+    attendance_store.insert({
+        "employeeId": "E3",
+        "date": DAY,
+        "status": "Present",
+        "checkInLocation": {"officeId": "KOL"},
+        **encode_times("18:45", None),
+    })
+    assert auto_checkout_sweep() == 0
+    assert attendance_store.find_one("E3", DAY)["checkOutTime"] == ""
+
+    # first sweep of the next local day, before any cutoff
+    offices.update({"day": "2026-03-03", "Asia/Kolkata": "00:05", "America/New_York": "00:05"})
+    assert auto_checkout_sweep() == 2
+    e3 = attendance_store.find_one("E3", DAY)
+    assert (e3["checkOutTime"], e3["totalHours"], e3["autoCheckout"]) == ("18:45", "00:00", True)
+    # New York's day was never swept: its open check-in is closed at its cutoff
+    assert attendance_store.find_one("E2", DAY)["checkOutTime"] == "19:00"
+    assert auto_checkout_sweep() == 0
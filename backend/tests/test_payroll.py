@@ -0,0 +1,95 @@
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from app import main, payroll
+from app.database import leaves_collection, payslips_collection
+from app.payroll import compute_payroll, run_payroll
+from app.schemas import PayrollRules
+
+
+def _generate(client, headers, employee_id="E1"):
+    return client.post("/api/payslips/generate", headers=headers, json={
+        "employeeId": employee_id,
+        "month": "March",
+        "year": 2026,
+        "basicSalary": 1000,
+        "hra": 200,
+        "allowance": 100,
+        "deduction": 50,
+    })
+
+
+def test_one_payslip_per_employee_and_period(client, make_employee):
+    make_employee("E1")
+    payslips_collection.insert_one({"employeeId": "E1", "period": 202603})
+    with pytest.raises(DuplicateKeyError):
+        payslips_collection.insert_one({"employeeId": "E1", "period": 202603})
+    # slips the migration has not reached yet (no period) are not constrained
+    payslips_collection.insert_many([{"employeeId": "E1"}, {"employeeId": "E1"}])
+
+
+def test_generate_twice_is_rejected(client, admin, make_employee):
+    make_employee("E1")
+    assert _generate(client, admin).status_code == 200
+    r = _generate(client, admin)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Payslip already generated for this month"
+
+
+def test_generate_race_is_rejected(client, admin, make_employee, monkeypatch):
+    make_employee("E1")
+    real_stamp = main.next_sync_stamp
+
+    def other_request_wins():
+        # runs after the existence check, before the insert
+        payslips_collection.insert_one({"employeeId": "E1", "period": 202603, "monthYear": "March 2026"})
+        return real_stamp()
+
+    monkeypatch.setattr(main, "next_sync_stamp", other_request_wins)
+    r = _generate(client, admin)
+    assert r.status_code == 400
+    assert payslips_collection.count_documents({"employeeId": "E1"}) == 1
+
+
+def test_payroll_run_skips_slips_created_concurrently(client, admin, make_employee, monkeypatch):
+    make_employee("E1")
+    make_employee("E2")
+    assert _generate(client, admin, "E1").status_code == 200
+
+    # as if the slip appeared after run_payroll looked: its upsert misses and inserts
+    monkeypatch.setattr(payroll, "period_filter", lambda employee_id, year, month: {
+        "employeeId": employee_id, "raced": True,
+    })
+    result = run_payroll("March", 2026, generated_by="test")
+
+    assert (result["created"], result["updated"], result["skipped"]) == (1, 0, 1)
+    assert payslips_collection.count_documents({"period": 202603}) == 2
+
+
+def test_compute_payroll_applies_rules_per_column():
+    employees = [{"employeeId": "E1", "salary": 20000}, {"employeeId": "E2", "salary": 20000}]
+    totals = {"E1": {"present": 18, "absent": 0, "halfDay": 2, "leave": 0, "overtimeMin": 120}}
+    cols = compute_payroll(employees, totals, {"E2": 5}, 20, PayrollRules())
+
+    # E1: 18 + 2 half days = 19 paid days, 2h overtime at 1.5x; E2: only the approved leave
+    assert cols["paidDays"].tolist() == [19, 5]
+    assert cols["lopDays"].tolist() == [1, 15]
+    assert cols["overtimePay"].tolist() == [375, 0]
+    assert cols["netSalary"].tolist() == [19375, 5000]
+
+
+def test_payroll_run_counts_approved_leave_as_paid(client, make_employee):
+    make_employee("E1", salary=22000)
+    make_employee("E2", salary=22000)
+    leaves_collection.insert_one({
+        "leaveId": "L1", "employeeId": "E2", "status": "APPROVED",
+        "startDate": "2026-03-01", "endDate": "2026-03-31",
+    })
+
+    result = run_payroll("March", 2026, generated_by="test")
+    assert result["created"] == 2
+
+    slips = {p["employeeId"]: p for p in payslips_collection.find({"period": 202603})}
+    # no attendance at all: every working day is loss of pay
+    assert (slips["E1"]["paidDays"], slips["E1"]["netSalary"]) == (0, 0)
+    assert (slips["E2"]["lopDays"], slips["E2"]["netSalary"]) == (0, 22000)
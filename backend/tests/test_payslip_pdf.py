@@ -0,0 +1,66 @@
+import os
+import time
+
+import pytest
+
+from app import payslip_pdf
+from app.payslip_pdf import _cache_get, _cache_path, _cache_put, prune_pdf_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(payslip_pdf, "PDF_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _put(key: str, size: int, age_days: float, now: float):
+    _cache_put(key, b"x" * size)
+    t = now - age_days * 86400
+    os.utime(_cache_path(key), (t, t))
+
+
+def test_prune_drops_entries_not_read_recently(cache_dir, monkeypatch):
+    monkeypatch.setattr(payslip_pdf, "PDF_CACHE_MAX_AGE_DAYS", 30)
+    now = time.time()
+    _put("aa01", 10, 40, now)
+    _put("bb02", 10, 5, now)
+
+    assert prune_pdf_cache(now) == 1
+    assert _cache_get("aa01") is None
+    assert _cache_get("bb02") == b"x" * 10
+
+
+def test_prune_evicts_least_recently_read_over_budget(cache_dir, monkeypatch):
+    monkeypatch.setattr(payslip_pdf, "PDF_CACHE_MAX_MB", 1)
+    mb = 1024 * 1024
+    now = time.time()
+    _put("aa01", mb // 2, 3, now)
+    _put("bb02", mb // 2, 2, now)
+    _put("cc03", mb // 2, 1, now)
+    _cache_get("aa01")      # a hit makes it the most recently read
+
+    assert prune_pdf_cache() == 1
+    assert _cache_get("bb02") is None
+    assert _cache_get("aa01") and _cache_get("cc03")
+
+
+def test_prune_removes_stale_temp_files(cache_dir):
+    stale = cache_dir / "aa" / "aa01.pdf.1.2.tmp"
+    stale.parent.mkdir()
+    stale.write_bytes(b"partial")
+    t = time.time() - 7200
+    os.utime(stale, (t, t))
+
+    assert prune_pdf_cache() == 1
+    assert not stale.exists()
+
+
+def test_writes_trigger_pruning(cache_dir, monkeypatch):
+    monkeypatch.setattr(payslip_pdf, "PDF_CACHE_PRUNE_EVERY", 2)
+    monkeypatch.setattr(payslip_pdf, "_cache_writes", 0)
+    calls = []
+    monkeypatch.setattr(payslip_pdf, "prune_pdf_cache", lambda: calls.append(1))
+
+    for key in ("aa01", "bb02", "cc03", "dd04"):
+        _cache_put(key, b"pdf")
+    assert len(calls) == 2
@@ -0,0 +1,31 @@
+from pymongo.read_preferences import SecondaryPreferred
+
+from app import database
+from app.database import attendance_collection, employee_collection, read_routing_stats
+
+
+def _reads(route, collection):
+    return read_routing_stats()["reads"].get(route, {}).get(collection, 0)
+
+
+def test_reporting_endpoints_read_from_replicas_others_from_primary(client, admin, make_employee):
+    make_employee("E1")
+    before = (_reads("reporting", attendance_collection.name), _reads("primary", employee_collection.name))
+
+    assert client.get("/api/dashboard/monthly-attendance", headers=admin).status_code == 200
+    assert _reads("reporting", attendance_collection.name) > before[0]
+
+    # the route belongs to that request only
+    reporting_employee_reads = _reads("reporting", employee_collection.name)
+    assert client.get("/api/employees", headers=admin).status_code == 200
+    assert _reads("primary", employee_collection.name) > before[1]
+    assert _reads("reporting", employee_collection.name) == reporting_employee_reads
+
+
+def test_reporting_preference_bounds_staleness(monkeypatch):
+    preference = database._reporting_read_preference()
+    assert isinstance(preference, SecondaryPreferred)
+    assert preference.max_staleness == database.REPORTING_MAX_STALENESS_SECONDS
+
+    monkeypatch.setattr(database, "REPORTING_READS", "primary")
+    assert database._reporting_read_preference() is None
@@ -0,0 +1,58 @@
+import time
+
+from app.database import request_profiles_collection
+from app.main import app, get_all_attendance
+from app.request_profiler import PROFILE_ID_HEADER, wants_profile
+
+
+def _stored_profile(profile_id: str):
+    # saved from the default executor after the response
+    for _ in range(50):
+        doc = request_profiles_collection.find_one({"_id": profile_id})
+        if doc:
+            return doc
+        time.sleep(0.02)
+    return None
+
+
+def test_sync_endpoint_is_wrapped_once():
+    route = next(r for r in app.routes if getattr(r, "path", None) == "/api/attendance" and "GET" in r.methods)
+    endpoint, depth = route.endpoint, 0
+    while hasattr(endpoint, "__wrapped__"):
+        endpoint, depth = endpoint.__wrapped__, depth + 1
+    assert depth == 1
+    assert endpoint is get_all_attendance
+
+
+def test_wants_profile_header_needs_admin():
+    assert wants_profile("/api/attendance", "1", "ADMIN") == "header"
+    assert wants_profile("/api/attendance", "1", "HR") is None
+    assert wants_profile("/api/attendance", None, "ADMIN") is None
+
+
+def test_x_profile_request_is_profiled_and_stored(client, admin):
+    r = client.get("/api/attendance", headers={**admin, "X-Profile": "1"})
+    assert r.status_code == 200, r.text
+    profile_id = r.headers[PROFILE_ID_HEADER]
+
+    doc = _stored_profile(profile_id)
+    assert doc is not None
+    assert doc["route"] == "/api/attendance"
+    assert doc["status"] == 200
+    assert doc["trigger"] == "header"
+    assert doc["profiler"] == "pyinstrument"
+    assert doc["data"]
+
+    listed = client.get("/api/admin/profiles", headers=admin).json()
+    assert [p["profileId"] for p in listed] == [profile_id]
+
+    r = client.get(f"/api/admin/profiles/{profile_id}?format=speedscope", headers=admin)
+    assert r.status_code == 200
+    assert r.json()["$schema"].startswith("https://www.speedscope.app")
+
+
+def test_profile_header_ignored_for_non_admin(client, make_employee):
+    _, employee = make_employee()
+    r = client.get("/api/attendance/me", headers={**employee, "X-Profile": "1"})
+    assert r.status_code == 200
+    assert PROFILE_ID_HEADER not in r.headers
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import scheduler
+from app.database import job_runs_collection, scheduler_lease_collection
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    registry = {}
+    monkeypatch.setattr(scheduler, "_jobs", registry)
+    monkeypatch.setattr(scheduler, "_is_leader", False)
+    return registry
+
+
+def test_lease_has_one_owner_until_it_expires(client, monkeypatch):
+    assert scheduler.acquire_lease()
+    assert scheduler.acquire_lease()        # renewal by the owner
+
+    monkeypatch.setattr(scheduler, "INSTANCE_ID", "other-worker")
+    assert not scheduler.acquire_lease()
+
+    scheduler_lease_collection.update_one(
+        {"_id": scheduler.LEASE_NAME}, {"$set": {"expiresAt": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+    assert scheduler.acquire_lease()
+    assert scheduler_lease_collection.find_one({"_id": scheduler.LEASE_NAME})["owner"] == "other-worker"
+
+
+def test_release_only_drops_own_lease(client, monkeypatch):
+    assert scheduler.acquire_lease()
+    monkeypatch.setattr(scheduler, "INSTANCE_ID", "other-worker")
+    scheduler.release_lease()
+    assert scheduler_lease_collection.count_documents({}) == 1
+
+
+def test_heartbeat_loses_leadership_when_mongo_is_down(client, jobs, monkeypatch):
+    scheduler._heartbeat()
+    assert scheduler.is_leader()
+
+    def unreachable():
+        raise ConnectionError("mongo down")
+
+    monkeypatch.setattr(scheduler, "acquire_lease", unreachable)
+    scheduler._heartbeat()
+    assert not scheduler.is_leader()
+
+
+def test_new_leader_catches_up_a_missed_slot_once(client, jobs):
+    calls = []
+    scheduler.register_job("hourly", lambda: calls.append(1) or 7, "cron", minute=0)
+
+    scheduler._heartbeat()          # becomes leader -> catch-up
+    scheduler.catch_up_missed_runs()   # same slot again: already recorded
+
+    assert calls == [1]
+    run = job_runs_collection.find_one({"jobId": "hourly"})
+    assert (run["status"], run["trigger"], run["rowsAffected"]) == ("SUCCESS", "catch-up", 7)
+
+
+def test_only_the_leader_fires(client, jobs):
+    calls = []
+    scheduler.register_job("sweep", lambda: calls.append(1), "interval", record=False, minutes=5)
+
+    scheduler._fire("sweep")
+    assert calls == []
+
+    scheduler._heartbeat()
+    scheduler._fire("sweep")
+    assert calls == [1]
+
+
+def test_run_once_claims_a_slot_once_and_records_failures(client, jobs):
+    def boom():
+        raise RuntimeError("bad day")
+
+    first = scheduler.run_once("auto_checkout", "Asia/Kolkata:2026-03-02", boom)
+    assert first["status"] == "FAILED" and first["error"] == "bad day"
+    assert scheduler.run_once("auto_checkout", "Asia/Kolkata:2026-03-02", boom) is None
+
+    runs = scheduler.get_job_runs("auto_checkout")
+    assert [r["runId"] for r in runs] == ["auto_checkout@Asia/Kolkata:2026-03-02"]
+    assert "traceback" not in runs[0]
+
+
+def test_run_job_now_always_runs(client, jobs):
+    scheduler.register_job("cleanup", lambda: 3, "cron", hour=3)
+    scheduler.run_job_now("cleanup")
+    scheduler.run_job_now("cleanup")
+    assert job_runs_collection.count_documents({"jobId": "cleanup", "trigger": "manual"}) == 2
+
+    with pytest.raises(KeyError):
+        scheduler.run_job_now("missing")
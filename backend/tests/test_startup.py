@@ -0,0 +1,21 @@
+from app import main
+from app.database import users_collection
+
+
+def test_memory_backend_starts_and_seeds_admin(client, admin):
+    r = client.get("/api/auth/me", headers=admin)
+    assert r.json()["role"] == "ADMIN"
+
+
+def test_failed_startup_step_does_not_skip_the_rest(client, monkeypatch):
+    users_collection.delete_many({})
+
+    def broken():
+        raise RuntimeError("index build failed")
+
+    monkeypatch.setattr(main, "ensure_search_indexes", broken)
+    main.run_startup_tasks()
+
+    assert users_collection.find_one({"email": main.DEFAULT_ADMIN_EMAIL})
+    steps = [s["step"] for s in main.startup_profile.report()["steps"]]
+    assert "search_indexes" in steps and "seed_admin" in steps
@@ -0,0 +1,98 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import main
+from app.database import leaves_collection, sync_counters_collection, sync_tombstones_collection
+from app.sync_sequence import next_sync_stamp, prune_tombstones
+
+
+@pytest.fixture(autouse=True)
+def no_settle_window(monkeypatch):
+    monkeypatch.setattr("app.sync_feed.SYNC_SETTLE_SECONDS", 0)
+
+
+def test_stamps_increase_across_threads():
+    seqs = []
+
+    def take():
+        seqs.extend(next_sync_stamp()["syncSeq"] for _ in range(2000))
+
+    threads = [threading.Thread(target=take) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(seqs)) == len(seqs)
+    assert max(seqs) < 2 ** 53
+
+
+def test_stamps_need_no_database(client):
+    next_sync_stamp()
+    assert sync_counters_collection.count_documents({}) == 0
+
+
+def test_feed_pages_changes_and_deletes(client, admin, make_employee):
+    for i in range(3):
+        make_employee(f"E{i}")
+
+    r = client.get("/api/sync/employees?since=0&limit=2", headers=admin).json()
+    assert [d["employeeId"] for d in r["changed"]] == ["E0", "E1"]
+    assert r["hasMore"] is True
+    assert all("password" not in d for d in r["changed"])
+
+    r = client.get(f"/api/sync/employees?since={r['next']}", headers=admin).json()
+    assert [d["employeeId"] for d in r["changed"]] == ["E2"]
+    assert r["hasMore"] is False
+    cursor = r["next"]
+
+    client.post("/api/offices", headers=admin, json={
+        "officeId": "OFF-1", "officeName": "HQ", "lat": 22.5, "lng": 88.3, "radiusMeters": 200,
+    })
+    client.delete("/api/offices/OFF-1", headers=admin)
+    r = client.get("/api/sync/offices?since=0", headers=admin).json()
+    assert [d["key"] for d in r["deleted"]] == [{"officeId": "OFF-1"}]
+
+    # nothing new for employees
+    r = client.get(f"/api/sync/employees?since={cursor}", headers=admin).json()
+    assert r["changed"] == [] and r["next"] == cursor
+
+
+def test_cursor_older_than_pruned_tombstones_expires(client, admin):
+    old = next_sync_stamp()
+    sync_tombstones_collection.insert_one({
+        "collection": "offices", "key": {"officeId": "X"}, **old,
+        "deletedAt": datetime.utcnow() - timedelta(days=365),
+    })
+    assert prune_tombstones() == 1
+
+    r = client.get(f"/api/sync/offices?since={old['syncSeq'] - 1}", headers=admin)
+    assert r.status_code == 410
+    assert client.get(f"/api/sync/offices?since={old['syncSeq']}", headers=admin).status_code == 200
+
+
+def test_unknown_feed(client, admin):
+    assert client.get("/api/sync/nope", headers=admin).status_code == 404
+
+
+def test_leave_writes_are_stamped_inside_each_transaction_attempt(client, admin, make_employee, monkeypatch):
+    emp, employee = make_employee("E1")
+    attempts = []
+    real = main.run_transaction
+
+    def slow_transaction(callback):
+        # anything stamped before the attempt starts could commit behind other workers' rows
+        attempts.append(next_sync_stamp()["syncSeq"])
+        return real(callback)
+
+    monkeypatch.setattr(main, "run_transaction", slow_transaction)
+    client.post("/api/leaves", headers=employee, json={
+        "employeeId": emp, "startDate": "2026-11-02", "endDate": "2026-11-03", "reason": "trip",
+    })
+    leave = leaves_collection.find_one({"employeeId": emp})
+    assert leave["syncSeq"] > attempts[-1]
+
+    client.put(f"/api/leaves/action/{leave['leaveId']}", headers=admin, json={"status": "REJECTED"})
+    assert leaves_collection.find_one({"employeeId": emp})["syncSeq"] > attempts[-1]
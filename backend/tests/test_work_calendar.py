@@ -0,0 +1,42 @@
+from datetime import date
+
+from app.work_calendar import is_working_day, working_dates_between, working_days_between, working_days_in_month
+
+
+def _office(client, admin, office_id, **fields):
+    r = client.post("/api/offices", headers=admin, json={
+        "officeId": office_id, "officeName": f"Office {office_id}", "lat": 22.57, "lng": 88.36, **fields,
+    })
+    assert r.status_code == 201, r.text
+
+
+def _holiday(client, admin, day, **scope):
+    r = client.post("/api/holidays", headers=admin, json={"date": day, "name": "Holiday", **scope})
+    assert r.status_code == 201, r.text
+
+
+def test_weekdays_without_holidays(client):
+    # March 2026: 22 weekdays
+    assert working_days_in_month(2026, 3) == 22
+    assert working_days_between(date(2026, 3, 6), date(2026, 3, 9)) == 2        # Fri..Mon
+    assert working_days_between(date(2026, 3, 9), date(2026, 3, 6)) == 0
+    # across a year boundary: Wed 31 Dec + Thu 1 Jan
+    assert working_days_between(date(2025, 12, 31), date(2026, 1, 1)) == 2
+
+
+def test_holidays_apply_by_scope_and_are_picked_up(client, admin):
+    _office(client, admin, "KOL", region="IN-WB")
+    _office(client, admin, "BLR", region="IN-KA")
+    assert working_days_in_month(2026, 3) == 22     # cached before the holidays exist
+
+    _holiday(client, admin, "2026-03-02")                           # company-wide
+    _holiday(client, admin, "2026-03-03", region="IN-WB")
+    _holiday(client, admin, "2026-03-04", officeId="BLR")
+
+    assert working_days_in_month(2026, 3) == 21
+    assert working_days_in_month(2026, 3, "KOL") == 20
+    assert working_days_in_month(2026, 3, "BLR") == 20
+    assert not is_working_day(date(2026, 3, 3), "KOL") and is_working_day(date(2026, 3, 3), "BLR")
+    assert working_dates_between(date(2026, 3, 2), date(2026, 3, 6), "KOL") == [
+        "2026-03-04", "2026-03-05", "2026-03-06",
+    ]